@@ -0,0 +1,107 @@
+# admin_orders.py
+"""
+Filtering and streaming export for the admin order views.
+
+order_filter() turns the admin query parameters into a Mongo filter that the
+orders indexes can serve: (status, timestamp, _id), (user_email, timestamp,
+_id) or (timestamp, _id). The list endpoint pages it with keyset.fetch_page().
+
+export_ndjson() / export_csv() walk a cursor in batches of EXPORT_BATCH_SIZE
+and yield ~EXPORT_CHUNK_BYTES chunks, so an export holds one batch and one
+chunk in memory whether it covers 200 orders or 2 million.
+"""
+import csv
+import io
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+from fast_json import dumps
+from keyset import SORT
+
+EXPORT_BATCH_SIZE  = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+CSV_COLUMNS = [
+    "order_id", "timestamp", "status", "user_email", "total",
+    "item_count", "items", "name", "phone", "address", "instructions",
+]
+
+
+def _day(value: str, name: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+
+
+def order_filter(status: Optional[str] = None, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None, user: Optional[str] = None) -> dict:
+    """
+    Mongo filter for the admin order list/export. Dates are inclusive calendar
+    days compared against the ISO `timestamp` strings orders are stored with.
+    Raises ValueError for malformed dates.
+    """
+    query = {}
+    if status:
+        query["status"] = status
+    if user:
+        query["user_email"] = user.strip()
+    ts = {}
+    if date_from:
+        ts["$gte"] = _day(date_from, "date_from").strftime("%Y-%m-%d")
+    if date_to:
+        ts["$lt"] = (_day(date_to, "date_to") + timedelta(days=1)).strftime("%Y-%m-%d")
+    if ts:
+        query["timestamp"] = ts
+    return query
+
+
+def _cursor(collection, query: dict):
+    return collection.find(query).sort(SORT).batch_size(EXPORT_BATCH_SIZE)
+
+
+async def export_ndjson(collection, query: dict) -> AsyncIterator[bytes]:
+    buf = []
+    size = 0
+    async for doc in _cursor(collection, query):
+        line = dumps(doc) + b"\n"
+        buf.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def _csv_row(doc: dict) -> list:
+    items = doc.get("items") or []
+    delivery = doc.get("delivery_details") or {}
+    return [
+        str(doc["_id"]),
+        doc.get("timestamp", ""),
+        doc.get("status", ""),
+        doc.get("user_email", ""),
+        doc.get("total", ""),
+        len(items),
+        "; ".join(f"{i.get('name', '')} x{i.get('quantity', 1)}" for i in items),
+        delivery.get("name", ""),
+        delivery.get("phone", ""),
+        delivery.get("address", ""),
+        delivery.get("instructions") or "",
+    ]
+
+
+async def export_csv(collection, query: dict) -> AsyncIterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    async for doc in _cursor(collection, query):
+        writer.writerow(_csv_row(doc))
+        if out.tell() >= EXPORT_CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
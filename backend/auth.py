@@ -0,0 +1,149 @@
+# auth.py
+"""
+JWT helpers and FastAPI auth dependencies shared by main.py and the routers.
+
+Two caches keep repeat callers off the hot path:
+  • verified token claims, each entry expiring exactly when its token does,
+    so a cached token is never honoured past its `exp`
+  • a short-TTL user-profile cache (email/name/role — never the password hash)
+    for /user/me; call invalidate_user() when a user is created or changes role
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from jose import jwt, JWTError
+
+from db import get_database
+from logger import get_logger
+from ttl_cache import TTLCache
+
+SECRET_KEY                  = os.getenv("SECRET_KEY", "yummybites_super_secret_jwt_key_2024")
+ALGORITHM                   = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+ADMIN_EMAIL                 = os.getenv("ADMIN_EMAIL", "admin@yummybites.com")
+
+_claims_cache  = TTLCache(maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096")), ttl=300)
+_profile_cache = TTLCache(maxsize=int(os.getenv("AUTH_PROFILE_CACHE_SIZE", "2048")),
+                          ttl=float(os.getenv("AUTH_PROFILE_CACHE_TTL", "60")))
+
+log = get_logger(__name__)
+
+
+# ===============================
+# Tokens
+# ===============================
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Verified claims for `token`, or None if it is invalid or expired."""
+    claims = _claims_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    exp = claims.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    if ttl is None or ttl > 0:
+        _claims_cache.set(token, claims, ttl=ttl)
+    return claims
+
+
+def get_email_from_token(token: str) -> Optional[str]:
+    claims = decode_token(token)
+    return claims.get("sub") if claims else None
+
+
+def get_token_from_request(request: Request, allow_query: bool = False) -> Optional[str]:
+    """
+    Bearer token from the Authorization header. A ?token= query param leaks the
+    JWT into URLs, access logs and Referer headers, so it is only honoured with
+    `allow_query` — /user/me and the admin routes, which have always accepted
+    it (deprecated). WebSockets read it from the handshake URL themselves.
+    """
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        return auth.split(" ")[1]
+    if allow_query:
+        token = request.query_params.get("token")
+        if token:
+            log.warning("Deprecated ?token= query auth, send an Authorization header", path=request.url.path)
+        return token
+    return None
+
+
+# ===============================
+# Profiles
+# ===============================
+async def get_user_profile(email: str) -> Optional[dict]:
+    profile = _profile_cache.get(email)
+    if profile is not None:
+        return profile
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    db_user = await db["users"].find_one({"email": email}, {"name": 1, "role": 1})
+    if not db_user:
+        return None
+    profile = {"email": email, "name": db_user.get("name", ""), "role": db_user.get("role", "user")}
+    _profile_cache.set(email, profile)
+    return profile
+
+
+def invalidate_user(email: str):
+    """Drop a cached profile after signup or a role change."""
+    _profile_cache.pop(email)
+
+
+# ===============================
+# Dependencies
+# ===============================
+def get_email_from_request(request: Request) -> Optional[str]:
+    """
+    Logged-in user's email, or None for guests.
+    Use as `Depends(get_email_from_request)` where login is optional.
+    """
+    token = get_token_from_request(request)
+    return get_email_from_token(token) if token else None
+
+
+def require_user(request: Request) -> str:
+    """Email of the logged-in user; 401 otherwise."""
+    # Backward compat: /user/me and the admin routes still take ?token=
+    token = get_token_from_request(request, allow_query=True)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    email = get_email_from_token(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return email
+
+
+async def current_user(request: Request) -> dict:
+    """Profile (email, name, role) of the logged-in user."""
+    email = require_user(request)
+    profile = await get_user_profile(email)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    return profile
+
+
+def require_admin(request: Request) -> str:
+    """Validate token and check admin role. Returns email."""
+    email = require_user(request)
+    if email != ADMIN_EMAIL:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return email
+
+
+def auth_cache_stats() -> dict:
+    return {"claims": _claims_cache.stats(), "profiles": _profile_cache.stats()}
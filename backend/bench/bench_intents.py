@@ -0,0 +1,165 @@
+# bench/bench_intents.py
+"""
+Chat intent classification micro-benchmark.
+
+Replays a corpus of realistic Foodie AI messages through:
+  • legacy   — the original per-request chain of re.search/re.match calls plus
+               the `any(k in lower ...)` keyword scans from get_relevant_items
+  • engine   — intent_engine.classify (one precompiled single-pass scan)
+
+and reports classifications/sec for each. Both paths are checked for
+agreement on intent, dish slots, price cap and filters before timing.
+
+    cd backend && python bench/bench_intents.py [--seconds 2] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_engine import classify  # noqa: E402
+from menu_index import SPICY_KEYWORDS, VEG_KEYWORDS, NONVEG_KEYWORDS, SWEET_KEYWORDS  # noqa: E402
+
+CORPUS = [
+    "hi",
+    "Hello! what's good today?",
+    "good evening",
+    "hey can you suggest something",
+    "add paneer tikka to cart",
+    "Add Chicken Biryani and 2 garlic naan to cart",
+    "please add masala dosa, filter coffee & gulab jamun to cart",
+    "add cold coffee to card",
+    "place order",
+    "ok checkout now",
+    "confirm order please",
+    "view cart",
+    "what's in my cart?",
+    "show cart",
+    "show menu",
+    "what do you serve?",
+    "what's on the menu tonight",
+    "all dishes please",
+    "I want something spicy",
+    "suggest some chilli starters",
+    "anything with peri peri?",
+    "veg options under 200",
+    "I'm vegetarian, what do you recommend",
+    "plant based dinner ideas",
+    "non veg starters",
+    "do you have chicken curry",
+    "mutton or fish, which is better?",
+    "egg dishes for breakfast",
+    "something sweet for dessert",
+    "any ice cream or cake?",
+    "kheer or halwa?",
+    "food under ₹150",
+    "dinner less than 300",
+    "what's cheap and filling",
+    "I'm really hungry, recommend a full meal for two",
+    "is the biryani spicy or mild?",
+    "what pairs well with butter naan",
+    "can I get a tangy zesty snack",
+    "recommend a drink",
+    "what's your most popular dish",
+]
+
+
+def legacy_classify(user_input: str) -> dict:
+    """The pre-engine dispatch chain, kept verbatim for comparison."""
+    user_input = user_input.strip()
+    out = {"name": "ask", "dishes": [], "price_cap": None, "filters": set()}
+
+    m = re.search(r"add (.+?) to (cart|card)", user_input, re.IGNORECASE)
+    if m:
+        raw = m.group(1).strip()
+        out["name"] = "add_to_cart"
+        out["dishes"] = [d.strip() for d in re.split(r"\band\b|,|&", raw, flags=re.IGNORECASE) if d.strip()]
+    elif re.search(r"place order|checkout|confirm order|order now", user_input, re.IGNORECASE):
+        out["name"] = "place_order"
+    elif re.search(r"view cart|show cart|my cart|what.s in.*cart", user_input, re.IGNORECASE):
+        out["name"] = "view_cart"
+    elif re.match(r"^(hi|hello|hey|howdy|good morning|good evening|good afternoon)\b", user_input.strip(), re.IGNORECASE):
+        out["name"] = "greeting"
+    elif re.search(r"show menu|full menu|all dishes|what.s on the menu|what do you (have|serve)", user_input, re.IGNORECASE):
+        out["name"] = "show_menu"
+
+    # get_relevant_items keyword scans
+    lower = user_input.lower()
+    if any(k in lower for k in SPICY_KEYWORDS) or "spicy" in lower:
+        out["filters"].add("spicy")
+    if any(k in lower for k in VEG_KEYWORDS):
+        out["filters"].add("veg")
+    if any(k in lower for k in NONVEG_KEYWORDS):
+        out["filters"].add("nonveg")
+        out["nonveg_keyword"] = next((k for k in NONVEG_KEYWORDS if k in lower), None)
+    if any(k in lower for k in SWEET_KEYWORDS):
+        out["filters"].add("sweet")
+    price_match = re.search(r"under (?:₹\s*)?(\d+)|less than (?:₹\s*)?(\d+)", lower)
+    if price_match:
+        out["price_cap"] = int(price_match.group(1) or price_match.group(2))
+    return out
+
+
+def engine_classify(user_input: str) -> dict:
+    intent = classify(user_input)
+    out = {"name": intent.name, "dishes": intent.dishes, "price_cap": intent.price_cap, "filters": intent.filters}
+    if intent.nonveg_keyword:
+        out["nonveg_keyword"] = intent.nonveg_keyword
+    return out
+
+
+def check_agreement() -> int:
+    mismatches = 0
+    for msg in CORPUS:
+        a, b = legacy_classify(msg), engine_classify(msg)
+        if a != b:
+            mismatches += 1
+            print(f"  ✗ {msg!r}\n      legacy: {a}\n      engine: {b}")
+    return mismatches
+
+
+def run(fn, seconds: float) -> float:
+    """Classifications per second over the corpus for roughly `seconds`."""
+    n = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for msg in CORPUS:
+            fn(msg)
+        n += len(CORPUS)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per path")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    print(f"Corpus: {len(CORPUS)} messages")
+    mismatches = check_agreement()
+    print(f"Agreement: {len(CORPUS) - mismatches}/{len(CORPUS)}")
+
+    results = {
+        "legacy_per_sec": run(legacy_classify, args.seconds),
+        "engine_per_sec": run(engine_classify, args.seconds),
+        "mismatches": mismatches,
+    }
+    results["speedup"] = results["engine_per_sec"] / results["legacy_per_sec"]
+
+    print(f"legacy : {results['legacy_per_sec']:>12,.0f} classifications/s")
+    print(f"engine : {results['engine_per_sec']:>12,.0f} classifications/s")
+    print(f"speedup: {results['speedup']:.2f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
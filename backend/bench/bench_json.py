@@ -0,0 +1,131 @@
+# bench/bench_json.py
+"""
+Response encoding benchmark: FastAPI's default path vs fast_json.
+
+For realistic payloads (an admin order page, a history page, the menu, a
+dish's ratings) it times:
+  • legacy — str(_id) walk over every document, jsonable_encoder, then
+             json.dumps (what a plain-dict return from a route costs)
+  • fast   — fast_json.dumps on the raw Mongo documents
+and checks both produce the same JSON value first.
+
+    cd backend && python bench/bench_json.py [--seconds 1] [--json out.json]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import fast_json  # noqa: E402
+
+STATUSES = ["Pending", "Confirmed", "Preparing", "Out for Delivery", "Delivered", "Cancelled"]
+DISHES = ["Paneer Tikka", "Butter Chicken", "Dal Makhani", "Chicken Biryani", "Garlic Naan",
+          "Masala Dosa", "Gulab Jamun", "Cold Coffee", "Veg Pulao", "Rasmalai"]
+
+
+def make_order(rng: random.Random, when: datetime) -> dict:
+    items = [{"_id": str(ObjectId()), "name": rng.choice(DISHES), "price": float(rng.randint(40, 420)),
+              "quantity": rng.randint(1, 3), "image": "https://cdn.example.com/dish.jpg"}
+             for _ in range(rng.randint(1, 5))]
+    return {
+        "_id": ObjectId(), "items": items,
+        "total": float(sum(i["price"] * i["quantity"] for i in items)),
+        "delivery_details": {"name": "Asha Rao", "phone": "9876543210",
+                             "address": "12 MG Road, Bengaluru", "instructions": "Ring twice"},
+        "status": rng.choice(STATUSES), "timestamp": when.isoformat(), "user_email": "asha@example.com",
+    }
+
+
+def payloads(rng: random.Random) -> dict:
+    now = datetime(2026, 10, 1, 20, 0)
+    orders = [make_order(rng, now - timedelta(minutes=17 * i)) for i in range(1000)]
+    menu = [{"_id": ObjectId(), "name": f"{rng.choice(DISHES)} {i}", "description": "Chef's special, serves one",
+             "image": "https://cdn.example.com/dish.jpg", "price": float(rng.randint(40, 420)),
+             "category": rng.choice(["Starters", "Main Course", "Breads", "Desserts"]), "tags": ["veg"]}
+            for i in range(200)]
+    ratings = [{"_id": ObjectId(), "dish_id": str(menu[0]["_id"]), "user_email": f"u{i}@example.com",
+                "stars": rng.randint(1, 5), "comment": "Loved it", "updated_at": now.isoformat()}
+               for i in range(20)]
+    return {
+        "admin_orders_100":  {"orders": orders[:100], "next_cursor": "WyIyMDI2LTEwLTAxIl0"},
+        "admin_orders_1000": {"orders": orders, "next_cursor": None},
+        "history_page_20":   {"orders": orders[:20], "next_cursor": "WyIyMDI2LTEwLTAxIl0"},
+        "menu_200":          menu,
+        "dish_ratings_20":   {"dish_id": ratings[0]["dish_id"], "average": 4.2, "count": 20,
+                              "histogram": {"1": 1, "5": 12}, "ratings": ratings, "user_rating": None},
+    }
+
+
+def _stringify_ids(value):
+    """What serialize_doc / serialize / the admin loop did, applied wherever documents appear."""
+    if isinstance(value, list):
+        for v in value:
+            _stringify_ids(v)
+    elif isinstance(value, dict):
+        if isinstance(value.get("_id"), ObjectId):
+            value["_id"] = str(value["_id"])
+        for key in ("orders", "ratings"):
+            if isinstance(value.get(key), list):
+                _stringify_ids(value[key])
+
+
+def legacy(payload) -> bytes:
+    _stringify_ids(payload)
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def fast(payload) -> bytes:
+    return fast_json.dumps(payload)
+
+
+def timed(fn, payload, seconds: float) -> float:
+    """Mean seconds per encode. The legacy path mutates, so each run gets a fresh copy (not timed)."""
+    n = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        data = copy.deepcopy(payload)
+        start = time.perf_counter()
+        fn(data)
+        elapsed += time.perf_counter() - start
+        n += 1
+    return elapsed / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per payload and path")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    mismatches = 0
+    print(f"{'payload':<20}{'bytes':>10}{'legacy µs':>12}{'fast µs':>10}{'speedup':>9}")
+    for name, payload in payloads(random.Random(7)).items():
+        old, new = legacy(copy.deepcopy(payload)), fast(copy.deepcopy(payload))
+        if json.loads(old) != json.loads(new):
+            mismatches += 1
+            print(f"  ✗ {name}: outputs differ")
+        t_old = timed(legacy, payload, args.seconds)
+        t_new = timed(fast, payload, args.seconds)
+        results[name] = {"bytes": len(new), "legacy_us": t_old * 1e6, "fast_us": t_new * 1e6,
+                         "speedup": t_old / t_new}
+        print(f"{name:<20}{len(new):>10,}{t_old * 1e6:>12,.0f}{t_new * 1e6:>10,.0f}{t_old / t_new:>8.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"payloads": results, "mismatches": mismatches}, f, indent=2)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+# bench/fake_mongo.py
+"""
+In-memory stand-in for the slice of Motor the API uses, for offline load runs.
+
+Implements find / find_one / insert_one / update_one / replace_one /
+find_one_and_update / distinct / counts on plain dicts, with the query
+operators the routes actually send ($and, $or, $in, $lt/$lte/$gt/$gte, $ne,
+$exists), $set/$inc/$unset/$setOnInsert updates with upsert, sort/limit/skip and
+projections (including $size/$ifNull expressions). Unique indexes from
+create_indexes() are enforced, so signup still gets DuplicateKeyError.
+
+Not a Mongo emulator: no aggregation, and watch() raises OperationFailure
+like a standalone mongod, so the menu cache polls and order events are
+delivered in-process. Every operation awaits `latency` seconds first to
+stand in for the network round trip (0 = just yield to the loop).
+"""
+import asyncio
+import copy
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+
+
+# ===============================
+# Documents
+# ===============================
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: dict, path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(value, op: str, arg) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$ne":
+        return value is _MISSING or value != arg
+    if op == "$in":
+        return value is not _MISSING and value in arg
+    if op == "$nin":
+        return value is _MISSING or value not in arg
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+    except TypeError:
+        return False   # Mongo only compares within a type bracket
+    raise NotImplementedError(f"fake_mongo: query operator {op}")
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            value = _get(doc, key)
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif _get(doc, key) != cond and not (cond is None and _get(doc, key) is _MISSING):
+            # {field: None} also matches a missing field, as in Mongo
+            return False
+    return True
+
+
+def _expr(doc: dict, expr):
+    """Evaluate the aggregation expressions projections use: "$field", $ifNull, $size, literals."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, dict) and len(expr) == 1:
+        (op, arg), = expr.items()
+        if op == "$ifNull":
+            for candidate in arg:
+                value = _expr(doc, candidate)
+                if value is not None:
+                    return value
+            return None
+        if op == "$size":
+            value = _expr(doc, arg)
+            if not isinstance(value, list):
+                raise OperationFailure("The argument to $size must be an array")
+            return len(value)
+        if op.startswith("$"):
+            raise NotImplementedError(f"fake_mongo doesn't support the {op} expression")
+    return expr
+
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    rest = {k: v for k, v in projection.items() if k != "_id"}
+    if rest and all(v in (0, False) for v in rest.values()):
+        out = copy.deepcopy(doc)
+        for field in rest:
+            out.pop(field, None)
+    else:
+        out = {}
+        for field, spec in rest.items():
+            if isinstance(spec, dict):
+                _set(out, field, _expr(doc, spec))
+            else:
+                value = _get(doc, field)
+                if value is not _MISSING:
+                    _set(out, field, copy.deepcopy(value))
+        if include_id and "_id" in doc:
+            out["_id"] = doc["_id"]
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+def _sort_key(fields):
+    def key(doc):
+        return [_get(doc, f) for f, _ in fields]
+    return key
+
+
+def _normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return list(key_or_list)
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                _set(doc, path, copy.deepcopy(value))
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get(doc, path)
+                _set(doc, path, (0 if current is _MISSING else current) + amount)
+        elif op == "$unset":
+            for path in fields:
+                _unset(doc, path)
+        elif op == "$setOnInsert":
+            continue
+        else:
+            raise NotImplementedError(f"fake_mongo: update operator {op}")
+
+
+def _upsert_seed(query: dict) -> dict:
+    """Equality fields of a filter become the new document's fields, as in Mongo."""
+    seed = {}
+    for key, cond in query.items():
+        if not key.startswith("$") and not (isinstance(cond, dict) and any(k.startswith("$") for k in cond)):
+            _set(seed, key, copy.deepcopy(cond))
+    return seed
+
+
+# ===============================
+# Cursors, collections, databases
+# ===============================
+class Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: Optional[dict], projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _run(self) -> List[dict]:
+        docs = [d for d in self._collection.docs if matches(d, self._query)]
+        # Stable multi-key sort: apply keys from last to first
+        for field, direction in reversed(self._sort or []):
+            present = [d for d in docs if _get(d, field) is not _MISSING]
+            missing = [d for d in docs if _get(d, field) is _MISSING]
+            present.sort(key=_sort_key([(field, direction)]), reverse=direction < 0)
+            docs = (missing + present) if direction > 0 else (present + missing)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length=None):
+        await self._collection.db.round_trip()
+        docs = self._run()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._iter is None:
+            await self._collection.db.round_trip()
+            self._iter = iter(self._run())
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeDatabase", name: str):
+        self.db = db
+        self.name = name
+        self.docs: List[dict] = []
+        self.unique: List[List[str]] = []
+
+    def _find(self, query: Optional[dict]) -> Optional[dict]:
+        return next((d for d in self.docs if matches(d, query)), None)
+
+    def _check_unique(self, doc: dict, ignore: Optional[dict] = None):
+        for fields in self.unique:
+            key = [_get(doc, f) for f in fields]
+            for other in self.docs:
+                if other is not ignore and other is not doc and [_get(other, f) for f in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _insert(self, doc: dict) -> dict:
+        doc.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(doc)
+        self._check_unique(stored)
+        self.docs.append(stored)
+        return stored
+
+    # ── Reads ──
+    def find(self, query: Optional[dict] = None, projection=None, **kwargs) -> FakeCursor:
+        return FakeCursor(self, query, projection or kwargs.get("projection"))
+
+    async def find_one(self, query: Optional[dict] = None, projection=None, **kwargs):
+        await self.db.round_trip()
+        doc = self._find(query)
+        return None if doc is None else _project(doc, projection or kwargs.get("projection"))
+
+    async def distinct(self, field: str, query: Optional[dict] = None):
+        await self.db.round_trip()
+        values = []
+        for doc in self.docs:
+            value = _get(doc, field)
+            if value is not _MISSING and matches(doc, query) and value not in values:
+                values.append(value)
+        return values
+
+    async def count_documents(self, query: dict):
+        await self.db.round_trip()
+        return sum(1 for d in self.docs if matches(d, query))
+
+    async def estimated_document_count(self):
+        await self.db.round_trip()
+        return len(self.docs)
+
+    # ── Writes ──
+    async def insert_one(self, doc: dict):
+        await self.db.round_trip()
+        stored = self._insert(doc)
+        return Result(inserted_id=stored["_id"], acknowledged=True)
+
+    async def insert_many(self, docs: List[dict]):
+        await self.db.round_trip()
+        return Result(inserted_ids=[self._insert(d)["_id"] for d in docs], acknowledged=True)
+
+    def _update(self, query: dict, update: dict, upsert: bool):
+        """Returns (pre-image or None, stored document or None)."""
+        doc = self._find(query)
+        if doc is not None:
+            before = copy.deepcopy(doc)
+            _apply_update(doc, update, inserting=False)
+            try:
+                self._check_unique(doc, ignore=doc)
+            except DuplicateKeyError:
+                doc.clear()
+                doc.update(before)
+                raise
+            return before, doc
+        if not upsert:
+            return None, None
+        doc = _upsert_seed(query)
+        _apply_update(doc, update, inserting=True)
+        return None, self._insert(doc)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self.db.round_trip()
+        before, doc = self._update(query, update, upsert)
+        upserted = doc is not None and before is None
+        return Result(matched_count=0 if upserted or doc is None else 1,
+                      upserted_id=doc["_id"] if upserted else None, acknowledged=True)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        await self.db.round_trip()
+        doc = self._find(query)
+        if doc is not None:
+            _id = doc["_id"]
+            doc.clear()
+            doc.update(copy.deepcopy(replacement), _id=_id)
+            return Result(matched_count=1, upserted_id=None)
+        if upsert:
+            stored = self._insert({**_upsert_seed(query), **replacement})
+            return Result(matched_count=0, upserted_id=stored["_id"])
+        return Result(matched_count=0, upserted_id=None)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection=None, upsert: bool = False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs):
+        await self.db.round_trip()
+        before, doc = self._update(query, update, upsert)
+        result = doc if return_document == ReturnDocument.AFTER else before
+        return None if result is None else _project(result, projection)
+
+    async def delete_one(self, query: dict):
+        await self.db.round_trip()
+        doc = self._find(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return Result(deleted_count=int(doc is not None))
+
+    # ── Admin ──
+    async def create_indexes(self, models):
+        await self.db.round_trip()
+        names = []
+        for model in models:
+            spec = model.document
+            if spec.get("unique"):
+                self.unique.append(list(spec["key"].keys()))
+            names.append(spec["name"])
+        return names
+
+    def aggregate(self, pipeline, **kwargs):
+        raise NotImplementedError("fake_mongo: aggregation pipelines aren't supported — seed the result instead")
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class FakeDatabase:
+    def __init__(self, name: str = "bench", latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+
+    async def round_trip(self):
+        await asyncio.sleep(self.latency)
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        # Read preferences are meaningless with one copy of the data
+        return self[name]
+
+    async def command(self, command, **kwargs):
+        raise OperationFailure(f"fake_mongo: command {next(iter(command))!r} not supported")
+
+
+class FakeClient:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        return self.db
+
+    async def server_info(self):
+        return {"version": "fake"}
+
+    def close(self):
+        pass
@@ -0,0 +1,141 @@
+# bench/fake_upstreams.py
+"""
+Local fake Gemini and Razorpay HTTP servers for offline load runs.
+
+One small FastAPI app answers both APIs:
+  • POST /{version}/models/{model}:generateContent          (Gemini)
+  • POST /{version}/models/{model}:streamGenerateContent    (Gemini, SSE)
+  • POST /v1/orders                                         (Razorpay)
+
+Point the API at it with GEMINI_BASE_URL and RAZORPAY_BASE_URL (loadtest.py
+does this). Latency and the Gemini 429 rate are read per request from
+`settings`, so a run can change them between scenarios.
+
+    cd backend && python bench/fake_upstreams.py --port 8765 --gemini-429-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+settings = {
+    "gemini_latency_ms":   400.0,   # time to the full reply (streams spread it over chunks)
+    "gemini_jitter_ms":    100.0,
+    "gemini_429_rate":     0.0,     # fraction of Gemini calls answered 429 RESOURCE_EXHAUSTED
+    "razorpay_latency_ms": 150.0,
+    "razorpay_jitter_ms":  50.0,
+}
+counters = {"gemini": 0, "gemini_429": 0, "razorpay": 0}
+
+REPLY = ("Try the Paneer Tikka (₹220) — smoky, a little spicy and great with Butter Naan. "
+         "For something lighter, the Masala Dosa is a favourite. Want me to add either to your cart?")
+
+app = FastAPI(title="Fake upstreams")
+
+
+async def _delay(service: str, share: float = 1.0):
+    base = settings[f"{service}_latency_ms"]
+    jitter = settings[f"{service}_jitter_ms"]
+    await asyncio.sleep(max(0.0, random.gauss(base, jitter)) * share / 1000)
+
+
+def _quota_error() -> JSONResponse:
+    counters["gemini_429"] += 1
+    return JSONResponse(status_code=429, content={"error": {
+        "code": 429, "message": "Resource has been exhausted (e.g. check quota).", "status": "RESOURCE_EXHAUSTED",
+    }})
+
+
+def _candidate(text: str, finished: bool = True) -> dict:
+    out = {"content": {"role": "model", "parts": [{"text": text}]}}
+    if finished:
+        out["finishReason"] = "STOP"
+    return {"candidates": [out]}
+
+
+@app.post("/{version}/models/{model_action}")
+async def gemini(version: str, model_action: str, request: Request):
+    counters["gemini"] += 1
+    await request.body()
+    if random.random() < settings["gemini_429_rate"]:
+        await _delay("gemini", 0.1)
+        return _quota_error()
+
+    if model_action.endswith(":streamGenerateContent"):
+        words = REPLY.split(" ")
+        chunks = [" ".join(words[i:i + 6]) + " " for i in range(0, len(words), 6)]
+
+        async def sse():
+            for i, chunk in enumerate(chunks):
+                await _delay("gemini", 1 / len(chunks))
+                yield f"data: {json.dumps(_candidate(chunk, i == len(chunks) - 1))}\r\n\r\n"
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    await _delay("gemini")
+    return _candidate(REPLY)
+
+
+@app.post("/v1/orders")
+async def razorpay_order(request: Request):
+    counters["razorpay"] += 1
+    body = await request.json()
+    await _delay("razorpay")
+    return {
+        "id":         "order_" + uuid.uuid4().hex[:14],
+        "entity":     "order",
+        "amount":     body.get("amount"),
+        "amount_due": body.get("amount"),
+        "currency":   body.get("currency", "INR"),
+        "status":     "created",
+        "created_at": int(time.time()),
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {"settings": settings, "counters": counters}
+
+
+class UpstreamServer:
+    """Runs the fake upstreams on 127.0.0.1:`port` in a background thread."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10.0):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"fake upstreams didn't start on port {self.port}")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    for key, value in settings.items():
+        parser.add_argument("--" + key.replace("_", "-"), type=float, default=value)
+    args = parser.parse_args()
+    for key in settings:
+        settings[key] = getattr(args, key)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,595 @@
+# bench/loadtest.py
+"""
+Offline load test for the API: no Atlas, Gemini or Razorpay needed.
+
+The app runs in this process against
+  • an in-memory database (bench/fake_mongo.py), or a throwaway database on
+    a local mongod with --mongo-uri
+  • fake Gemini and Razorpay servers (bench/fake_upstreams.py) with
+    configurable latency and Gemini 429 rate
+and is driven either through a local uvicorn server on a loopback port
+(--mode uvicorn, real sockets, every scenario) or straight through the ASGI
+interface (--mode asgi, no network stack; WebSocket scenarios are skipped).
+
+Scenarios (--scenarios, comma-separated, default all):
+  menu      menu (full and 304 revalidation), categories, bulk ratings
+  order     Razorpay order + place order, as a logged-in user
+  history   three summary pages of order history plus one order detail
+  chat      Foodie AI chat; half the messages are made unique so they miss
+            the reply cache and reach the fake Gemini
+  ws_storm  --ws-clients sockets on /ws/events (plus admin firehoses) while
+            status PATCHes go out at --ws-rate/s; times PATCH → delivery
+  login     bcrypt login burst (503s are the hash pool shedding load)
+
+Each scenario runs --concurrency workers for --duration seconds after a
+--warmup, then reports p50/p95/p99 latency and throughput per request.
+--json writes the results; --baseline compares against an earlier file
+and --max-regression fails the run if any p95 got that much worse. A request
+that failed every time it was sent also fails the run: a broken scenario
+measures nothing.
+
+    cd backend && python bench/loadtest.py --scenarios menu,order --duration 10 --json after.json --baseline before.json
+
+Client and server share one event loop, so absolute numbers include the
+load generator's own cost; compare runs made with the same settings.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ["menu", "order", "history", "chat", "ws_storm", "login"]
+BENCH_PASSWORD = "bench-password"
+STATUSES = ["Pending", "Confirmed", "Preparing", "Out for Delivery", "Delivered", "Cancelled"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--mode", choices=["uvicorn", "asgi"], default="uvicorn")
+    parser.add_argument("--concurrency", type=int, default=20, help="workers per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    # Data
+    parser.add_argument("--mongo-uri", help="use this mongod instead of the in-memory stand-in")
+    parser.add_argument("--mongo-db", default="yummybites_bench", help="dropped and re-seeded on every run")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="per-operation delay of the in-memory db")
+    parser.add_argument("--menu-items", type=int, default=60)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--orders-per-user", type=int, default=60)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    # Upstreams
+    parser.add_argument("--gemini-latency-ms", type=float, default=400.0)
+    parser.add_argument("--gemini-429-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-rpm", type=float, default=0.0, help="gateway pacing (0 = off, as in the app)")
+    parser.add_argument("--razorpay-latency-ms", type=float, default=150.0)
+    # WebSocket storm
+    parser.add_argument("--ws-clients", type=int, default=200)
+    parser.add_argument("--ws-admins", type=int, default=5)
+    parser.add_argument("--ws-orders", type=int, default=20, help="distinct orders the clients watch")
+    parser.add_argument("--ws-rate", type=float, default=50.0, help="status PATCHes per second")
+    # Output
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against an earlier --json file")
+    parser.add_argument("--max-regression", type=float, help="fail if any p95 is this many percent worse than baseline")
+    return parser.parse_args(argv)
+
+
+def configure_env(args, upstream_url: str):
+    """Must run before the app modules are imported — they read these at import time."""
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ["GEMINI_BASE_URL"] = upstream_url
+    os.environ["GEMINI_RPM"] = str(args.gemini_rpm)
+    os.environ["RAZORPAY_BASE_URL"] = upstream_url
+    os.environ["ORDER_EVENTS_BACKPLANE"] = "local"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ["MONGO_DB"] = args.mongo_db
+
+
+# ===============================
+# Recording
+# ===============================
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+        self.extra: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float, status, ok: bool):
+        if not self.recording:
+            return
+        self.latencies.setdefault(name, []).append(seconds)
+        counts = self.statuses.setdefault(name, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, duration: float) -> dict:
+        requests = {}
+        for name, values in self.latencies.items():
+            values.sort()
+            requests[name] = {
+                "count":    len(values),
+                "errors":   self.errors.get(name, 0),
+                "statuses": self.statuses[name],
+                "rps":      round(len(values) / duration, 2),
+                "mean_ms":  round(sum(values) / len(values) * 1000, 2),
+                "p50_ms":   round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms":   round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms":   round(percentile(values, 0.99) * 1000, 2),
+                "max_ms":   round(values[-1] * 1000, 2),
+            }
+        return {
+            "duration_s": round(duration, 2),
+            "throughput": round(sum(r["count"] for r in requests.values()) / duration, 2),
+            "requests":   requests,
+            "extra":      self.extra,
+        }
+
+
+class Context:
+    """What scenario steps get: an HTTP client that records, plus the seeded fixtures."""
+
+    def __init__(self, client, fixtures: dict, recorder: Recorder, ws_url: Optional[str]):
+        self.client = client
+        self.fixtures = fixtures
+        self.recorder = recorder
+        self.ws_url = ws_url
+
+    async def request(self, name: str, method: str, url: str, expect=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.recorder.record(name, time.perf_counter() - start, type(e).__name__, False)
+            return None
+        self.recorder.record(name, time.perf_counter() - start, response.status_code,
+                             response.status_code in expect)
+        return response
+
+    def auth(self, worker: int) -> dict:
+        tokens = self.fixtures["tokens"]
+        return {"Authorization": f"Bearer {tokens[worker % len(tokens)]}"}
+
+
+# ===============================
+# Seed data
+# ===============================
+DISHES = [
+    ("Paneer Tikka", "Starters", 220, ["veg", "spicy"]), ("Chicken 65", "Starters", 260, ["spicy"]),
+    ("Veg Spring Roll", "Starters", 180, ["veg"]), ("Fish Amritsari", "Starters", 320, []),
+    ("Butter Chicken", "Main Course", 340, []), ("Dal Makhani", "Main Course", 240, ["veg"]),
+    ("Palak Paneer", "Main Course", 260, ["veg"]), ("Mutton Rogan Josh", "Main Course", 420, ["spicy"]),
+    ("Chicken Biryani", "Rice", 300, []), ("Veg Pulao", "Rice", 200, ["veg"]),
+    ("Butter Naan", "Breads", 50, ["veg"]), ("Garlic Naan", "Breads", 60, ["veg"]),
+    ("Masala Dosa", "South Indian", 150, ["veg"]), ("Idli Sambar", "South Indian", 120, ["veg"]),
+    ("Gulab Jamun", "Desserts", 90, ["veg", "sweet"]), ("Rasmalai", "Desserts", 120, ["veg", "sweet"]),
+    ("Cold Coffee", "Beverages", 140, ["veg"]), ("Masala Chai", "Beverages", 40, ["veg"]),
+]
+
+
+def build_fixtures(args, rng: random.Random) -> dict:
+    import bcrypt
+    from bson import ObjectId
+    from auth import create_access_token, ADMIN_EMAIL
+
+    menu = []
+    for i in range(args.menu_items):
+        name, category, price, tags = DISHES[i % len(DISHES)]
+        suffix = "" if i < len(DISHES) else f" ({i // len(DISHES) + 1})"
+        menu.append({
+            "_id": ObjectId(), "name": name + suffix, "category": category, "price": f"₹{price}",
+            "description": f"House {name.lower()}", "image": f"/img/{i}.jpg", "tags": tags,
+        })
+
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(args.bcrypt_rounds)).decode()
+    users = [{"_id": ObjectId(), "email": f"bench{i}@example.com", "name": f"Bench User {i}",
+              "password": password_hash} for i in range(args.users)]
+
+    IST = timezone(timedelta(hours=5, minutes=30))
+    now = datetime.now(IST)
+    orders = []
+    for user in users:
+        for n in range(args.orders_per_user):
+            picked = rng.sample(menu, rng.randint(1, 4))
+            items = [{"_id": str(d["_id"]), "name": d["name"], "price": float(d["price"][1:]),
+                      "quantity": rng.randint(1, 3), "image": d["image"]} for d in picked]
+            orders.append({
+                "_id": ObjectId(), "items": items,
+                "total": float(sum(i["price"] * i["quantity"] for i in items)),
+                "delivery_details": {"name": user["name"], "phone": "9999999999",
+                                     "address": "1 Bench Street", "instructions": None},
+                "status": rng.choice(STATUSES),
+                "timestamp": (now - timedelta(hours=n * 7, minutes=rng.randint(0, 59))).isoformat(),
+                "user_email": user["email"],
+            })
+
+    status_counts: Dict[str, int] = {}
+    for o in orders:
+        status_counts[o["status"]] = status_counts.get(o["status"], 0) + 1
+    stamp = datetime.utcnow().isoformat()
+    stats = {
+        "total_orders": len(orders), "status_counts": status_counts,
+        "total_revenue": float(sum(o["total"] for o in orders if o["status"] == "Delivered")),
+        "updated_at": stamp, "rebuilt_at": stamp,
+    }
+    summaries = []
+    for dish in menu:
+        hist = {str(s): rng.randint(0, 20) for s in range(1, 6)}
+        summaries.append({"_id": str(dish["_id"]), "count": sum(hist.values()),
+                          "sum": sum(int(s) * c for s, c in hist.items()), "hist": hist})
+
+    return {
+        "menu": menu, "users": users, "orders": orders, "stats": stats, "rating_summaries": summaries,
+        "tokens": [create_access_token({"sub": u["email"]}) for u in users],
+        "admin_token": create_access_token({"sub": ADMIN_EMAIL}),
+        "order_ids": [str(o["_id"]) for o in orders],
+    }
+
+
+async def seed(db, fixtures: dict):
+    import order_stats
+    from routes.ratings_routes import BACKFILL_MARKER
+    await db["menu"].insert_many([dict(d) for d in fixtures["menu"]])
+    await db["users"].insert_many([dict(u) for u in fixtures["users"]])
+    await db["orders"].insert_many([dict(o) for o in fixtures["orders"]])
+    await db["rating_summaries"].insert_many([dict(s) for s in fixtures["rating_summaries"]])
+    # Seeded as already rebuilt, so startup doesn't recompute it with an aggregation
+    await db["stats"].replace_one({"_id": order_stats.STATS_ID}, dict(fixtures["stats"]), upsert=True)
+    # Likewise the rating summaries, which are seeded directly
+    await db["migrations"].insert_one({"_id": BACKFILL_MARKER, "done_at": datetime.utcnow().isoformat()})
+
+
+# ===============================
+# Scenarios
+# ===============================
+async def menu_step(ctx: Context, worker: int, i: int):
+    kind = i % 4
+    if kind == 0:
+        response = await ctx.request("menu", "GET", "/api/v1/menu/")
+        if response is not None and response.status_code == 200:
+            ctx.fixtures["menu_etag"] = response.headers.get("etag")
+    elif kind == 1:
+        etag = ctx.fixtures.get("menu_etag") or '"none"'
+        await ctx.request("menu_revalidate", "GET", "/api/v1/menu/", expect=(200, 304),
+                          headers={"If-None-Match": etag})
+    elif kind == 2:
+        await ctx.request("categories", "GET", "/api/v1/menu/categories")
+    else:
+        await ctx.request("ratings_bulk", "GET", "/api/v1/ratings/bulk?ids=all", headers=ctx.auth(worker))
+
+
+async def order_step(ctx: Context, worker: int, i: int):
+    rng = random.Random(worker * 100003 + i)
+    picked = rng.sample(ctx.fixtures["menu"], rng.randint(1, 4))
+    items = [{"_id": str(d["_id"]), "name": d["name"], "price": float(d["price"][1:]),
+              "quantity": rng.randint(1, 3), "image": d["image"]} for d in picked]
+    total = sum(it["price"] * it["quantity"] for it in items)
+    await ctx.request("payment_create_order", "POST", "/api/v1/payment/create-order", json={"amount": total})
+    await ctx.request("place_order", "POST", "/api/v1/order/place", headers=ctx.auth(worker), json={
+        "items": items, "total": total,
+        "deliveryDetails": {"name": "Bench", "phone": "9999999999", "address": "1 Bench Street"},
+    })
+
+
+async def history_step(ctx: Context, worker: int, i: int):
+    headers = ctx.auth(worker + i)
+    cursor = None
+    first_id = None
+    for page in range(3):
+        url = "/api/v1/order/history?view=summary&limit=20" + (f"&cursor={cursor}" if cursor else "")
+        response = await ctx.request("history_page", "GET", url, headers=headers)
+        if response is None or response.status_code != 200:
+            return
+        body = response.json()
+        if page == 0 and body["orders"]:
+            first_id = body["orders"][0]["_id"]
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+    if first_id:
+        await ctx.request("order_detail", "GET", f"/api/v1/order/{first_id}", headers=headers)
+
+
+async def chat_step(ctx: Context, worker: int, i: int):
+    from bench_intents import CORPUS
+    message = CORPUS[(worker * 7 + i) % len(CORPUS)]
+    if i % 2:
+        message = f"{message} #{worker}-{i}"   # unique → reply-cache miss → fake Gemini
+    await ctx.request("chat", "POST", "/api/v1/ai/chat", json={"message": message, "session_id": f"bench-{worker}"})
+
+
+async def login_step(ctx: Context, worker: int, i: int):
+    users = ctx.fixtures["users"]
+    user = users[(worker + i) % len(users)]
+    await ctx.request("login", "POST", "/login", json={"email": user["email"], "password": BENCH_PASSWORD})
+
+
+STEPS: Dict[str, Callable] = {
+    "menu": menu_step, "order": order_step, "history": history_step, "chat": chat_step, "login": login_step,
+}
+
+
+async def run_workers(ctx: Context, step: Callable, args):
+    stop_at = time.perf_counter() + args.warmup + args.duration
+
+    async def worker(w: int):
+        i = 0
+        while time.perf_counter() < stop_at:
+            await step(ctx, w, i)
+            i += 1
+
+    async def start_recording():
+        await asyncio.sleep(args.warmup)
+        ctx.recorder.recording = True
+
+    await asyncio.gather(start_recording(), *(worker(w) for w in range(args.concurrency)))
+
+
+async def ws_storm(ctx: Context, args):
+    """PATCH order statuses while many sockets watch those orders; time PATCH → delivery."""
+    import websockets
+
+    orders = ctx.fixtures["order_ids"][:args.ws_orders]
+    sent_at: Dict[tuple, float] = {}
+    delivered = {"count": 0}
+    expected = {"count": 0}
+    watchers = {o: 0 for o in orders}
+    sockets = []
+
+    async def reader(ws):
+        async for raw in ws:
+            msg = json.loads(raw)
+            key = (msg.get("order_id"), msg.get("status"))
+            if msg.get("seq") is not None and key in sent_at:
+                if ctx.recorder.recording:
+                    delivered["count"] += 1
+                ctx.recorder.record("ws_delivery", time.perf_counter() - sent_at[key], "event", True)
+
+    admin_qs = f"?token={ctx.fixtures['admin_token']}"
+    for n in range(args.ws_clients + args.ws_admins):
+        admin = n >= args.ws_clients
+        ws = await websockets.connect(ctx.ws_url + "/ws/events" + (admin_qs if admin else ""), max_queue=None)
+        if admin:
+            await ws.send(json.dumps({"action": "subscribe", "channel": "admin"}))
+        else:
+            order_id = orders[n % len(orders)]
+            watchers[order_id] += 1
+            await ws.send(json.dumps({"action": "subscribe", "orders": [order_id]}))
+        await ws.recv()   # "subscribed"
+        sockets.append(ws)
+    readers = [asyncio.create_task(reader(ws)) for ws in sockets]
+
+    next_status = {o: 0 for o in orders}
+    interval = 1 / args.ws_rate
+    start = time.perf_counter()
+    stop_at = start + args.warmup + args.duration
+    n = 0
+    pending = set()
+
+    async def patch(order_id: str, status: str):
+        sent_at[(order_id, status)] = time.perf_counter()
+        await ctx.request("status_patch", "PATCH", f"/api/v1/order/{order_id}/status", json={"status": status})
+
+    while time.perf_counter() < stop_at:
+        if not ctx.recorder.recording and time.perf_counter() >= start + args.warmup:
+            ctx.recorder.recording = True
+        order_id = orders[n % len(orders)]
+        status = STATUSES[next_status[order_id] % len(STATUSES)]
+        next_status[order_id] += 1
+        if ctx.recorder.recording:
+            expected["count"] += watchers[order_id] + args.ws_admins
+        task = asyncio.create_task(patch(order_id, status))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        n += 1
+        await asyncio.sleep(max(0.0, start + n * interval - time.perf_counter()))
+
+    await asyncio.gather(*pending)
+    await asyncio.sleep(1.0)   # let the last fan-outs land
+    ctx.recorder.recording = False
+    for task in readers:
+        task.cancel()
+    await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+    ctx.recorder.extra.update({
+        "sockets":          len(sockets),
+        "events_expected":  expected["count"],
+        "events_delivered": delivered["count"],
+        "delivery_ratio":   round(delivered["count"] / expected["count"], 4) if expected["count"] else None,
+    })
+
+
+# ===============================
+# Reporting
+# ===============================
+def print_scenario(name: str, result: dict):
+    print(f"\n── {name}: {result['throughput']:,.1f} req/s over {result['duration_s']:g}s")
+    print(f"   {'request':<22}{'count':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for req, r in sorted(result["requests"].items()):
+        print(f"   {req:<22}{r['count']:>8}{r['errors']:>6}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+        odd = {s: c for s, c in r["statuses"].items() if s not in ("200", "event")}
+        if odd:
+            print(f"   {'':<22}statuses: {odd}")
+        if r["count"] and r["errors"] == r["count"]:
+            print(f"   {'':<22}✗ EVERY {req} REQUEST FAILED — these numbers are meaningless")
+    if result["extra"]:
+        print("   " + ", ".join(f"{k}={v}" for k, v in result["extra"].items()))
+
+
+def broken_requests(results: dict) -> List[str]:
+    """'scenario/request' for every request that failed 100% of the time."""
+    return [f"{scenario}/{req}"
+            for scenario, result in results["scenarios"].items()
+            for req, r in result["requests"].items()
+            if r["count"] and r["errors"] == r["count"]]
+
+
+def compare(results: dict, baseline: dict) -> float:
+    """Print p95 / throughput deltas per request; returns the worst p95 regression in percent."""
+    worst = 0.0
+    print("\n── vs baseline (p95 / rps, + is slower / more)")
+    for scenario, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if not base:
+            continue
+        for req, r in sorted(result["requests"].items()):
+            b = base["requests"].get(req)
+            if not b or not b["p95_ms"] or not b["rps"]:
+                continue
+            p95 = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100
+            rps = (r["rps"] - b["rps"]) / b["rps"] * 100
+            worst = max(worst, p95)
+            print(f"   {scenario + '/' + req:<34} p95 {b['p95_ms']:>8.1f} → {r['p95_ms']:>8.1f} ms ({p95:+6.1f}%)"
+                  f"   rps {b['rps']:>8.1f} → {r['rps']:>8.1f} ({rps:+6.1f}%)")
+    return worst
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===============================
+# Main
+# ===============================
+async def run(args) -> dict:
+    import httpx
+    import uvicorn
+    import db as db_module
+    from fake_mongo import FakeClient, FakeDatabase
+
+    rng = random.Random(args.seed)
+    fixtures = build_fixtures(args, rng)
+
+    if args.mongo_uri:
+        if "bench" not in args.mongo_db:
+            raise SystemExit("--mongo-db must contain 'bench': it is dropped before seeding")
+        database = await db_module.connect_to_mongo()
+        await database.client.drop_database(args.mongo_db)
+    else:
+        database = FakeDatabase(latency=args.db_latency_ms / 1000)
+        db_module.client, db_module.database = FakeClient(database), database
+    await seed(database, fixtures)
+
+    from main import app   # after the env and database are in place
+
+    server = server_task = None
+    ws_url = None
+    if args.mode == "uvicorn":
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                               ws="websockets", lifespan="on"))
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if server_task.done():
+                server_task.result()
+            await asyncio.sleep(0.02)
+        base_url, ws_url = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}"
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=None))
+    else:
+        await app.router.startup()
+        base_url = "http://bench"
+        transport = httpx.ASGITransport(app=app)
+
+    results = {"meta": {
+        "started_at": datetime.utcnow().isoformat(),
+        "git":        git_revision(),
+        "python":     platform.python_version(),
+        "args":       vars(args),
+    }, "scenarios": {}}
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+                if name not in SCENARIOS:
+                    raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+                if name == "ws_storm" and ws_url is None:
+                    print(f"\n── {name}: skipped (needs --mode uvicorn)")
+                    continue
+                ctx = Context(client, fixtures, Recorder(), ws_url)
+                measured_from = time.perf_counter() + args.warmup
+                if name == "ws_storm":
+                    await ws_storm(ctx, args)
+                else:
+                    await run_workers(ctx, STEPS[name], args)
+                result = ctx.recorder.summary(min(args.duration, time.perf_counter() - measured_from))
+                results["scenarios"][name] = result
+                print_scenario(name, result)
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+        else:
+            await app.router.shutdown()
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    from fake_upstreams import UpstreamServer, settings
+
+    settings.update({
+        "gemini_latency_ms":   args.gemini_latency_ms,
+        "gemini_429_rate":     args.gemini_429_rate,
+        "razorpay_latency_ms": args.razorpay_latency_ms,
+    })
+    upstreams = UpstreamServer(free_port()).start()
+    configure_env(args, upstreams.url)
+    try:
+        results = asyncio.run(run(args))
+    finally:
+        upstreams.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    broken = broken_requests(results)
+    if broken:
+        print(f"\n✗ Every request failed for: {', '.join(broken)}")
+        return 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            worst = compare(results, json.load(f))
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"\n✗ p95 regressed {worst:.1f}% (limit {args.max_regression:g}%)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
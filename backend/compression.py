@@ -0,0 +1,240 @@
+# compression.py
+"""
+gzip / brotli response compression.
+
+Two paths:
+  • CompressionMiddleware compresses dynamic responses (order history, admin
+    order pages, exports) on the fly, picking the best encoding the client
+    offers in Accept-Encoding. Bodies under COMPRESSION_MIN_BYTES and types
+    that don't compress (images, SSE streams) pass through untouched.
+    Streaming responses are compressed chunk by chunk. An ETag on a response
+    it encodes gets an encoding suffix ("<hash>-gzip"), so the identity and
+    encoded representations never share a validator.
+  • PrecompressedBody holds the encoded variants of a body that is cached by
+    version (the menu and categories snapshots). prepare() compresses every
+    variant once, at a higher level, when the version is built — in a worker
+    thread, since brotli at quality 11 is too slow for the event loop.
+    http_cache.etag_response serves them; the middleware leaves responses
+    that already carry Content-Encoding alone.
+
+Levels trade CPU for bandwidth:
+    COMPRESSION_MIN_BYTES        smallest body worth compressing      (1024)
+    GZIP_LEVEL / BROTLI_QUALITY  per-request compression              (6 / 4)
+    PRECOMPRESS_GZIP_LEVEL       once-per-version compression         (9)
+    PRECOMPRESS_BROTLI_QUALITY                                        (11)
+
+Brotli is used when the `brotli` package is installed; otherwise only gzip
+is offered.
+"""
+import os
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+COMPRESSION_MIN_BYTES      = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL                 = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY             = int(os.getenv("BROTLI_QUALITY", "4"))
+PRECOMPRESS_GZIP_LEVEL     = int(os.getenv("PRECOMPRESS_GZIP_LEVEL", "9"))
+PRECOMPRESS_BROTLI_QUALITY = int(os.getenv("PRECOMPRESS_BROTLI_QUALITY", "11"))
+
+# Server preference when the client accepts several at the same q-value
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "text/plain", "text/html", "text/css", "text/csv", "text/javascript", "image/svg+xml",
+)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best encoding we support from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = offered.get(encoding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY if level is None else level)
+    compressor = zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush every chunk so streamed rows reach the client without waiting for more
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br is not None else self._gz.flush()
+
+
+class PrecompressedBody:
+    """A cached body plus its compressed variants, each built once per version."""
+
+    __slots__ = ("identity", "_variants")
+
+    def __init__(self, identity: bytes):
+        self.identity = identity
+        self._variants: Dict[str, bytes] = {}
+
+    def prepare(self) -> "PrecompressedBody":
+        """Build every variant now. Blocking — run it with asyncio.to_thread."""
+        for encoding in ENCODINGS:
+            self.variant(encoding)
+        return self
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        if encoding is None or len(self.identity) < COMPRESSION_MIN_BYTES:
+            return self.identity
+        data = self._variants.get(encoding)
+        if data is None:
+            level = PRECOMPRESS_BROTLI_QUALITY if encoding == "br" else PRECOMPRESS_GZIP_LEVEL
+            data = self._variants[encoding] = compress(self.identity, encoding, level)
+        return data
+
+    def encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if len(self.identity) < COMPRESSION_MIN_BYTES:
+            return None
+        return choose_encoding(accept_encoding)
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _tag_etag(headers: list, encoding: str) -> list:
+    """Give an ETag an encoding suffix, matching http_cache's precompressed variants."""
+    out = []
+    for key, value in headers:
+        if key.lower() == b"etag" and value.endswith(b'"'):
+            value = value[:-1] + b"-" + encoding.encode("latin-1") + b'"'
+        out.append((key, value))
+    return out
+
+
+def _add_vary(headers: list):
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+class CompressionMiddleware:
+    """Pure ASGI, so streaming responses stay streaming."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = None
+        if_none_match = b""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+            elif key == b"if-none-match":
+                if_none_match = value
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None          # held http.response.start message
+        compressor = None     # set once we've decided to compress a streamed body
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] == 304 and if_none_match:
+                    # Revalidated a representation we encoded: answer with the tag the client holds
+                    tagged = _tag_etag(headers, encoding)
+                    if any(v in if_none_match for k, v in tagged if k.lower() == b"etag"):
+                        message = {**message, "headers": tagged}
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if (_header(headers, b"content-encoding") is not None
+                        or message["status"] in (204, 304)
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            headers = list(start["headers"]) if start is not None else None
+
+            if compressor is None and start is not None:
+                if not more and len(body) < self.minimum_size:
+                    # Too small to be worth it; still varies by Accept-Encoding
+                    _add_vary(headers)
+                    await send({**start, "headers": headers})
+                    passthrough = True
+                    return await send(message)
+
+                headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                headers = _tag_etag(headers, encoding)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                _add_vary(headers)
+                if not more:
+                    data = compress(body, encoding)
+                    headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    await send({**start, "headers": headers})
+                    start = None
+                    passthrough = True
+                    return await send({"type": "http.response.body", "body": data})
+                compressor = _StreamCompressor(encoding)
+                await send({**start, "headers": headers})
+                start = None
+
+            data = compressor.chunk(body) if body else b""
+            if not more:
+                data += compressor.finish()
+            if data or not more:
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,46 +1,214 @@
 import motor.motor_asyncio
+from metrics import command_timer
+from logger import get_logger
 from dotenv import load_dotenv
+from pymongo import ReadPreference
+from pymongo.monitoring import ConnectionPoolListener
 import os
 import asyncio
+import random
+import threading
+import time
 
 # Load environment variables
 load_dotenv()
 
+log = get_logger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB", "restaurant_db")
 
+# ── Pool ──
+MONGO_MAX_POOL_SIZE          = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE          = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS            = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))      # close idle sockets after 5 min
+MONGO_WAIT_QUEUE_TIMEOUT_MS  = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))  # fail fast when the pool is exhausted
+
+# ── Connect retries: exponential backoff with full jitter ──
+MONGO_CONNECT_RETRIES        = int(os.getenv("MONGO_CONNECT_RETRIES", "0"))       # 0 = keep trying forever
+MONGO_BACKOFF_BASE           = float(os.getenv("MONGO_BACKOFF_BASE", "0.5"))
+MONGO_BACKOFF_MAX            = float(os.getenv("MONGO_BACKOFF_MAX", "30"))
+
+# ── Read routing ──
+# "route=mode" pairs. A route is a collection name, or a named query path that
+# opts in via read_collection(db, collection, route): order_history and
+# order_export today. Everything else reads from the primary. Admin exports
+# are large scans better kept off the primary. The menu cache rebuild always
+# reads the primary: it runs right after a change event, and a lagging
+# secondary would hand it the old menu with nothing to re-read it. Add
+# order_history=secondaryPreferred to move history pages too, at the cost of
+# a just-placed order occasionally showing up a moment late.
+MONGO_READ_PREFERENCES = os.getenv(
+    "MONGO_READ_PREFERENCES", "order_export=secondaryPreferred"
+)
+
+_READ_MODES = {
+    "primary":            ReadPreference.PRIMARY,
+    "primaryPreferred":   ReadPreference.PRIMARY_PREFERRED,
+    "secondary":          ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest":            ReadPreference.NEAREST,
+}
+
+
+def _parse_read_preferences(spec: str) -> dict:
+    routes = {}
+    for pair in filter(None, (p.strip() for p in spec.split(","))):
+        route, _, mode = pair.partition("=")
+        if mode.strip() not in _READ_MODES:
+            raise ValueError(f"❌ MONGO_READ_PREFERENCES: unknown read mode in {pair!r}")
+        routes[route.strip()] = _READ_MODES[mode.strip()]
+    return routes
+
+
+READ_ROUTES = _parse_read_preferences(MONGO_READ_PREFERENCES)
+
 client = None
 database = None
+_warned_missing = False
+
+
+# ===============================
+# Pool monitoring
+# ===============================
+class PoolStats(ConnectionPoolListener):
+    """
+    Connection-pool gauges fed by pymongo's monitoring hooks.
+    Events fire on whichever thread checks a connection out, so counters are
+    guarded by a lock and checkout waits are timed per thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.in_use = 0
+        self.in_use_peak = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    # ── checkouts ──
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = self._wait_ms(event)
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.in_use_peak = max(self.in_use_peak, self.in_use)
+            self.checkouts += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def _wait_ms(self, event) -> float:
+        duration = getattr(event, "duration", None)   # pymongo ≥ 4.7 times it for us
+        if duration is not None:
+            return duration * 1000
+        started = getattr(self._local, "started", None)
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    # ── connections ──
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    # Required by the interface; nothing to count
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size":     MONGO_MAX_POOL_SIZE,
+                "open":              self.open,
+                "in_use":            self.in_use,
+                "in_use_peak":       self.in_use_peak,
+                "waiting":           self.waiting,
+                "checkouts":         self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_ms_avg":       round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_ms_max":       round(self.wait_ms_max, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+# ===============================
+# Connection
+# ===============================
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(MONGO_BACKOFF_MAX, MONGO_BACKOFF_BASE * (2 ** attempt)))
 
 
 async def connect_to_mongo():
     """
     Connect to MongoDB Atlas (async).
-    Retries automatically if connection fails.
+    Retries with exponential backoff and jitter if connection fails —
+    forever unless MONGO_CONNECT_RETRIES is set.
     """
     global client, database
 
-    if client and database:
+    if client is not None and database is not None:
         return database
 
-    try:
-        print("⏳ Connecting to MongoDB Atlas...")
-        if not MONGO_URI:
-            raise ValueError("❌ MONGO_URI missing in .env")
+    if not MONGO_URI:
+        raise ValueError("❌ MONGO_URI missing in .env")
 
-        client = motor.motor_asyncio.AsyncIOMotorClient(
-            MONGO_URI, serverSelectionTimeoutMS=5000
-        )
-        await client.server_info()  # Ping server to confirm connection
-        database = client[MONGO_DB]
+    attempt = 0
+    while True:
+        try:
+            log.info("Connecting to MongoDB Atlas", attempt=attempt + 1)
+            client = motor.motor_asyncio.AsyncIOMotorClient(
+                MONGO_URI,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[pool_stats, command_timer],
+            )
+            await client.server_info()  # Ping server to confirm connection
+            database = client[MONGO_DB]
 
-        print(f"✅ Connected to MongoDB Atlas successfully! Database: {MONGO_DB}")
-        return database
+            log.info("Connected to MongoDB Atlas", db=MONGO_DB,
+                     pool_min=MONGO_MIN_POOL_SIZE, pool_max=MONGO_MAX_POOL_SIZE)
+            return database
 
-    except Exception as e:
-        print("❌ MongoDB connection failed:", e)
-        await asyncio.sleep(5)
-        return await connect_to_mongo()  # Retry recursively
+        except Exception as e:
+            if client:
+                client.close()
+                client = None
+            attempt += 1
+            if MONGO_CONNECT_RETRIES and attempt >= MONGO_CONNECT_RETRIES:
+                log.error("MongoDB connection failed", attempts=attempt, error=e)
+                raise
+            delay = _backoff(attempt)
+            log.warning("MongoDB connection failed, retrying", attempt=attempt, error=e, retry_in=round(delay, 1))
+            await asyncio.sleep(delay)
 
 
 def get_database():
@@ -49,15 +217,28 @@ def get_database():
     Returns None if not connected yet.
     (FastAPI will auto-connect during startup)
     """
-    global database
-    if database is None:
-        print("⚠️ Database instance not found. Run connect_to_mongo() first.")
+    global _warned_missing
+    if database is None and not _warned_missing:
+        # Once, not per request — every handler calls this
+        _warned_missing = True
+        log.warning("Database instance not found. Run connect_to_mongo() first.")
     return database
 
 
+def read_collection(db, collection: str, route: str = None):
+    """
+    `collection` for reads, with the read preference configured for `route`
+    (defaults to the collection name) in MONGO_READ_PREFERENCES. Reads that
+    must see the caller's own writes should keep using db[collection].
+    """
+    pref = READ_ROUTES.get(route or collection)
+    if pref is None:
+        return db[collection]
+    return db.get_collection(collection, read_preference=pref)
+
+
 async def close_mongo_connection():
     """Gracefully close MongoDB connection."""
-    global client
     if client:
         client.close()
-        print("🔒 MongoDB connection closed.")
\ No newline at end of file
+        log.info("MongoDB connection closed")
\ No newline at end of file
@@ -0,0 +1,210 @@
+# db_indexes.py
+"""
+Declarative index registry for the hot query paths.
+
+INDEXES lists every index the app relies on. ensure_indexes() creates them
+one by one at startup, in the background so readiness never waits on an index
+build. createIndex is a no-op for an index that already exists with the same
+spec, so this is safe to run on every boot. An index that can't be built
+(e.g. a unique index over existing duplicates) is logged and skipped. The
+other indexes are still created.
+
+Indexes that enforce correctness rather than speed (the reservation slot
+index is what prevents double booking) are listed in REQUIRED and built
+synchronously by ensure_required() before the app starts serving. Callers
+check index_ready() and keep their own pre-insert check while it is False.
+
+HOT_QUERIES mirrors the queries the routes actually run. report() explains
+each one and flags any plan that still scans the whole collection (COLLSCAN)
+or sorts in memory (SORT):
+
+    cd backend && python db_indexes.py ensure
+    cd backend && python db_indexes.py report
+
+The same report is served at GET /api/v1/admin/index-report.
+"""
+import asyncio
+import sys
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "orders": [
+        # Order history: find({user_email}).sort(timestamp desc, _id desc), keyset-paged
+        IndexModel([("user_email", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="user_email_timestamp_id"),
+        # Admin order list/export, keyset-paged, optionally filtered by status
+        IndexModel([("status", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="status_timestamp_id"),
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_id"),
+    ],
+    "ratings": [
+        # One rating per user per dish — also backs the submit_rating upsert
+        IndexModel([("dish_id", ASCENDING), ("user_email", ASCENDING)], name="dish_user", unique=True),
+        IndexModel([("dish_id", ASCENDING), ("updated_at", DESCENDING)], name="dish_updated_at"),
+        IndexModel([("user_email", ASCENDING), ("dish_id", ASCENDING)], name="user_dish"),
+    ],
+    "reservations": [
+        # One booking per table per slot; date leads so the availability grid
+        # for a whole day is a single index range
+        IndexModel([("date", ASCENDING), ("time", ASCENDING), ("tableNo", ASCENDING)],
+                   name="date_time_table", unique=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+    ],
+}
+
+# (collection, index name) pairs that guard data integrity, not just speed
+REQUIRED = [
+    ("reservations", "date_time_table"),
+]
+
+# (name, collection, filter, sort, limit) — the shapes matter, not the sample values
+HOT_QUERIES = [
+    ("order_history",     "orders",       {"user_email": "report@example.com"}, [("timestamp", -1), ("_id", -1)], 21),
+    ("orders_by_status",  "orders",       {"status": "Pending"},                None,                0),
+    ("admin_orders",      "orders",       {},                                   [("timestamp", -1), ("_id", -1)], 51),
+    ("admin_orders_status", "orders",     {"status": "Pending"},                [("timestamp", -1), ("_id", -1)], 51),
+    ("ratings_by_dish",   "ratings",      {"dish_id": "report"},                [("updated_at", -1)], 20),
+    ("user_dish_rating",  "ratings",      {"dish_id": "report", "user_email": "report@example.com"}, None, 0),
+    ("user_ratings",      "ratings",      {"user_email": "report@example.com", "dish_id": {"$in": ["report"]}}, None, 0),
+    ("reservation_slot",  "reservations", {"tableNo": 1, "date": "2000-01-01", "time": "12:00"}, None, 0),
+    ("reservation_day",   "reservations", {"date": "2000-01-01"},             None,                0),
+    ("user_by_email",     "users",        {"email": "report@example.com"},      None,                0),
+]
+
+# Result of the last ensure_indexes() run: {"collection.index": "ok" | error}
+index_status: Dict[str, str] = {}
+
+
+async def _ensure(db, collection: str, model: IndexModel) -> bool:
+    name = model.document["name"]
+    try:
+        await db[collection].create_indexes([model])
+        index_status[f"{collection}.{name}"] = "ok"
+        return True
+    except PyMongoError as e:
+        index_status[f"{collection}.{name}"] = str(e)
+        log.warning("Index not created", index=f"{collection}.{name}", error=e)
+        return False
+
+
+def index_ready(collection: str, name: str) -> bool:
+    """True once ensure_*() has confirmed the index exists."""
+    return index_status.get(f"{collection}.{name}") == "ok"
+
+
+async def ensure_required(db) -> bool:
+    """Build the REQUIRED indexes now; False if any of them couldn't be created."""
+    ok = True
+    for collection, name in REQUIRED:
+        model = next(m for m in INDEXES[collection] if m.document["name"] == name)
+        if not await _ensure(db, collection, model):
+            log.error("Required index missing, falling back to pre-insert checks", index=f"{collection}.{name}")
+            ok = False
+    return ok
+
+
+async def ensure_indexes(db) -> Dict[str, str]:
+    for collection, models in INDEXES.items():
+        for model in models:
+            await _ensure(db, collection, model)
+    failed = sum(1 for v in index_status.values() if v != "ok")
+    log.info("Indexes ensured", ok=len(index_status) - failed, failed=failed)
+    return dict(index_status)
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Stage names of a winning plan, outermost first."""
+    stages = [plan.get("stage", "?")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    # Slot-based engine (SBE) plans nest the classic plan under queryPlan
+    if "queryPlan" in plan:
+        stages += _plan_stages(plan["queryPlan"])
+    return stages
+
+
+async def explain_query(db, collection: str, filter: dict, sort=None, limit: int = 0) -> dict:
+    command = {"find": collection, "filter": filter}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    result = await db.command({"explain": command, "verbosity": "queryPlanner"})
+    stages = _plan_stages(result["queryPlanner"]["winningPlan"])
+    index_names = []
+    _collect_index_names(result["queryPlanner"]["winningPlan"], index_names)
+    return {
+        "stages":    stages,
+        "indexes":   index_names,
+        "collscan":  "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+    }
+
+
+def _collect_index_names(plan: dict, out: List[str]):
+    if plan.get("indexName"):
+        out.append(plan["indexName"])
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            _collect_index_names(plan[key], out)
+    for child in plan.get("inputStages", []):
+        _collect_index_names(child, out)
+
+
+async def report(db) -> dict:
+    """Explain every hot query; `ok` is False if any of them scans its collection."""
+    queries = []
+    for name, collection, filter, sort, limit in HOT_QUERIES:
+        entry = {"name": name, "collection": collection}
+        try:
+            entry.update(await explain_query(db, collection, filter, sort, limit))
+        except PyMongoError as e:
+            entry["error"] = str(e)
+        queries.append(entry)
+    return {
+        "ok":      not any(q.get("collscan") or "error" in q for q in queries),
+        "queries": queries,
+        "indexes": dict(index_status),
+    }
+
+
+async def _main(argv):
+    from db import connect_to_mongo, close_mongo_connection
+
+    if argv[1:] not in (["ensure"], ["report"]):
+        print("usage: python db_indexes.py ensure|report")
+        return 2
+    db = await connect_to_mongo()
+    if argv[1] == "ensure":
+        status = await ensure_indexes(db)
+        code = 0 if all(v == "ok" for v in status.values()) else 1
+    else:
+        result = await report(db)
+        for q in result["queries"]:
+            if "error" in q:
+                flag = "❌ " + q["error"]
+            elif q["collscan"]:
+                flag = "❌ COLLSCAN"
+            elif q["in_memory_sort"]:
+                flag = "⚠️ in-memory SORT"
+            else:
+                flag = "✅"
+            print(f"{q['name']:<18} {q['collection']:<13} {' > '.join(q.get('stages', [])):<40} {flag}")
+        code = 0 if result["ok"] else 1
+    await close_mongo_connection()
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv)))
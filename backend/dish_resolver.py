@@ -0,0 +1,171 @@
+# dish_resolver.py
+"""
+In-memory dish-name resolver for "add X and Y to cart".
+
+Replaces the per-dish `$regex` lookups (up to two Mongo round trips per name,
+the second unanchored and unindexable) with structures built once per menu
+snapshot version:
+
+  • a prefix trie over full dish names  — "paneer ti" → "Paneer Tikka"
+  • a prefix trie over name tokens      — "tikka"     → "Paneer Tikka"
+  • bounded edit distance over tokens   — "panner"    → "Paneer Tikka"
+
+All names from one message are resolved in a single call with no I/O.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Minimum average per-token similarity for a fuzzy/token match to count
+MIN_SCORE = 0.6
+
+_WS_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return _WS_RE.sub(" ", str(text).lower()).strip()
+
+
+def _max_edits(token: str) -> int:
+    """Typos tolerated for a token: none for very short words, more for long ones."""
+    if len(token) <= 3:
+        return 0
+    if len(token) <= 6:
+        return 1
+    return 2
+
+
+def _bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """Edit distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class PrefixTrie:
+    """Character trie; each node keeps (under the None key) the positions of keys below it."""
+
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root: dict = {}
+
+    def insert(self, key: str, pos: int):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+            bucket = node.setdefault(None, [])
+            if not bucket or bucket[-1] != pos:
+                bucket.append(pos)
+
+    def positions(self, prefix: str) -> List[int]:
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get(None, [])
+
+
+class DishResolver:
+    def __init__(self, version: int, items: list):
+        self.version = version
+        self.items = items
+        self.exact: Dict[str, int] = {}
+        self.names = PrefixTrie()
+        self.tokens = PrefixTrie()
+        self.vocab: Dict[str, List[int]] = {}
+
+        for pos, item in enumerate(items):
+            name = _normalize(item.get("name", ""))
+            if not name:
+                continue
+            self.exact.setdefault(name, pos)
+            self.names.insert(name, pos)
+            for tok in set(_TOKEN_RE.findall(name)):
+                self.tokens.insert(tok, pos)
+                self.vocab.setdefault(tok, []).append(pos)
+
+    def _name_len(self, pos: int) -> int:
+        return len(self.items[pos].get("name", ""))
+
+    def _token_scores(self, token: str) -> Dict[int, float]:
+        """Best similarity of `token` against each item's name tokens."""
+        scores: Dict[int, float] = {}
+        for pos in self.vocab.get(token, ()):
+            scores[pos] = 1.0
+        for pos in self.tokens.positions(token):
+            scores.setdefault(pos, 0.9)
+        if scores:
+            return scores
+
+        limit = _max_edits(token)
+        if limit == 0:
+            return scores
+        for tok, positions in self.vocab.items():
+            d = _bounded_levenshtein(token, tok, limit)
+            if d <= limit:
+                sim = 1.0 - d / max(len(token), len(tok))
+                for pos in positions:
+                    if sim > scores.get(pos, 0.0):
+                        scores[pos] = sim
+        return scores
+
+    def resolve(self, query: str, limit: int = 3) -> List[Tuple[dict, float]]:
+        """Ranked (item, score) candidates for one dish name, best first."""
+        q = _normalize(query)
+        if not q:
+            return []
+
+        pos = self.exact.get(q)
+        if pos is not None:
+            return [(self.items[pos], 1.0)]
+
+        # Whole-name prefix — shortest name wins, like "^paneer" → "Paneer"
+        prefixed = self.names.positions(q)
+        if prefixed:
+            ranked = sorted(prefixed, key=lambda p: (self._name_len(p), p))
+            return [(self.items[p], 0.95) for p in ranked[:limit]]
+
+        q_tokens = _TOKEN_RE.findall(q)
+        if not q_tokens:
+            return []
+        totals: Dict[int, float] = {}
+        for tok in q_tokens:
+            for p, sim in self._token_scores(tok).items():
+                totals[p] = totals.get(p, 0.0) + sim
+
+        scored = [(p, total / len(q_tokens)) for p, total in totals.items()]
+        scored = [(p, s) for p, s in scored if s >= MIN_SCORE]
+        scored.sort(key=lambda ps: (-ps[1], self._name_len(ps[0]), ps[0]))
+        return [(self.items[p], round(s, 3)) for p, s in scored[:limit]]
+
+    def resolve_many(self, names: List[str]) -> List[Tuple[str, Optional[dict]]]:
+        """Resolve every dish name from one message; None where nothing matched."""
+        out = []
+        for name in names:
+            candidates = self.resolve(name, limit=1)
+            out.append((name, candidates[0][0] if candidates else None))
+        return out
+
+
+_resolver: Optional[DishResolver] = None
+
+
+def get_dish_resolver(snapshot) -> DishResolver:
+    """Return the resolver for this snapshot, rebuilding only when the version changed."""
+    global _resolver
+    if _resolver is None or _resolver.version != snapshot.version:
+        _resolver = DishResolver(snapshot.version, snapshot.items)
+    return _resolver
@@ -0,0 +1,40 @@
+# fast_json.py
+"""
+orjson-based encoding for responses built straight from Mongo documents.
+
+FastAPI's default path runs jsonable_encoder over the whole return value and
+then json.dumps over the result, and our handlers first walked every document
+to turn `_id` into a string. Returning FastJSONResponse(docs) skips all
+three: orjson serializes dicts, lists, str/int/float and datetime in C, and
+only calls back into Python for ObjectIds.
+
+    return FastJSONResponse({"orders": orders, "next_cursor": next_cursor})
+
+The response must be returned directly — a plain dict returned from a route
+still goes through jsonable_encoder even with response_class set.
+"""
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+# Dict keys may be ints (e.g. rating histograms built in Python)
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    """Compact UTF-8 JSON; ObjectIds become their hex strings, datetimes RFC 3339."""
+    return orjson.dumps(data, default=_default, option=OPTIONS)
+
+
+loads = orjson.loads
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -8,8 +8,14 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise RuntimeError("GEMINI_API_KEY is not set in your .env file!")
 
+# Optional override so tests / load runs can point at a local fake Gemini server
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
 # ✅ New google-genai client (replaces old google-generativeai library)
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+gemini_client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None,
+)
 
 # ✅ gemini-2.0-flash: free tier, fast, great for chat/recommendations
 GEMINI_MODEL = "gemini-2.0-flash"
\ No newline at end of file
@@ -0,0 +1,165 @@
+# gemini_gateway.py
+"""
+Dedicated async gateway for Gemini calls.
+
+Every Foodie AI completion goes through here instead of the default thread
+pool executor:
+
+  • native async SDK calls (client.aio) — no executor threads at all
+  • a concurrency cap plus a bounded wait queue; overflow fails fast with
+    GeminiOverloaded so callers can serve the menu-only fallback
+  • identical prompts already in flight share one upstream call
+  • streaming completions (stream) under the same cap, queue and pacing
+  • a client-side token bucket that paces requests below the quota, so we slow
+    down before Google starts answering 429 RESOURCE_EXHAUSTED
+
+Point GEMINI_BASE_URL (see gemini_config.py) at a local fake server to
+exercise the gateway without a real API key quota.
+"""
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict
+
+from gemini_config import gemini_client, GEMINI_MODEL
+from metrics import track_upstream
+
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_MAX_QUEUE       = int(os.getenv("GEMINI_MAX_QUEUE", "32"))
+GEMINI_RPM             = float(os.getenv("GEMINI_RPM", "15"))   # 0 disables pacing
+GEMINI_BURST           = int(os.getenv("GEMINI_BURST", "5"))
+GEMINI_TIMEOUT         = float(os.getenv("GEMINI_TIMEOUT", "30"))
+
+
+class GeminiOverloaded(Exception):
+    """Raised when the gateway queue is full; treat like an upstream 429."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = rate_per_sec
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class GeminiGateway:
+    def __init__(
+        self,
+        client=gemini_client,
+        model: str = GEMINI_MODEL,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        max_queue: int = GEMINI_MAX_QUEUE,
+        rpm: float = GEMINI_RPM,
+        burst: int = GEMINI_BURST,
+        timeout: float = GEMINI_TIMEOUT,
+    ):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rpm / 60.0, burst)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._streams = 0
+
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+
+    @property
+    def pending(self) -> int:
+        """Upstream calls (and streams) running or waiting for a slot."""
+        return len(self._inflight) + self._streams
+
+    async def generate(self, prompt: str) -> str:
+        """Return the completion text for `prompt`."""
+        task = self._inflight.get(prompt)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if self.pending >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise GeminiOverloaded("Gemini gateway queue is full")
+            task = asyncio.create_task(self._call(prompt))
+            self._inflight[prompt] = task
+            task.add_done_callback(lambda t, p=prompt: self._done(p, t))
+        # shield: one caller disconnecting must not cancel the call others share
+        return await asyncio.shield(task)
+
+    def _done(self, prompt: str, task: asyncio.Task):
+        if self._inflight.get(prompt) is task:
+            del self._inflight[prompt]
+        # Mark the exception retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    async def _call(self, prompt: str) -> str:
+        await self._bucket.acquire()
+        async with self._semaphore:
+            self.calls += 1
+            try:
+                with track_upstream("gemini", "generate_content"):
+                    response = await asyncio.wait_for(
+                        self.client.aio.models.generate_content(model=self.model, contents=prompt),
+                        timeout=self.timeout,
+                    )
+            except Exception:
+                self.errors += 1
+                raise
+        return (response.text or "").strip()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield completion text chunks as Gemini produces them. Streams are never coalesced."""
+        if self.pending >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise GeminiOverloaded("Gemini gateway queue is full")
+        self._streams += 1
+        try:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                self.calls += 1
+                try:
+                    with track_upstream("gemini", "generate_content_stream"):
+                        chunks = await self.client.aio.models.generate_content_stream(model=self.model, contents=prompt)
+                        async for chunk in chunks:
+                            if chunk.text:
+                                yield chunk.text
+                except Exception:
+                    self.errors += 1
+                    raise
+        finally:
+            self._streams -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue":       self.max_queue,
+            "pending":         self.pending,
+            "streams":         self._streams,
+            "calls":           self.calls,
+            "coalesced":       self.coalesced,
+            "rejected":        self.rejected,
+            "errors":          self.errors,
+            "tokens":          round(self._bucket.tokens, 2),
+        }
+
+
+gemini_gateway = GeminiGateway()
@@ -0,0 +1,63 @@
+# http_cache.py
+"""Strong-ETag helpers for endpoints that serve pre-encoded JSON bodies."""
+import hashlib
+from typing import Optional, Union
+
+from fastapi import Request, Response
+
+from fast_json import dumps as encode_json   # compact UTF-8 JSON, ObjectId-aware
+from compression import PrecompressedBody
+
+# Encoded variants get their own strong ETag: "<hash>-br", "<hash>-gzip"
+_ENCODING_SUFFIXES = ('-br"', '-gzip"')
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _strip_encoding(tag: str) -> str:
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value matches `etag` (in any content encoding)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        # If-None-Match uses the weak comparison function (RFC 9110 §13.1.2)
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if _strip_encoding(tag) == etag:
+            return True
+    return False
+
+
+def etag_response(request: Request, body: Union[bytes, PrecompressedBody], etag: str,
+                  headers: Optional[dict] = None) -> Response:
+    """
+    200 with `body`, or an empty 304 if the client already has this ETag.
+
+    A PrecompressedBody is served in the best encoding the client accepts,
+    from bytes compressed once per version rather than per request.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if isinstance(body, PrecompressedBody):
+        encoding = body.encoding_for(request.headers.get("Accept-Encoding"))
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["ETag"] = etag[:-1] + "-" + encoding + '"'
+            headers["Content-Encoding"] = encoding
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        body = body.variant(encoding)
+    elif etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,157 @@
+# intent_engine.py
+"""
+Single-pass intent classification for Foodie AI.
+
+All chat intent patterns and menu-filter keywords are folded into one regex,
+compiled at import. A single `finditer` over the lower-cased message reports
+every trigger (greetings are a separate anchored match on the first word) and
+we pick the winner by the same priority order `foodie_ai` has always used:
+
+    add_to_cart > place_order > view_cart > greeting > show_menu > ask (Gemini)
+
+The same scan fills in the slots that used to need extra passes: dish names
+for add-to-cart, the "under ₹N" price cap, and which diet/keyword filters
+were mentioned (consumed by get_relevant_items).
+
+Run `python bench/bench_intents.py` to compare against the old chain.
+"""
+import re
+from typing import List, Optional
+
+from menu_index import SPICY_KEYWORDS, VEG_KEYWORDS, NONVEG_KEYWORDS, SWEET_KEYWORDS
+
+INTENT_PRIORITY = ["add_to_cart", "place_order", "view_cart", "greeting", "show_menu"]
+
+# Filter order used by get_relevant_items when picking dishes for Gemini
+FILTER_PRIORITY = ["spicy", "veg", "nonveg", "sweet"]
+
+# Each trigger is (kind, pattern). _add() turns it into "first char, lookahead
+# for the rest, marker group". Every top-level branch of SCANNER therefore
+# starts with a bare literal, which lets `re` use its first-character skip
+# table, and consumes only that one character, so overlapping triggers
+# ("non veg" / "veg", "veggie" / "egg") are all reported.
+_INTENT_TRIGGERS = [
+    ("add_to_cart", r"add (?P<dishes>.+?) to (?:cart|card)"),
+    ("place_order", "place order"),
+    ("place_order", "checkout"),
+    ("place_order", "confirm order"),
+    ("place_order", "order now"),
+    ("view_cart",   "view cart"),
+    ("view_cart",   "show cart"),
+    ("view_cart",   "my cart"),
+    ("view_cart",   r"what.s in.*cart"),
+    ("show_menu",   "show menu"),
+    ("show_menu",   "full menu"),
+    ("show_menu",   "all dishes"),
+    ("show_menu",   r"what.s on the menu"),
+    ("show_menu",   r"what do you (?:have|serve)"),
+    ("price",       r"under (?:₹\s*)?(?P<cap>\d+)"),
+    ("price",       r"less than (?:₹\s*)?(?P<cap>\d+)"),
+]
+
+# Greetings only count at the very start of the message
+GREETING = re.compile(r"(?:hi|hello|hey|howdy|good morning|good evening|good afternoon)\b")
+
+_branches = []
+_kinds = {}
+_slots = {}
+
+
+def _add(kind: str, pattern: str, literal: bool = False):
+    i = len(_kinds)
+    body = re.escape(pattern) if literal else pattern
+    # Slot groups get a per-branch suffix — `re` forbids duplicate group names
+    for slot in ("dishes", "cap"):
+        if f"(?P<{slot}>" in body:
+            body = body.replace(f"(?P<{slot}>", f"(?P<{slot}{i}>")
+            _slots[f"t{i}"] = f"{slot}{i}"
+    head, rest = body[0], body[1:]
+    # Marker group goes last so it closes last and becomes `lastgroup`
+    _branches.append(f"{head}(?={rest})(?P<t{i}>)")
+    _kinds[f"t{i}"] = kind
+
+
+for _kind, _pat in _INTENT_TRIGGERS:
+    _add(_kind, _pat)
+for _kw in NONVEG_KEYWORDS:
+    _add("nonveg:" + _kw, _kw, literal=True)
+for _kind, _words in (("spicy", SPICY_KEYWORDS), ("veg", VEG_KEYWORDS), ("sweet", SWEET_KEYWORDS)):
+    for _kw in _words:
+        _add(_kind, _kw, literal=True)
+
+# Matched against lower-cased text, so no IGNORECASE (which would disable the skip table)
+SCANNER = re.compile("|".join(_branches))
+
+_NONVEG_RANK = {"nonveg:" + kw: i for i, kw in enumerate(NONVEG_KEYWORDS)}
+
+_SPLIT_DISHES = re.compile(r"\band\b|,|&", re.IGNORECASE)
+
+
+class Intent:
+    """Result of classify(): the intent name plus any slots extracted on the way."""
+
+    __slots__ = ("name", "text", "dishes", "raw_dishes", "price_cap", "filters", "nonveg_keyword")
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.dishes: List[str] = []
+        self.raw_dishes: Optional[str] = None
+        self.price_cap: Optional[int] = None
+        self.filters: set = set()
+        self.nonveg_keyword: Optional[str] = None
+
+    @property
+    def diet(self) -> Optional[str]:
+        """Highest-priority filter mentioned: spicy, veg, nonveg or sweet."""
+        return next((f for f in FILTER_PRIORITY if f in self.filters), None)
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, dishes={self.dishes}, price_cap={self.price_cap}, filters={sorted(self.filters)})"
+
+
+def classify(message: str) -> Intent:
+    text = (message or "").strip()
+    lower = text.lower()
+    # str.lower() can change length for a few non-ASCII characters; slots are
+    # sliced out of the original text only when offsets still line up
+    same_offsets = len(lower) == len(text)
+
+    hits = {}
+    nonveg_rank = None
+    for m in SCANNER.finditer(lower):
+        kind = _kinds[m.lastgroup]
+        if kind.startswith("nonveg:"):
+            rank = _NONVEG_RANK[kind]
+            if nonveg_rank is None or rank < nonveg_rank:
+                nonveg_rank = rank
+        elif kind not in hits:
+            hits[kind] = m
+
+    name = next((n for n in INTENT_PRIORITY if n in hits), None)
+    if name is None:
+        name = "greeting" if GREETING.match(lower) else "ask"
+    elif INTENT_PRIORITY.index(name) > INTENT_PRIORITY.index("greeting") and GREETING.match(lower):
+        name = "greeting"
+    intent = Intent(name, text)
+
+    if name == "add_to_cart":
+        m = hits["add_to_cart"]
+        group = _slots[m.lastgroup]
+        if same_offsets:
+            raw = text[m.start(group):m.end(group)].strip()
+        else:
+            raw = m.group(group).strip()
+        intent.raw_dishes = raw
+        intent.dishes = [d.strip() for d in _SPLIT_DISHES.split(raw) if d.strip()]
+    if "price" in hits:
+        m = hits["price"]
+        intent.price_cap = int(m.group(_slots[m.lastgroup]))
+    for f in ("spicy", "veg", "sweet"):
+        if f in hits:
+            intent.filters.add(f)
+    if nonveg_rank is not None:
+        intent.filters.add("nonveg")
+        intent.nonveg_keyword = NONVEG_KEYWORDS[nonveg_rank]
+
+    return intent
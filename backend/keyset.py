@@ -0,0 +1,59 @@
+# keyset.py
+"""
+Keyset (cursor) pagination over (timestamp, _id), newest first.
+
+Instead of skip/limit — which re-reads every skipped document — each page
+ends with an opaque cursor holding the last row's (timestamp, _id). The next
+page asks for rows strictly "older" than that pair, which an index on
+(..., timestamp -1, _id -1) answers by seeking straight to the boundary, so
+page 100 costs the same as page 1. `_id` breaks ties between orders with the
+same timestamp.
+"""
+import base64
+import json
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+SORT = [("timestamp", -1), ("_id", -1)]
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor token that wasn't produced by encode_cursor()."""
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc.get("timestamp"), str(doc["_id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[str], ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        timestamp, oid = json.loads(raw)
+        return timestamp, ObjectId(oid)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def after_cursor(query: dict, token: Optional[str]) -> dict:
+    """`query` narrowed to the rows that sort after the cursor position."""
+    if not token:
+        return query
+    timestamp, oid = decode_cursor(token)
+    return {"$and": [query, {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": oid}},
+    ]}]}
+
+
+async def fetch_page(collection, query: dict, limit: int, cursor: Optional[str] = None,
+                     projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """One page of `collection` in SORT order plus the cursor for the next page (None at the end)."""
+    docs = await collection.find(after_cursor(query, cursor), projection) \
+        .sort(SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
@@ -0,0 +1,194 @@
+# logger.py
+"""
+Structured logging that never writes to stdout on the event loop.
+
+    log = get_logger(__name__)
+    log.info("Order saved", order_id=order_id, total=total)
+    log.warning("Menu cache poll failed", error=e)
+
+The calling thread only builds a LogRecord and puts it on a bounded queue;
+a QueueListener thread formats it and writes it out. If the queue is full
+the record is dropped (and counted) rather than blocking a request.
+
+Calls below a module's level, or not picked by its sample rate, return
+before any record or message is built. Warnings and above are never sampled.
+
+Configuration (environment):
+    LOG_LEVEL       default level                      (INFO)
+    LOG_LEVELS      per-module overrides               "db=WARNING,routes.websocket_routes=DEBUG"
+    LOG_SAMPLE      per-module keep rate for <WARNING  "routes.websocket_routes=0.1"
+    LOG_FORMAT      json | text                        (text)
+    LOG_QUEUE_SIZE  records buffered for the writer    (10000)
+
+Module names match on prefixes, so "routes=WARNING" covers every router.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+LOG_LEVEL      = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT     = os.getenv("LOG_FORMAT", "text")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+ROOT = "yummybites"
+
+
+def _parse_map(raw: str) -> Dict[str, str]:
+    pairs = (item.split("=", 1) for item in raw.split(",") if "=" in item)
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+LOG_LEVELS = {name: level.upper() for name, level in _parse_map(os.getenv("LOG_LEVELS", "")).items()}
+LOG_SAMPLE = {name: float(rate) for name, rate in _parse_map(os.getenv("LOG_SAMPLE", "")).items()}
+
+
+def _lookup(table: dict, name: str, default):
+    """Longest configured prefix of a dotted module name wins."""
+    parts = name.split(".")
+    for i in range(len(parts), 0, -1):
+        key = ".".join(parts[:i])
+        if key in table:
+            return table[key]
+    return default
+
+
+# ===============================
+# Formatting (listener thread)
+# ===============================
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":     round(record.created, 3),
+            "level":  record.levelname,
+            "logger": record.name[len(ROOT) + 1:] or record.name,
+            "msg":    record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        name = record.name[len(ROOT) + 1:] or record.name
+        line = f"{stamp} {record.levelname:<7} {name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+# ===============================
+# Queue (calling thread)
+# ===============================
+class _NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The record stays in-process, so skip QueueHandler's eager formatting —
+        # the listener thread does it. Log values, not objects you mutate later.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: _NonBlockingQueueHandler = None
+_listener: QueueListener = None
+
+
+def configure():
+    """Attach the queue handler and start the writer thread. Safe to call twice."""
+    global _handler, _listener
+    if _listener is not None:
+        return
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    _handler = _NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    root = logging.getLogger(ROOT)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+    _listener = QueueListener(_handler.queue, out, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def stats() -> dict:
+    return {
+        "queued":  _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
+
+
+# ===============================
+# Loggers
+# ===============================
+class Logger:
+    """Thin wrapper over a stdlib logger that takes structured fields as kwargs."""
+    __slots__ = ("name", "_logger", "_sample")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._logger = logging.getLogger(f"{ROOT}.{name}")
+        level = _lookup(LOG_LEVELS, name, None)
+        if level:
+            self._logger.setLevel(level)
+        self._sample = _lookup(LOG_SAMPLE, name, 1.0)
+
+    def _log(self, level: int, msg: str, args: tuple, fields: dict, exc_info=None):
+        if not self._logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self._sample < 1.0 and random.random() >= self._sample:
+            return
+        self._logger.log(level, msg, *args, exc_info=exc_info, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, msg: str, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg: str, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg: str, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg: str, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields)
+
+    def exception(self, msg: str, *args, **fields):
+        """error() plus the traceback of the exception being handled."""
+        self._log(logging.ERROR, msg, args, fields, exc_info=True)
+
+    def is_enabled(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+
+def get_logger(name: str) -> Logger:
+    configure()
+    return Logger("main" if name == "__main__" else name)
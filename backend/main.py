@@ -1,27 +1,40 @@
 # main.py
 import asyncio
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel
-from jose import jwt, JWTError
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 from bson import ObjectId
-import bcrypt
+from pymongo.errors import DuplicateKeyError
 import os
 from dotenv import load_dotenv
 
 # Custom imports
-from db import connect_to_mongo, close_mongo_connection, get_database
+from db import connect_to_mongo, close_mongo_connection, get_database, read_collection, pool_stats
+from auth import create_access_token, current_user, require_admin, invalidate_user, auth_cache_stats
+from menu_cache import menu_cache
+from password_hasher import password_hasher, HashPoolFull
+import order_stats
+import db_indexes
+from table_availability import availability_cache
+from keyset import fetch_page, InvalidCursor
+from fast_json import FastJSONResponse
+import admin_orders
 from routes.order_routes import router as order_router
 from routes.payment_routes import router as payment_router
 from routes.menu_routes import router as menuRouter
 from routes.ai_chat import router as ai_chat_router
-from routes.ratings_routes import router as ratings_router
-from routes.websocket_routes import router as ws_router
+from routes.ratings_routes import router as ratings_router, ensure_rating_summaries
+from routes.websocket_routes import router as ws_router, manager as ws_manager, handle_order_event
+import order_events
+import metrics
+from compression import CompressionMiddleware
+import logger
+from gemini_gateway import gemini_gateway
 
 load_dotenv()
 
@@ -31,12 +44,10 @@ from keep_alive import keep_alive_loop
 # ===============================
 # App & Config
 # ===============================
-app = FastAPI(title="YummyBites API", version="2.0")
-
-SECRET_KEY              = os.getenv("SECRET_KEY", "yummybites_super_secret_jwt_key_2024")
-ALGORITHM               = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
-ADMIN_EMAIL             = os.getenv("ADMIN_EMAIL", "admin@yummybites.com")
+# Routes that return plain dicts still pass through jsonable_encoder, but get
+# orjson for the final encode; hot routes return FastJSONResponse directly.
+app = FastAPI(title="YummyBites API", version="2.0", default_response_class=FastJSONResponse)
+log = logger.get_logger(__name__)
 
 # ===============================
 # CORS
@@ -54,18 +65,74 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ===============================
+# Compression
+# ===============================
+# gzip/brotli for dynamic JSON (order history, admin orders); the menu and
+# categories arrive already encoded from their snapshot and pass through
+app.add_middleware(CompressionMiddleware)
+
+# ===============================
+# Metrics
+# ===============================
+# Outermost middleware, so the latency covers CORS and every route
+app.add_middleware(metrics.MetricsMiddleware)
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")   # if set, scrapes must send "Authorization: Bearer <token>"
+
+metrics.gauge("websocket_connections", "Open order WebSocket connections: all of them, and those on the admin firehose.",
+              ("kind",), lambda: {("all",): len(ws_manager.clients), ("firehose",): len(ws_manager.firehose)})
+metrics.gauge("websocket_watched_orders", "Orders with at least one WebSocket watcher.", (),
+              lambda: {(): len(ws_manager.connections)})
+metrics.gauge("websocket_messages_sent_total", "Messages queued to WebSocket clients.", (),
+              lambda: {(): ws_manager.sent}, kind="counter")
+metrics.gauge("websocket_evictions_total", "Slow WebSocket clients evicted.", (),
+              lambda: {(): ws_manager.evicted}, kind="counter")
+metrics.gauge("mongo_pool_connections", "MongoDB pool connections by state.", ("state",),
+              lambda: {(k,): v for k, v in pool_stats.snapshot().items() if k in ("open", "in_use", "waiting")})
+metrics.gauge("gemini_pending_requests", "Gemini calls running or queued in the gateway.", (),
+              lambda: {(): gemini_gateway.pending})
+metrics.gauge("gemini_rejected_requests_total", "Gemini calls refused because the gateway queue was full.", (),
+              lambda: {(): gemini_gateway.rejected}, kind="counter")
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus text exposition of request, Mongo, upstream and WebSocket metrics."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # ===============================
 # DB Events
 # ===============================
 @app.on_event("startup")
 async def startup_db():
-    await connect_to_mongo()
+    db = await connect_to_mongo()
+    # Watch the menu collection so the cached snapshot is rebuilt on change
+    menu_cache.start(db)
+    # Order status events from every worker → this worker's WebSocket watchers
+    await order_events.backplane.start(db, handle_order_event)
+    # The reservation slot index is what prevents double booking, so build it
+    # before serving; the rest can take a while on big collections and run in
+    # the background
+    await db_indexes.ensure_required(db)
+    asyncio.create_task(db_indexes.ensure_indexes(db))
+    # Pick the bcrypt cost for this machine without blocking startup
+    asyncio.create_task(password_hasher.calibrate())
+    # Make sure the materialized admin stats exist before the first increment
+    asyncio.create_task(order_stats.load(db))
+    asyncio.create_task(ensure_rating_summaries(db))
     # Start keep-alive background task (no-op in local dev if RENDER_EXTERNAL_URL not set)
     asyncio.create_task(keep_alive_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db():
+    await menu_cache.stop()
+    await order_events.backplane.stop()
+    password_hasher.shutdown()
     await close_mongo_connection()
+    logger.shutdown()   # flush queued log records
 
 @app.get("/")
 async def root():
@@ -81,12 +148,12 @@ async def health():
 # ===============================
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    print("Validation Error:", exc.errors())
+    log.info("Validation error", path=request.url.path, errors=exc.errors())
     return JSONResponse(status_code=400, content=jsonable_encoder({"message": "Invalid input", "errors": exc.errors()}))
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(status_code=exc.status_code, content={"message": exc.detail})
+    return JSONResponse(status_code=exc.status_code, content={"message": exc.detail}, headers=getattr(exc, "headers", None))
 
 # ===============================
 # Schemas
@@ -111,25 +178,8 @@ class Reservation(BaseModel):
 # ===============================
 # Auth Helpers
 # ===============================
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-def get_email_from_token(token: str) -> Optional[str]:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
-        return None
-
-def get_token_from_request(request: Request) -> Optional[str]:
-    auth = request.headers.get("Authorization", "")
-    if auth.startswith("Bearer "):
-        return auth.split(" ")[1]
-    # Also support ?token= query param for /user/me backward compat
-    return request.query_params.get("token")
+def hashing_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server busy, please try again shortly.", headers={"Retry-After": "1"})
 
 # ===============================
 # Auth Routes — MongoDB backed
@@ -144,14 +194,22 @@ async def signup(user: User):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = bcrypt.hashpw(user.password.encode("utf-8"), bcrypt.gensalt())
-    await db["users"].insert_one({
-        "email": user.email,
-        "name": user.name or "",
-        "password": hashed_pw,
-        "created_at": datetime.utcnow().isoformat(),
-        "role": "user",
-    })
+    try:
+        hashed_pw = await password_hasher.hash(user.password)
+    except HashPoolFull:
+        raise hashing_busy()
+    try:
+        await db["users"].insert_one({
+            "email": user.email,
+            "name": user.name or "",
+            "password": hashed_pw,
+            "created_at": datetime.utcnow().isoformat(),
+            "role": "user",
+        })
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same email (unique index)
+        raise HTTPException(status_code=400, detail="Email already registered")
+    invalidate_user(user.email)
     return {"message": "Account created successfully! Please log in."}
 
 
@@ -162,29 +220,30 @@ async def login(user: User):
         raise HTTPException(status_code=500, detail="Database not connected")
 
     db_user = await db["users"].find_one({"email": user.email})
-    if not db_user or not bcrypt.checkpw(user.password.encode("utf-8"), db_user["password"]):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    try:
+        valid = await password_hasher.verify(user.password, db_user["password"])
+    except HashPoolFull:
+        raise hashing_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Upgrade the stored hash when it's cheaper than the current cost (never downgraded)
+    if password_hasher.needs_rehash(db_user["password"]):
+        try:
+            new_hash = await password_hasher.hash(user.password)
+            await db["users"].update_one({"_id": db_user["_id"]}, {"$set": {"password": new_hash}})
+        except HashPoolFull:
+            pass  # best effort — try again on the next login
+
     access_token = create_access_token(data={"sub": user.email})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @app.get("/user/me")
-async def read_users_me(request: Request):
-    token = get_token_from_request(request)
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    email = get_email_from_token(token)
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-    db = get_database()
-    db_user = await db["users"].find_one({"email": email})
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return {"email": email, "name": db_user.get("name", ""), "role": db_user.get("role", "user")}
+async def read_users_me(user: dict = Depends(current_user)):
+    return user
 
 # ===============================
 # Reservation Route
@@ -194,78 +253,175 @@ async def send_reservation(reservation: Reservation):
     db = get_database()
     reservations_collection = db["reservations"]
 
-    existing = await reservations_collection.find_one({
-        "tableNo": reservation.tableNo,
-        "date": reservation.date,
-        "time": reservation.time
-    })
-    if existing:
+    # The unique (date, time, tableNo) index rejects a double booking atomically —
+    # no find-then-insert window for two concurrent requests to slip through.
+    # If the index couldn't be built (e.g. old duplicates), check first instead.
+    if not db_indexes.index_ready("reservations", "date_time_table"):
+        existing = await reservations_collection.find_one({
+            "tableNo": reservation.tableNo,
+            "date": reservation.date,
+            "time": reservation.time
+        })
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Table {reservation.tableNo} is already booked for {reservation.date} at {reservation.time}."
+            )
+
+    try:
+        await reservations_collection.insert_one({
+            "firstName": reservation.firstName,
+            "lastName": reservation.lastName,
+            "tableNo": reservation.tableNo,
+            "phone": reservation.phone,
+            "date": reservation.date,
+            "time": reservation.time,
+            "createdAt": datetime.utcnow(),
+        })
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=400,
             detail=f"Table {reservation.tableNo} is already booked for {reservation.date} at {reservation.time}."
         )
-
-    await reservations_collection.insert_one({
-        "firstName": reservation.firstName,
-        "lastName": reservation.lastName,
-        "tableNo": reservation.tableNo,
-        "phone": reservation.phone,
-        "date": reservation.date,
-        "time": reservation.time,
-        "createdAt": datetime.utcnow(),
-    })
+    availability_cache.invalidate(reservation.date)
     return {"message": "Reservation booked successfully!"}
 
+
+@app.get("/api/v1/reservation/availability")
+async def reservation_availability(date: str):
+    """Booked tables per time slot for one date (YYYY-MM-DD); every other table is free."""
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    grid = await availability_cache.get_day(db, date)
+    return grid.to_dict()
+
 # ===============================
 # Admin Routes
 # ===============================
-def require_admin(request: Request) -> str:
-    """Validate token and check admin role. Returns email."""
-    token = get_token_from_request(request)
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    email = get_email_from_token(token)
-    if not email:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    if email != ADMIN_EMAIL:
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return email
+ADMIN_ORDERS_PAGE_SIZE     = 50
+ADMIN_ORDERS_MAX_PAGE_SIZE = 200
+
+def admin_order_filter(status, date_from, date_to, user) -> dict:
+    try:
+        return admin_orders.order_filter(status, date_from, date_to, user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/api/v1/admin/orders")
-async def admin_get_all_orders(request: Request):
-    """Get all orders — admin only."""
-    require_admin(request)
+async def admin_get_all_orders(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    user: Optional[str] = None,
+    limit: int = ADMIN_ORDERS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    admin: str = Depends(require_admin),
+):
+    """
+    One page of orders, newest first, optionally filtered by status, date range
+    (YYYY-MM-DD, inclusive) and user email — admin only. Pass `next_cursor` back
+    as `cursor` for the next page; it is null on the last page.
+    """
     db = get_database()
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
 
-    orders = await db["orders"].find().sort("timestamp", -1).limit(200).to_list(200)
-    for o in orders:
-        o["_id"] = str(o["_id"])
-    return orders
+    query = admin_order_filter(status, date_from, date_to, user)
+    limit = max(1, min(limit, ADMIN_ORDERS_MAX_PAGE_SIZE))
+    try:
+        orders, next_cursor = await fetch_page(db["orders"], query, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"orders": orders, "next_cursor": next_cursor})
+
+
+@app.get("/api/v1/admin/orders/export")
+async def admin_export_orders(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    user: Optional[str] = None,
+    admin: str = Depends(require_admin),
+):
+    """Stream every matching order as NDJSON or CSV — admin only. Same filters as /admin/orders."""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    query = admin_order_filter(status, date_from, date_to, user)
+    orders = read_collection(db, "orders", "order_export")
+    if format == "csv":
+        body, media_type = admin_orders.export_csv(orders, query), "text/csv; charset=utf-8"
+    else:
+        body, media_type = admin_orders.export_ndjson(orders, query), "application/x-ndjson"
+    filename = f"orders-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 
 @app.get("/api/v1/admin/stats")
-async def admin_get_stats(request: Request):
-    """Dashboard summary stats — admin only."""
-    require_admin(request)
+async def admin_get_stats(admin: str = Depends(require_admin)):
+    """Dashboard summary stats — admin only. Served from the materialized stats document."""
     db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
 
-    total_orders   = await db["orders"].count_documents({})
-    pending_orders = await db["orders"].count_documents({"status": "Pending"})
-    delivered      = await db["orders"].find({"status": "Delivered"}).to_list(1000)
-    total_revenue  = sum(o.get("total", 0) for o in delivered)
-    total_users    = await db["users"].count_documents({})
+    stats       = await order_stats.load(db)
+    total_users = await db["users"].estimated_document_count()
 
-    return {
-        "total_orders":   total_orders,
-        "pending_orders": pending_orders,
-        "total_revenue":  total_revenue,
+    return FastJSONResponse({
+        "total_orders":   stats.get("total_orders", 0),
+        "pending_orders": stats.get("status_counts", {}).get("Pending", 0),
+        "total_revenue":  stats.get("total_revenue", 0),
         "total_users":    total_users,
+    })
+
+
+@app.post("/api/v1/admin/stats/rebuild")
+async def admin_rebuild_stats(admin: str = Depends(require_admin)):
+    """Recompute the stats document from the orders collection — admin only."""
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    before = order_stats.comparable(await db["stats"].find_one({"_id": order_stats.STATS_ID}) or {})
+    after  = order_stats.comparable(await order_stats.rebuild(db))
+    return {"before": before, "after": after, "drift": before != after}
+
+
+@app.get("/api/v1/admin/cache-stats")
+async def admin_cache_stats(admin: str = Depends(require_admin)):
+    """Auth cache, password-hashing pool, WebSocket fan-out and Mongo pool counters — admin only."""
+    return {
+        "auth":             auth_cache_stats(),
+        "password_hashing": password_hasher.stats(),
+        "websockets":       ws_manager.stats(),
+        "order_events":     order_events.backplane.stats(),
+        "mongo_pool":       pool_stats.snapshot(),
+        "logging":          logger.stats(),
     }
 
 
+@app.get("/api/v1/admin/index-report")
+async def admin_index_report(admin: str = Depends(require_admin)):
+    """Explain each hot query and flag collection scans — admin only."""
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await db_indexes.report(db)
+
+
 # ===============================
 # Include Routers
 # ===============================
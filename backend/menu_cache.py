@@ -0,0 +1,184 @@
+# menu_cache.py
+"""
+Versioned in-process snapshot of the normalized menu.
+
+The menu changes rarely but is read on every page load and every chat
+message, so we keep one normalized copy (plus its pre-encoded JSON body and
+a strong ETag) in memory and only rebuild it when the `menu` collection
+actually changes. The category list is derived in the same pass, and the
+gzip/brotli variants of both bodies are compressed once per version, off the
+event loop.
+
+Invalidation comes from a MongoDB change stream when the server supports it
+(Atlas replica sets do). On a standalone mongod — local dev / tests — change
+streams are unavailable, so we fall back to polling and comparing a content
+hash every MENU_CACHE_POLL_SECONDS.
+"""
+import asyncio
+import os
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+from http_cache import encode_json, make_etag
+from compression import PrecompressedBody
+from logger import get_logger
+
+MENU_CACHE_POLL_SECONDS = float(os.getenv("MENU_CACHE_POLL_SECONDS", "30"))
+
+log = get_logger(__name__)
+
+
+def normalize_menu_item(item: dict) -> dict:
+    """Ensure each item has 'category', 'price' (as number), and 'tags' list."""
+    category = (
+        item.get("category")
+        or item.get("type")
+        or item.get("foodType")
+        or "Miscellaneous"
+    )
+
+    try:
+        price = float(str(item.get("price", 0)).replace("₹", "").strip())
+    except Exception:
+        price = 0.0
+
+    return {
+        "_id": str(item["_id"]),
+        "name": item.get("name", "Unnamed Dish"),
+        "description": item.get("description", ""),
+        "image": item.get("image", ""),
+        "price": price,
+        "category": category,
+        "tags": item.get("tags", []),
+    }
+
+
+def menu_categories(docs: list) -> list:
+    """Sorted unique categories, taken from both 'category' and the legacy 'type' field."""
+    found = set()
+    for doc in docs:
+        for field in ("category", "type"):
+            value = doc.get(field)
+            for c in value if isinstance(value, list) else [value]:
+                if c and isinstance(c, str) and c.strip():
+                    found.add(c.strip())
+    return sorted(found) or ["Miscellaneous"]
+
+
+class MenuSnapshot:
+    """Immutable view of the menu at one version."""
+
+    __slots__ = ("version", "items", "body", "etag", "categories", "categories_body", "categories_etag")
+
+    def __init__(self, version: int, items: list, body: bytes, etag: str, categories: list):
+        self.version = version
+        self.items = items   # normalized dicts — treat as read-only
+        self.body = PrecompressedBody(body)   # JSON-encoded `items`, served as-is on cache hits
+        self.etag = etag     # strong ETag derived from `body`
+
+        self.categories = categories
+        categories_body = encode_json({"categories": categories})
+        self.categories_body = PrecompressedBody(categories_body)
+        self.categories_etag = make_etag(categories_body)
+
+
+class MenuCache:
+    def __init__(self):
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._stale = True
+        self._generation = 0   # bumped by every invalidate()
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    async def get(self, db) -> MenuSnapshot:
+        """Return the current snapshot, building it on first use."""
+        snap = self._snapshot
+        if snap is not None and not self._stale:
+            return snap
+        async with self._lock:
+            # Another request may have rebuilt it while we waited for the lock
+            if self._snapshot is None or self._stale:
+                await self._rebuild(db, previous=self._snapshot)
+            return self._snapshot
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next read rebuilds it."""
+        self._generation += 1
+        self._stale = True
+
+    async def refresh(self, db) -> bool:
+        """Re-read the collection. Returns True if the menu content changed."""
+        async with self._lock:
+            old = self._snapshot
+            await self._rebuild(db, previous=old)
+            return old is None or old is not self._snapshot
+
+    async def _rebuild(self, db, previous: Optional[MenuSnapshot] = None):
+        # An invalidation that arrives while we read may not be in what we read
+        generation = self._generation
+        # Primary, so a rebuild triggered by a change event sees that change
+        docs = await db["menu"].find().to_list(1000)
+        items = [normalize_menu_item(d) for d in docs]
+        categories = menu_categories(docs)
+        body = encode_json(items)
+        etag = make_etag(body)
+
+        self._stale = self._generation != generation
+        # Unchanged content keeps its version so downstream indexes aren't rebuilt
+        if previous is not None and previous.etag == etag and previous.categories == categories:
+            return
+
+        snapshot = MenuSnapshot(self._version + 1, items, body, etag, categories)
+        # Compress off the event loop, before any request can ask for a variant
+        await asyncio.to_thread(snapshot.body.prepare)
+        await asyncio.to_thread(snapshot.categories_body.prepare)
+        self._version += 1
+        self._snapshot = snapshot
+
+    # ── Invalidation ──
+    def start(self, db):
+        """Start the background watcher (idempotent)."""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(db))
+
+    async def stop(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._watch_task = None
+
+    async def _watch(self, db):
+        try:
+            async with db["menu"].watch() as stream:
+                log.info("Menu cache: watching change stream")
+                async for _change in stream:
+                    self.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            # Standalone servers don't support change streams
+            log.warning("Menu cache: change stream unavailable, polling", error=e, every_s=MENU_CACHE_POLL_SECONDS)
+
+        await self._poll(db)
+
+    async def _poll(self, db):
+        while True:
+            await asyncio.sleep(MENU_CACHE_POLL_SECONDS)
+            try:
+                await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Menu cache poll failed", error=e)
+
+
+menu_cache = MenuCache()
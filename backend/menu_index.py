@@ -0,0 +1,116 @@
+# menu_index.py
+"""
+Precomputed dish attributes for Foodie AI filtering.
+
+Built once per menu snapshot version (see menu_cache.py) so that each chat
+intent is a posting-list lookup instead of lower-casing and substring-scanning
+every dish on every message. Posting lists hold item positions in menu order,
+which keeps results in the same order the old linear scans produced.
+"""
+from bisect import bisect_right
+from typing import Optional
+
+
+# ✅ FIX: Removed "hot" from spicy keywords — it matches "Hot Coffee", "Hot Chocolate" etc.
+# Only keeping words that genuinely indicate spicy food
+SPICY_KEYWORDS = ["spicy", "chilli", "chili", "masala", "fiery", "peri", "spice", "tangy", "zesty"]
+VEG_KEYWORDS = ["veg", "vegetarian", "no meat", "plant based"]
+NONVEG_KEYWORDS = ["non veg", "chicken", "mutton", "fish", "prawn", "meat", "egg"]
+SWEET_KEYWORDS = ["sweet", "dessert", "ice cream", "cake", "kheer", "halwa"]
+
+
+def clean_price(val) -> float:
+    try:
+        return float(str(val).replace("₹", "").strip())
+    except:
+        return 0.0
+
+
+def is_spicy(item: dict) -> bool:
+    """
+    ✅ FIX: Smarter spicy detection — checks name, description, tags, category.
+    Does NOT match just because item name contains 'hot' (e.g. Hot Coffee).
+    An item is spicy if it explicitly mentions spice-related words in description/tags,
+    OR if its name contains chilli/masala/spicy (not just 'hot').
+    """
+    name = item.get("name", "").lower()
+    desc = item.get("description", "").lower()
+    tags = str(item.get("tags", "")).lower()
+    category = item.get("category", "").lower()
+
+    # These words in the NAME strongly indicate spicy
+    name_spicy = ["chilli", "chili", "masala", "spicy", "peri", "fiery"]
+    if any(k in name for k in name_spicy):
+        return True
+
+    # These words anywhere indicate spicy
+    all_text = desc + " " + tags
+    if any(k in all_text for k in ["spicy", "chilli", "chili", "masala", "fiery", "peri", "hot and spicy"]):
+        return True
+
+    # Exclude obvious non-spicy categories
+    non_spicy_categories = ["beverage", "drink", "dessert", "sweet", "juice", "coffee", "tea", "shake"]
+    if any(k in category for k in non_spicy_categories):
+        return False
+
+    return False
+
+
+class MenuIndex:
+    """Attribute flags, keyword posting lists and a price array for one menu version."""
+
+    def __init__(self, version: int, items: list):
+        self.version = version
+        self.items = items
+
+        spicy, veg, sweet = [], [], []
+        nonveg = {k: [] for k in NONVEG_KEYWORDS}
+        priced = []
+
+        for pos, item in enumerate(items):
+            name = str(item.get("name", "")).lower()
+            desc = str(item.get("description", "")).lower()
+            category = str(item.get("category", "")).lower()
+
+            if is_spicy(item):
+                spicy.append(pos)
+            if "veg" in category:
+                veg.append(pos)
+            name_desc = name + desc
+            for kw, posting in nonveg.items():
+                if kw in name_desc:
+                    posting.append(pos)
+            name_cat = name + category
+            if any(k in name_cat for k in SWEET_KEYWORDS):
+                sweet.append(pos)
+            priced.append((clean_price(item.get("price", 9999)), pos))
+
+        self.spicy = tuple(spicy)
+        self.veg = tuple(veg)
+        self.sweet = tuple(sweet)
+        self.nonveg = {k: tuple(v) for k, v in nonveg.items()}
+
+        priced.sort()
+        self.prices = [p for p, _ in priced]
+        self.price_positions = [pos for _, pos in priced]
+
+    def take(self, positions, limit: int) -> list:
+        return [self.items[p] for p in positions[:limit]]
+
+    def under_price(self, cap: float, limit: int) -> list:
+        """Items priced <= cap, in menu order."""
+        n = bisect_right(self.prices, cap)
+        if n == 0:
+            return []
+        return self.take(sorted(self.price_positions[:n]), limit)
+
+
+_index: Optional[MenuIndex] = None
+
+
+def get_menu_index(snapshot) -> MenuIndex:
+    """Return the index for this snapshot, rebuilding only when the version changed."""
+    global _index
+    if _index is None or _index.version != snapshot.version:
+        _index = MenuIndex(snapshot.version, snapshot.items)
+    return _index
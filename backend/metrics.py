@@ -0,0 +1,277 @@
+# metrics.py
+"""
+In-process Prometheus metrics, served as text at GET /metrics.
+
+Built to stay on in production:
+  • histogram buckets are preallocated per label set; an observation is
+    one bisect plus three increments with no locks. Everything that records
+    from the event loop runs on one thread.
+  • Mongo command timings arrive on Motor's worker threads. The
+    CommandListener only appends to a deque (atomic in CPython) and, when
+    the deque is full, bumps a lock-guarded drop count. Both are folded into
+    the registry when /metrics is scraped.
+  • route labels use the matched route template ("/api/v1/order/{order_id}"),
+    never the raw path, so cardinality stays bounded.
+
+Gauges that already live elsewhere (WebSocket connections, the Mongo pool,
+Gemini queue depth) are read through callbacks at scrape time.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+from logger import get_logger
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MONGO_BUCKETS   = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+log = get_logger(__name__)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}   # labels → [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_num(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge (or counter kept elsewhere) read at scrape time:
+    fn() → {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str],
+                 fn: Callable[[], Dict[Tuple, float]], kind: str = "gauge"):
+        self.name, self.help, self.labelnames, self.fn, self.kind = name, help, tuple(labelnames), fn, kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.fn()
+        except Exception as e:
+            log.warning("Metrics callback failed", metric=self.name, error=e)
+            return lines
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_num(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, fn: Callable[[], None]):
+        """Run `fn` before every scrape (e.g. to drain samples recorded off-loop)."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ===============================
+# HTTP
+# ===============================
+http_latency = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")))
+http_requests = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead; streaming bodies untouched)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_latency.observe(time.perf_counter() - start, method, path)
+            http_requests.inc(method, path, status)
+
+
+# ===============================
+# Mongo commands
+# ===============================
+mongo_latency = REGISTRY.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection and command.",
+    ("collection", "command"), buckets=MONGO_BUCKETS))
+mongo_failures = REGISTRY.register(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands by collection and command.",
+    ("collection", "command")))
+mongo_samples_dropped = REGISTRY.register(Counter(
+    "mongo_command_samples_dropped_total", "Mongo timings dropped because the sample buffer was full."))
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Runs on Motor's worker threads. started() remembers the collection each
+    request targets; succeeded()/failed() queue (collection, command, seconds, ok).
+    Counter.inc isn't thread-safe, so drops are counted here and folded into
+    mongo_samples_dropped by drain() on the event loop.
+    """
+
+    def __init__(self, maxlen: int = 65536):
+        self._collections: Dict[int, str] = {}
+        self.samples: deque = deque(maxlen=maxlen)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        self._record(event, True)
+
+    def failed(self, event):
+        self._record(event, False)
+
+    def _record(self, event, ok: bool):
+        collection = self._collections.pop(event.request_id, "")
+        if len(self.samples) == self.samples.maxlen:
+            with self._dropped_lock:
+                self._dropped += 1
+        self.samples.append((collection, event.command_name, event.duration_micros / 1e6, ok))
+
+    def drain(self):
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            mongo_samples_dropped.inc(amount=dropped)
+        samples = self.samples
+        for _ in range(len(samples)):
+            collection, command, seconds, ok = samples.popleft()
+            mongo_latency.observe(seconds, collection, command)
+            if not ok:
+                mongo_failures.inc(collection, command)
+
+
+command_timer = CommandTimer()
+REGISTRY.on_collect(command_timer.drain)
+
+# ===============================
+# Upstream APIs (Gemini, Razorpay)
+# ===============================
+upstream_latency = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external APIs.", ("service", "operation")))
+upstream_errors = REGISTRY.register(Counter(
+    "upstream_errors_total", "Failed calls to external APIs by error type.", ("service", "operation", "error")))
+
+
+class track_upstream:
+    """
+    Time one external call and count its failures:
+
+        with track_upstream("razorpay", "order.create"):
+            order = client.order.create(...)
+    """
+    __slots__ = ("service", "operation", "start")
+
+    def __init__(self, service: str, operation: str):
+        self.service, self.operation = service, operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        upstream_latency.observe(time.perf_counter() - self.start, self.service, self.operation)
+        # A client disconnecting mid-stream cancels the call; that's not an upstream failure
+        if exc_type is not None and not issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            upstream_errors.inc(self.service, self.operation, exc_type.__name__)
+        return False
+
+
+def gauge(name: str, help: str, labelnames: Iterable[str], fn: Callable[[], Dict[Tuple, float]],
+          kind: str = "gauge"):
+    """Expose a value another module already tracks; use kind="counter" for running totals."""
+    return REGISTRY.register(CallbackMetric(name, help, labelnames, fn, kind))
+
+
+def render() -> str:
+    return REGISTRY.render()
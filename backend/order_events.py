@@ -0,0 +1,235 @@
+# order_events.py
+"""
+Order events (order created, status changed), delivered to every server process.
+
+OrderConnectionManager only knows the sockets connected to its own process.
+Under more than one uvicorn worker, a status PATCH handled by worker A must
+also reach sockets held by worker B. Order events therefore go through a
+backplane instead of straight to the local manager:
+
+  • MongoBackplane (default) — every worker tails a change stream on
+    `orders` filtered to inserts and status updates. The database write
+    *is* the event, so publish() does nothing and each worker (including
+    the writer) hears every event exactly once. After a transient error
+    the stream resumes from its last resume token, so no event is lost.
+    If the token can't be resumed (the oplog rolled past it), the stream
+    restarts from now and the handler gets a {"type": "gap"} event so
+    clients know to refetch.
+  • LocalBackplane — publish() hands the event straight to this process's
+    handler. Used for tests and single-process runs. The Mongo backplane also
+    falls back to it when the server doesn't support change streams
+    (standalone mongod).
+
+Select with ORDER_EVENTS_BACKPLANE=mongo|local.
+
+Every event carries a `seq`: the change's cluster time packed as
+(seconds << 21 | increment), small enough to stay a safe integer in
+JavaScript until well past 2100. It is the same on every worker, so a WebSocket
+client can resume from the last seq it saw even if it reconnects to a
+different worker. Local delivery mints seqs of the same shape from the wall
+clock.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Callable, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+import fast_json
+from logger import get_logger
+
+ORDER_EVENTS_BACKPLANE = os.getenv("ORDER_EVENTS_BACKPLANE", "mongo")
+
+log = get_logger(__name__)
+
+# Only inserts and status writes become events; other order updates are filtered server-side
+EVENTS_PIPELINE = [{"$match": {"$or": [
+    {"operationType": "insert"},
+    {"operationType": "update", "updateDescription.updatedFields.status": {"$exists": True}},
+]}}]
+
+Handler = Callable[[dict], None]
+
+# InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+NON_RESUMABLE_CODES = {260, 280, 286}
+RETRY_MAX_SECONDS = 60.0
+
+SEQ_SHIFT = 21
+_last_seq = 0
+
+
+def seq_at(seconds: int, inc: int = 0) -> int:
+    return (seconds << SEQ_SHIFT) | min(inc, (1 << SEQ_SHIFT) - 1)
+
+
+def next_local_seq() -> int:
+    """Cluster-time-shaped seq for events that don't come from a change stream."""
+    global _last_seq
+    _last_seq = max(_last_seq + 1, seq_at(int(time.time())))
+    return _last_seq
+
+
+def status_event(order_id: str, status: str, seq: Optional[int] = None) -> dict:
+    return {"seq": seq, "type": "status_changed", "order_id": order_id, "status": status}
+
+
+def created_event(order: dict, seq: Optional[int] = None) -> dict:
+    # Round-trip through JSON so ObjectIds/datetimes arrive as plain strings
+    order = fast_json.loads(fast_json.dumps(order))
+    return {"seq": seq, "type": "order_created", "order_id": order["_id"], "status": order.get("status"), "order": order}
+
+
+def gap_event() -> dict:
+    """Events before this point may never have been delivered."""
+    return {"seq": seq_at(int(time.time())), "type": "gap"}
+
+
+def _resumable(e: PyMongoError) -> bool:
+    if e.has_error_label("NonResumableChangeStreamError"):
+        return False
+    return not (isinstance(e, OperationFailure) and e.code in NON_RESUMABLE_CODES)
+
+
+def _change_to_event(change: dict) -> dict:
+    ct = change["clusterTime"]
+    seq = seq_at(ct.time, ct.inc)
+    if change["operationType"] == "insert":
+        return created_event(change["fullDocument"], seq)
+    return status_event(str(change["documentKey"]["_id"]),
+                        change["updateDescription"]["updatedFields"]["status"], seq)
+
+
+class LocalBackplane:
+    name = "local"
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+        self.delivered = 0
+
+    async def start(self, db, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, event: dict):
+        self._deliver({**event, "seq": next_local_seq()})
+
+    def _deliver(self, event: dict):
+        if self._handler is None:
+            return
+        self.delivered += 1
+        try:
+            self._handler(event)
+        except Exception:
+            log.exception("Order event handler failed", order_id=event.get("order_id"))
+
+    async def stop(self):
+        self._handler = None
+
+    def stats(self) -> dict:
+        return {"backplane": self.name, "delivered": self.delivered}
+
+
+class MongoBackplane(LocalBackplane):
+    name = "mongo"
+
+    def __init__(self, retry_seconds: float = 2.0):
+        super().__init__()
+        self.retry_seconds = retry_seconds
+        self.fallback = False     # True once we've degraded to in-process delivery
+        self.resumes = 0
+        self.restarts = 0         # non-resumable errors: restarted from now, events may be lost
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    async def start(self, db, handler: Handler):
+        await super().start(db, handler)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch(db))
+        # Wait until the stream is open (or known unavailable) so no early write is missed
+        await self._ready.wait()
+
+    async def publish(self, event: dict):
+        # The change stream delivers the write to every worker, this one included
+        if self.fallback:
+            await super().publish(event)
+
+    async def _watch(self, db):
+        try:
+            await self._tail(db)
+        finally:
+            # However the watcher ended, don't leave start() waiting on it
+            if not self._ready.is_set():
+                self.fallback = True
+                self._ready.set()
+
+    async def _tail(self, db):
+        resume_token = None
+        opened = False
+        failures = 0
+        while True:
+            try:
+                async with db["orders"].watch(EVENTS_PIPELINE, resume_after=resume_token) as stream:
+                    if not opened:
+                        log.info("Order events: watching orders change stream")
+                    opened = True
+                    failures = 0
+                    self._ready.set()
+                    resume_token = stream.resume_token
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._deliver(_change_to_event(change))
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                if not opened:
+                    # Standalone servers don't support change streams
+                    log.warning("Order events: change stream unavailable, delivering in-process only", error=e)
+                    self.fallback = True
+                    self._ready.set()
+                    return
+                if resume_token is not None and not _resumable(e):
+                    # Retrying the same token would fail forever; start from now instead
+                    self.restarts += 1
+                    resume_token = None
+                    log.error("Order events: change stream can't resume, restarting from now", error=e)
+                    self._deliver(gap_event())
+                else:
+                    self.resumes += 1
+                delay = random.uniform(0, min(RETRY_MAX_SECONDS, self.retry_seconds * 2 ** failures))
+                failures += 1
+                log.warning("Order events: change stream error, retrying", error=e, retry_in=round(delay, 2))
+                await asyncio.sleep(delay)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await super().stop()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "fallback": self.fallback, "resumes": self.resumes, "restarts": self.restarts}
+
+
+def make_backplane(kind: str = ORDER_EVENTS_BACKPLANE):
+    if kind == "local":
+        return LocalBackplane()
+    if kind == "mongo":
+        return MongoBackplane()
+    raise ValueError(f"Unknown ORDER_EVENTS_BACKPLANE {kind!r} (expected 'mongo' or 'local')")
+
+
+backplane = make_backplane()
+
+
+async def publish_status(order_id: str, status: str):
+    await backplane.publish(status_event(order_id, status))
+
+
+async def publish_created(order: dict):
+    """Call after inserting an order (the dict insert_one filled `_id` into)."""
+    await backplane.publish(created_event(order))
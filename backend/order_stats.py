@@ -0,0 +1,201 @@
+# order_stats.py
+"""
+Materialized order statistics for the admin dashboard.
+
+A single document in the `stats` collection holds order counts per status and
+delivered revenue. place_order and update_order_status keep it current with
+atomic `$inc` deltas, so GET /api/v1/admin/stats is one O(1) read however many
+orders exist.
+
+rebuild() recomputes the document from scratch with one `$facet` aggregation
+— run it after a deploy, or to verify the counters.
+
+Order writes happen before their `$inc`, so a rebuild could count an order
+whose `$inc` then lands on top of it. To close that window, writers call
+begin_write() before touching `orders`: it bumps `seq` and records an
+in-flight token that the matching record_*() call clears. rebuild() waits
+until nothing is in flight, then writes its result only if `seq` hasn't
+moved since it started (retrying otherwise). Tokens older than
+IN_FLIGHT_TTL_SECONDS are treated as abandoned (a crashed worker) and
+dropped; a write that really did take that long could still be counted
+twice, which the next rebuild corrects:
+
+    cd backend && python order_stats.py rebuild
+"""
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from logger import get_logger
+
+STATS_ID = "orders"
+REBUILD_ATTEMPTS = 20
+REBUILD_WAIT_SECONDS = 0.1      # between attempts while order writes are in flight
+IN_FLIGHT_TTL_SECONDS = 60.0
+
+log = get_logger(__name__)
+
+
+def _status_field(status: str) -> str:
+    # Field names can't contain "." or start with "$"
+    return "status_counts." + str(status).replace(".", "_").replace("$", "_")
+
+
+async def begin_write(db) -> Optional[str]:
+    """
+    Call before writing to `orders`; pass the token to the record_*() call
+    (or end_write() if nothing was written). Best-effort: None on failure.
+    """
+    token = uuid.uuid4().hex
+    try:
+        await db["stats"].update_one(
+            {"_id": STATS_ID},
+            {"$inc": {"seq": 1}, "$set": {f"in_flight.{token}": time.time()}},
+            upsert=True,
+        )
+    except Exception as e:
+        log.warning("Order stats begin_write failed (non-fatal)", error=e)
+        return None
+    return token
+
+
+async def end_write(db, token: Optional[str]):
+    """Clear an in-flight token whose write didn't happen. Best-effort, and a no-op once recorded."""
+    if not token:
+        return
+    try:
+        await db["stats"].update_one({"_id": STATS_ID}, {"$unset": {f"in_flight.{token}": ""}})
+    except Exception as e:
+        log.warning("Order stats end_write failed (non-fatal)", error=e)
+
+
+async def _apply(db, inc: dict, token: Optional[str]):
+    update = {"$inc": {"seq": 1, **inc}, "$set": {"updated_at": datetime.utcnow().isoformat()}}
+    if token:
+        update["$unset"] = {f"in_flight.{token}": ""}
+    await db["stats"].update_one({"_id": STATS_ID}, update, upsert=True)
+
+
+async def record_order_placed(db, total: float, status: str = "Pending", token: Optional[str] = None):
+    inc = {"total_orders": 1, _status_field(status): 1}
+    if status == "Delivered":
+        inc["total_revenue"] = float(total or 0)
+    await _apply(db, inc, token)
+
+
+async def record_status_change(db, old_status: str, new_status: str, total: float,
+                               token: Optional[str] = None):
+    if old_status == new_status:
+        return await end_write(db, token)
+    inc = {_status_field(old_status): -1, _status_field(new_status): 1}
+    if new_status == "Delivered":
+        inc["total_revenue"] = float(total or 0)
+    elif old_status == "Delivered":
+        inc["total_revenue"] = -float(total or 0)
+    await _apply(db, inc, token)
+
+
+def comparable(stats: dict) -> dict:
+    """
+    The counters in a normalized shape for drift checks: `$inc -1` leaves
+    zero-valued status keys that compute() omits, and `$inc` can leave ints
+    where compute() returns floats.
+    """
+    return {
+        "total_orders":  int(stats.get("total_orders") or 0),
+        "total_revenue": round(float(stats.get("total_revenue") or 0), 2),
+        "status_counts": {k: int(v) for k, v in (stats.get("status_counts") or {}).items() if v},
+    }
+
+
+async def compute(db) -> dict:
+    """Recompute the stats document from the orders collection in one round trip."""
+    pipeline = [{"$facet": {
+        "by_status": [
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ],
+        "revenue": [
+            {"$match": {"status": "Delivered"}},
+            {"$group": {"_id": None, "total": {"$sum": {"$ifNull": ["$total", 0]}}}},
+        ],
+    }}]
+    result = (await db["orders"].aggregate(pipeline).to_list(1))[0]
+
+    status_counts = {}
+    for row in result["by_status"]:
+        key = _status_field(row["_id"]).split(".", 1)[1]
+        status_counts[key] = row["count"]
+    return {
+        "total_orders":  sum(status_counts.values()),
+        "status_counts": status_counts,
+        "total_revenue": float(result["revenue"][0]["total"]) if result["revenue"] else 0.0,
+    }
+
+
+async def rebuild(db) -> dict:
+    """Overwrite the materialized counters with freshly computed stats."""
+    stats = None
+    for attempt in range(REBUILD_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(REBUILD_WAIT_SECONDS)
+        current = await db["stats"].find_one({"_id": STATS_ID}, projection={"seq": 1, "in_flight": 1})
+        in_flight = (current or {}).get("in_flight") or {}
+        abandoned = [t for t, started in in_flight.items() if time.time() - started > IN_FLIGHT_TTL_SECONDS]
+        if len(in_flight) > len(abandoned):
+            continue   # an order is written but not yet counted — compute() may already see it
+
+        stats = await compute(db)
+        now = datetime.utcnow().isoformat()
+        fields = {**stats, "updated_at": now, "rebuilt_at": now}
+        if current is None:
+            try:
+                await db["stats"].insert_one({"_id": STATS_ID, "seq": 0, **fields})
+                return stats
+            except DuplicateKeyError:
+                continue   # the first order's upsert got there first
+        update = {"$set": fields}
+        if abandoned:
+            update["$unset"] = {f"in_flight.{t}": "" for t in abandoned}
+        # Matches a missing seq too (documents written before it existed)
+        result = await db["stats"].update_one({"_id": STATS_ID, "seq": current.get("seq")}, update)
+        if result.matched_count:
+            return stats
+    log.warning("Stats rebuild kept racing with new orders, counters left as they were",
+                attempts=REBUILD_ATTEMPTS)
+    return stats if stats is not None else await compute(db)
+
+
+async def load(db) -> dict:
+    """
+    Current stats. Rebuilt first if the document has never been computed from
+    scratch — e.g. only `$inc` upserts from orders placed before the first rebuild.
+    """
+    doc = await db["stats"].find_one({"_id": STATS_ID})
+    if doc is None or "rebuilt_at" not in doc:
+        return await rebuild(db)
+    return doc
+
+
+async def _main(argv):
+    from db import connect_to_mongo, close_mongo_connection
+
+    if argv[1:] != ["rebuild"]:
+        print("usage: python order_stats.py rebuild")
+        return 2
+    db = await connect_to_mongo()
+    before = comparable(await db["stats"].find_one({"_id": STATS_ID}) or {})
+    after = comparable(await rebuild(db))
+    for key in ("total_orders", "total_revenue", "status_counts"):
+        marker = "" if before[key] == after[key] else "   ← was " + repr(before[key])
+        print(f"{key}: {after[key]!r}{marker}")
+    await close_mongo_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv)))
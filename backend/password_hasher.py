@@ -0,0 +1,124 @@
+# password_hasher.py
+"""
+Off-loop bcrypt hashing for /signup and /login.
+
+bcrypt is deliberately slow (tens of ms per call) and used to run directly in
+the async handlers, stalling the event loop for every request. Here it runs in
+a small dedicated thread pool — bcrypt releases the GIL while hashing — with
+admission control: once BCRYPT_WORKERS jobs are running and BCRYPT_MAX_QUEUE
+more are waiting, new callers get HashPoolFull (→ 503) immediately instead of
+piling up.
+
+The cost factor is calibrated at startup to the highest value whose hash time
+stays under BCRYPT_TARGET_MS (unless BCRYPT_ROUNDS pins it), never below
+the previous fixed default of 12. Logins rehash passwords whose stored cost
+is lower than the current one — only upwards, so timing noise between
+restarts can't make hashes flip back and forth or weaken them.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+
+import bcrypt
+
+from logger import get_logger
+
+BCRYPT_WORKERS    = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_QUEUE  = int(os.getenv("BCRYPT_MAX_QUEUE", "16"))
+BCRYPT_TARGET_MS  = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "12"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "14"))
+BCRYPT_ROUNDS     = os.getenv("BCRYPT_ROUNDS")   # set to skip calibration
+
+log = get_logger(__name__)
+
+
+class HashPoolFull(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+def hash_cost(hashed: Union[bytes, str]) -> Optional[int]:
+    """Cost factor encoded in a bcrypt hash ("$2b$12$..." → 12)."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode("utf-8")
+    try:
+        return int(hashed.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = BCRYPT_WORKERS, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = int(BCRYPT_ROUNDS) if BCRYPT_ROUNDS else 12
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashPoolFull("Password hashing queue is full")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> bytes:
+        return await self._run(self._hash_sync, password.encode("utf-8"), self.rounds)
+
+    async def verify(self, password: str, hashed: Union[bytes, str]) -> bool:
+        if isinstance(hashed, str):
+            hashed = hashed.encode("utf-8")
+        return await self._run(bcrypt.checkpw, password.encode("utf-8"), hashed)
+
+    def needs_rehash(self, hashed: Union[bytes, str]) -> bool:
+        cost = hash_cost(hashed)
+        return cost is None or cost < self.rounds
+
+    @staticmethod
+    def _hash_sync(password: bytes, rounds: int) -> bytes:
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+    async def calibrate(self, target_ms: float = BCRYPT_TARGET_MS) -> int:
+        """Pick the highest cost whose hash time stays within target_ms."""
+        if BCRYPT_ROUNDS:
+            return self.rounds
+        loop = asyncio.get_running_loop()
+
+        def measure(rounds: int) -> float:
+            start = time.perf_counter()
+            self._hash_sync(b"calibration-password", rounds)
+            return (time.perf_counter() - start) * 1000
+
+        chosen = BCRYPT_MIN_ROUNDS
+        for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+            elapsed = await loop.run_in_executor(self._executor, measure, rounds)
+            if elapsed > target_ms:
+                break
+            chosen = rounds
+            # Each extra round doubles the cost; stop if the next one would overshoot
+            if elapsed * 2 > target_ms:
+                break
+        self.rounds = chosen
+        log.info("bcrypt cost calibrated", rounds=chosen, target_ms=target_ms)
+        return chosen
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {
+            "rounds":    self.rounds,
+            "workers":   self.workers,
+            "max_queue": self.max_queue,
+            "pending":   self._pending,
+            "rejected":  self.rejected,
+        }
+
+
+password_hasher = PasswordHasher()
@@ -1,35 +1,47 @@
 # routes/ai_chat.py
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from db import get_database
+from auth import require_admin
 from datetime import datetime, timezone, timedelta
 import re
-import asyncio
-from gemini_config import gemini_client, GEMINI_MODEL
+import json
+from gemini_gateway import gemini_gateway, GeminiOverloaded
+from menu_cache import menu_cache
+from dish_resolver import get_dish_resolver
+from menu_index import MenuIndex, get_menu_index, clean_price
+from intent_engine import Intent, classify
+from ttl_cache import TTLCache
+import order_stats
+import order_events
+from logger import get_logger
 from typing import Optional
+import os
 
 router = APIRouter(prefix="/api/v1/ai", tags=["Foodie AI"])
+log = get_logger(__name__)
+
+# Gemini replies keyed on (normalized question, dishes shown to the model, menu version).
+# Repeat questions skip the upstream call entirely and don't burn quota.
+reply_cache = TTLCache(
+    maxsize=int(os.getenv("AI_REPLY_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("AI_REPLY_CACHE_TTL", "900")),
+)
+
+
+# Orders placed from chat, keyed on the client's request_id. A client that
+# retries the same message (e.g. /chat after a failed /chat/stream) gets the
+# original order back instead of placing a second one.
+chat_orders = TTLCache(maxsize=1024, ttl=600)
 
 
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     cart: Optional[list] = None
-
-
-# ✅ FIX: Removed "hot" from spicy keywords — it matches "Hot Coffee", "Hot Chocolate" etc.
-# Only keeping words that genuinely indicate spicy food
-SPICY_KEYWORDS = ["spicy", "chilli", "chili", "masala", "fiery", "peri", "spice", "tangy", "zesty"]
-VEG_KEYWORDS = ["veg", "vegetarian", "no meat", "plant based"]
-NONVEG_KEYWORDS = ["non veg", "chicken", "mutton", "fish", "prawn", "meat", "egg"]
-SWEET_KEYWORDS = ["sweet", "dessert", "ice cream", "cake", "kheer", "halwa"]
-
-
-def clean_price(val) -> float:
-    try:
-        return float(str(val).replace("₹", "").strip())
-    except:
-        return 0.0
+    request_id: Optional[str] = None   # idempotency key, same across retries of one message
 
 
 def menu_to_text(items: list) -> str:
@@ -50,90 +62,72 @@ def items_to_cards(items: list) -> list:
     } for i in items]
 
 
-def is_spicy(item: dict) -> bool:
-    """
-    ✅ FIX: Smarter spicy detection — checks name, description, tags, category.
-    Does NOT match just because item name contains 'hot' (e.g. Hot Coffee).
-    An item is spicy if it explicitly mentions spice-related words in description/tags,
-    OR if its name contains chilli/masala/spicy (not just 'hot').
-    """
-    name = item.get("name", "").lower()
-    desc = item.get("description", "").lower()
-    tags = str(item.get("tags", "")).lower()
-    category = item.get("category", "").lower()
-
-    # These words in the NAME strongly indicate spicy
-    name_spicy = ["chilli", "chili", "masala", "spicy", "peri", "fiery"]
-    if any(k in name for k in name_spicy):
-        return True
-
-    # These words anywhere indicate spicy
-    all_text = desc + " " + tags
-    if any(k in all_text for k in ["spicy", "chilli", "chili", "masala", "fiery", "peri", "hot and spicy"]):
-        return True
-
-    # Exclude obvious non-spicy categories
-    non_spicy_categories = ["beverage", "drink", "dessert", "sweet", "juice", "coffee", "tea", "shake"]
-    if any(k in category for k in non_spicy_categories):
-        return False
-
-    return False
+def normalize_query(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace so trivial variants share a cache key."""
+    return " ".join(re.sub(r"[^\w\s₹]", " ", text.lower()).split())
 
 
-def get_relevant_items(user_input: str, all_items: list, max_items: int = 8) -> list:
-    lower = user_input.lower()
+def get_relevant_items(intent: Intent, index: MenuIndex, max_items: int = 8) -> list:
+    # ✅ Spicy: use smart is_spicy() flags precomputed in the menu index
+    if "spicy" in intent.filters and index.spicy:
+        return index.take(index.spicy, max_items)
 
-    # ✅ Spicy: use smart is_spicy() instead of simple keyword match on name
-    if any(k in lower for k in SPICY_KEYWORDS) or "spicy" in lower:
-        filtered = [i for i in all_items if is_spicy(i)]
-        if filtered:
-            return filtered[:max_items]
+    if "veg" in intent.filters and index.veg:
+        return index.take(index.veg, max_items)
 
-    if any(k in lower for k in VEG_KEYWORDS):
-        filtered = [i for i in all_items if "veg" in str(i.get("category","")).lower()]
-        if filtered: return filtered[:max_items]
+    kw = intent.nonveg_keyword
+    if kw and index.nonveg[kw]:
+        return index.take(index.nonveg[kw], max_items)
 
-    if any(k in lower for k in NONVEG_KEYWORDS):
-        kw = next((k for k in NONVEG_KEYWORDS if k in lower), None)
-        filtered = [i for i in all_items if kw and kw in (i.get("name","") + i.get("description","")).lower()]
-        if filtered: return filtered[:max_items]
+    if "sweet" in intent.filters and index.sweet:
+        return index.take(index.sweet, max_items)
 
-    if any(k in lower for k in SWEET_KEYWORDS):
-        filtered = [i for i in all_items if any(k in (i.get("name","") + i.get("category","")).lower() for k in SWEET_KEYWORDS)]
-        if filtered: return filtered[:max_items]
+    if intent.price_cap is not None:
+        filtered = index.under_price(intent.price_cap, max_items)
+        if filtered: return filtered
 
-    price_match = re.search(r"under (?:₹\s*)?(\d+)|less than (?:₹\s*)?(\d+)", lower)
-    if price_match:
-        limit = int(price_match.group(1) or price_match.group(2))
-        filtered = [i for i in all_items if clean_price(i.get("price", 9999)) <= limit]
-        if filtered: return filtered[:max_items]
+    return index.items[:max_items]
 
-    return all_items[:max_items]
 
+async def place_chat_order(cart: list, db) -> dict:
+    total = sum(clean_price(item.get("price", 0)) * int(item.get("quantity", 1)) for item in cart)
+    IST = timezone(timedelta(hours=5, minutes=30))
+    # Marks the write in flight so a concurrent stats rebuild can't count it twice
+    stats_token = await order_stats.begin_write(db)
+    try:
+        order_doc = {
+            "items": cart, "total": total,
+            "delivery_details": {"name": "Guest User", "phone": "N/A", "address": "Via Foodie AI"},
+            "status": "Pending", "timestamp": datetime.now(IST).isoformat()
+        }
+        result = await db["orders"].insert_one(order_doc)
+    except Exception as e:
+        log.error("Chat order insert failed", error=e)
+        await order_stats.end_write(db, stats_token)
+        raise HTTPException(status_code=500, detail="Could not place order")
 
-async def find_dish(db, name: str):
-    dish = await db["menu"].find_one({"name": {"$regex": f"^{re.escape(name.strip())}", "$options": "i"}})
-    if not dish:
-        dish = await db["menu"].find_one({"name": {"$regex": re.escape(name.strip()), "$options": "i"}})
-    return dish
-
+    # The order is committed — counters and events are best-effort from here
+    try:
+        await order_stats.record_order_placed(db, total, token=stats_token)
+    except Exception as e:
+        log.warning("Order stats update failed (non-fatal)", error=e)
+    try:
+        await order_events.publish_created(order_doc)
+    except Exception as e:
+        log.warning("Order created event publish failed (non-fatal)", error=e)
+    order_id = str(result.inserted_id)
+    return {"reply": f"🎉 Order placed! ID: {order_id}. Redirecting...", "action": "place_order", "order_id": order_id}
 
-@router.post("/chat")
-async def foodie_ai(req: ChatRequest):
-    user_input = (req.message or "").strip()
-    db = get_database()
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database not connected")
 
+async def answer_local_intent(req: ChatRequest, intent: Intent, db) -> Optional[dict]:
+    """Intents 1–5 are answered without Gemini. Returns None if none matched."""
     # INTENT 1: Add one or multiple items to cart
-    m = re.search(r"add (.+?) to (cart|card)", user_input, re.IGNORECASE)
-    if m:
-        raw = m.group(1).strip()
-        dish_names = [d.strip() for d in re.split(r"\band\b|,|&", raw, flags=re.IGNORECASE) if d.strip()]
+    if intent.name == "add_to_cart":
+        raw = intent.raw_dishes
         added = []
         not_found = []
-        for name in dish_names:
-            dish = await find_dish(db, name)
+        resolver = get_dish_resolver(await menu_cache.get(db))
+        for name, dish in resolver.resolve_many(intent.dishes):
             if dish:
                 added.append({
                     "_id": str(dish["_id"]),
@@ -153,25 +147,26 @@ async def foodie_ai(req: ChatRequest):
         return {"reply": reply, "action": "add_to_cart", "dishes": added}
 
     # INTENT 2: Place order
-    if re.search(r"place order|checkout|confirm order|order now", user_input, re.IGNORECASE):
+    if intent.name == "place_order":
         cart = req.cart or []
         if not cart:
             return {"reply": "⚠️ Your cart is empty! Add some dishes first."}
-        total = sum(clean_price(item.get("price", 0)) * int(item.get("quantity", 1)) for item in cart)
-        IST = timezone(timedelta(hours=5, minutes=30))
+        if not req.request_id:
+            return await place_chat_order(cart, db)
+        # A retry joins the first attempt, even if that one is still running
+        pending = chat_orders.get(req.request_id)
+        if pending is None:
+            pending = asyncio.ensure_future(place_chat_order(cart, db))
+            chat_orders.set(req.request_id, pending)
         try:
-            result = await db["orders"].insert_one({
-                "items": cart, "total": total,
-                "delivery_details": {"name": "Guest User", "phone": "N/A", "address": "Via Foodie AI"},
-                "status": "Pending", "timestamp": datetime.now(IST).isoformat()
-            })
-            order_id = str(result.inserted_id)
-            return {"reply": f"🎉 Order placed! ID: {order_id}. Redirecting...", "action": "place_order", "order_id": order_id}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail="Could not place order")
+            # Shielded so a client disconnect can't cancel an order a retry is waiting on
+            return await asyncio.shield(pending)
+        except HTTPException:
+            chat_orders.pop(req.request_id)   # nothing was placed; let a retry try again
+            raise
 
     # INTENT 3: View cart
-    if re.search(r"view cart|show cart|my cart|what.s in.*cart", user_input, re.IGNORECASE):
+    if intent.name == "view_cart":
         cart = req.cart or []
         if not cart:
             return {"reply": "🛒 Your cart is empty. Browse the menu and add something!"}
@@ -180,12 +175,12 @@ async def foodie_ai(req: ChatRequest):
         return {"reply": f"🛒 Your Cart:\n{items_text}\n\nTotal: ₹{total:.2f}\n\nSay 'place order' to checkout!"}
 
     # INTENT 4: Greetings
-    if re.match(r"^(hi|hello|hey|howdy|good morning|good evening|good afternoon)\b", user_input.strip(), re.IGNORECASE):
+    if intent.name == "greeting":
         return {"reply": "Hey there foodie! 👋 Welcome to YummyBites!\n\nI can help you:\n• Suggest dishes\n• Add to cart — say 'add [dish] to cart'\n• Place orders — say 'place order'\n\nWhat are you craving today?"}
 
     # INTENT 5: Show full menu
-    if re.search(r"show menu|full menu|all dishes|what.s on the menu|what do you (have|serve)", user_input, re.IGNORECASE):
-        all_items = await db["menu"].find().to_list(50)
+    if intent.name == "show_menu":
+        all_items = (await menu_cache.get(db)).items
         if not all_items:
             return {"reply": "Menu unavailable right now. Please try again later."}
         return {
@@ -193,13 +188,13 @@ async def foodie_ai(req: ChatRequest):
             "dishes": items_to_cards(all_items[:5])
         }
 
-    # INTENT 6: Gemini AI with minimal tokens
-    try:
-        all_items = await db["menu"].find().to_list(100)
-        relevant = get_relevant_items(user_input, all_items, max_items=8)
-        menu_text = menu_to_text(relevant)
+    return None
+
 
-        prompt = f"""You are Foodie AI for YummyBites restaurant. Be friendly and brief (max 3 sentences).
+def build_prompt(user_input: str, relevant: list) -> str:
+    menu_text = menu_to_text(relevant)
+
+    return f"""You are Foodie AI for YummyBites restaurant. Be friendly and brief (max 3 sentences).
 
 Menu:
 {menu_text}
@@ -208,29 +203,138 @@ Customer: {user_input}
 
 Reply helpfully. Only suggest dishes from the list above. Use Rs for prices."""
 
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: gemini_client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
-        )
 
-        reply = response.text.strip() if response.text else "Try asking about specific dishes or say 'show menu'!"
-        dishes_to_show = [items_to_cards([i])[0] for i in all_items if i.get("name","").lower() in reply.lower()]
-        result = {"reply": reply}
-        if dishes_to_show:
-            result["dishes"] = dishes_to_show[:5]
-        return result
+def reply_with_dishes(text: str, all_items: list) -> dict:
+    """Wrap the model's reply and attach cards for any dishes it mentions."""
+    reply = text or "Try asking about specific dishes or say 'show menu'!"
+    dishes_to_show = [items_to_cards([i])[0] for i in all_items if i.get("name","").lower() in reply.lower()]
+    result = {"reply": reply}
+    if dishes_to_show:
+        result["dishes"] = dishes_to_show[:5]
+    return result
+
+
+def is_quota_error(e: Exception) -> bool:
+    err = str(e)
+    return isinstance(e, GeminiOverloaded) or "429" in err or "RESOURCE_EXHAUSTED" in err
+
+
+async def fallback_reply(intent: Intent, db) -> dict:
+    """Menu-only answer used when Gemini is rate limited or our gateway is full."""
+    index = get_menu_index(await menu_cache.get(db))
+    relevant = get_relevant_items(intent, index, max_items=5)
+    if relevant:
+        return {
+            "reply": f"Here are some dishes you might enjoy:\n\n{menu_to_text(relevant)}\n\nSay 'add [dish name] to cart' to order!",
+            "dishes": items_to_cards(relevant)
+        }
+    return {"reply": "Please visit our Menu page to browse all available dishes!"}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat")
+async def foodie_ai(req: ChatRequest):
+    user_input = (req.message or "").strip()
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    intent = classify(user_input)
+    local = await answer_local_intent(req, intent, db)
+    if local is not None:
+        return local
+
+    # INTENT 6: Gemini AI with minimal tokens
+    try:
+        index = get_menu_index(await menu_cache.get(db))
+        relevant = get_relevant_items(intent, index, max_items=8)
+
+        cache_key = (normalize_query(user_input), tuple(i["_id"] for i in relevant), index.version)
+        cached = reply_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        text = await gemini_gateway.generate(build_prompt(user_input, relevant))
+
+        result = reply_with_dishes(text, index.items)
+        if text:
+            reply_cache.set(cache_key, result)
+        return dict(result)
 
     except Exception as e:
         err = str(e)
-        print("AI chat error:", err)
-        if "429" in err or "RESOURCE_EXHAUSTED" in err:
-            all_items = await db["menu"].find().to_list(100)
-            relevant = get_relevant_items(user_input, all_items, max_items=5)
-            if relevant:
-                return {
-                    "reply": f"Here are some dishes you might enjoy:\n\n{menu_to_text(relevant)}\n\nSay 'add [dish name] to cart' to order!",
-                    "dishes": items_to_cards(relevant)
-                }
-            return {"reply": "Please visit our Menu page to browse all available dishes!"}
+        log.warning("AI chat error", error=err)
+        if is_quota_error(e):
+            return await fallback_reply(intent, db)
         raise HTTPException(status_code=500, detail=f"AI error: {err}")
+
+
+@router.post("/chat/stream")
+async def foodie_ai_stream(req: ChatRequest):
+    """
+    Same as /chat, but as Server-Sent Events:
+      event: token  → {"text": "..."} for each Gemini chunk as it arrives
+      event: done   → the full /chat response (reply + dishes/action)
+      event: error  → {"message": "..."}
+    Intents answered locally (and cache hits) are sent as a single `done` event.
+    """
+    user_input = (req.message or "").strip()
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    intent = classify(user_input)
+    local = await answer_local_intent(req, intent, db)
+    if local is not None:
+        return StreamingResponse(iter([sse_event("done", local)]), media_type="text/event-stream", headers=headers)
+
+    index = get_menu_index(await menu_cache.get(db))
+    relevant = get_relevant_items(intent, index, max_items=8)
+
+    cache_key = (normalize_query(user_input), tuple(i["_id"] for i in relevant), index.version)
+    cached = reply_cache.get(cache_key)
+    if cached is not None:
+        return StreamingResponse(iter([sse_event("done", dict(cached))]), media_type="text/event-stream", headers=headers)
+
+    prompt = build_prompt(user_input, relevant)
+
+    async def events():
+        # If the client disconnects, Starlette cancels this generator and the
+        # upstream stream is closed — partial chunks are dropped right away.
+        chunks = []
+        try:
+            async for piece in gemini_gateway.stream(prompt):
+                chunks.append(piece)
+                yield sse_event("token", {"text": piece})
+        except Exception as e:
+            log.warning("AI chat stream error", error=e)
+            if is_quota_error(e):
+                yield sse_event("done", await fallback_reply(intent, db))
+            else:
+                yield sse_event("error", {"message": f"AI error: {e}"})
+            return
+
+        text = "".join(chunks).strip()
+        result = reply_with_dishes(text, index.items)
+        if text:
+            reply_cache.set(cache_key, result)
+        yield sse_event("done", result)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@router.get("/cache-stats")
+async def ai_cache_stats(admin: str = Depends(require_admin)):
+    """Hit/miss counters for the Gemini reply cache — admin only."""
+    return reply_cache.stats()
+
+
+@router.get("/gateway-stats")
+async def ai_gateway_stats(admin: str = Depends(require_admin)):
+    """Concurrency, queue and coalescing counters for the Gemini gateway — admin only."""
+    return gemini_gateway.stats()
@@ -1,45 +1,30 @@
 # routes/order_routes.py
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
-from db import get_database, connect_to_mongo
-from jose import jwt, JWTError
-import os
+from db import get_database, connect_to_mongo, read_collection
+from auth import get_email_from_request
+from keyset import fetch_page, InvalidCursor
+import order_stats
+import order_events
+from fast_json import FastJSONResponse
+from logger import get_logger
 
 router = APIRouter(prefix="/api/v1/order", tags=["Orders"])
+log = get_logger(__name__)
 
-SECRET_KEY = os.getenv("SECRET_KEY", "yummybites_super_secret_jwt_key_2024")
-ALGORITHM = "HS256"
-
-
-# ===============================
-# 🔧 Helpers
-# ===============================
-def serialize_doc(doc):
-    """Convert MongoDB ObjectId → string for frontend."""
-    if not doc:
-        return {}
-    doc["_id"] = str(doc["_id"])
-    return doc
-
-
-def get_email_from_request(request: Request) -> Optional[str]:
-    """
-    Extract logged-in user's email from Authorization header.
-    Returns None if not logged in — orders still work for guests.
-    """
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        return None
-    token = auth.split(" ")[1]
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")  # "sub" = email
-    except JWTError:
-        return None
+HISTORY_PAGE_SIZE     = 20
+HISTORY_MAX_PAGE_SIZE = 100
 
+# List-view fields only; the full order comes from GET /api/v1/order/{order_id}
+SUMMARY_PROJECTION = {
+    "status":     1,
+    "total":      1,
+    "timestamp":  1,
+    "item_count": {"$size": {"$ifNull": ["$items", []]}},
+}
 
 # ===============================
 # 📦 Pydantic Models
@@ -70,7 +55,7 @@ class OrderRequest(BaseModel):
 # 🚀 POST: Place Order
 # ===============================
 @router.post("/place")
-async def place_order(order: OrderRequest, request: Request):
+async def place_order(order: OrderRequest, user_email: Optional[str] = Depends(get_email_from_request)):
     if not order.items:
         raise HTTPException(status_code=400, detail="Your cart is empty!")
 
@@ -93,9 +78,7 @@ async def place_order(order: OrderRequest, request: Request):
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid price for: {item.name}")
 
-    # ✅ Save user_email if logged in, else "guest"
-    user_email = get_email_from_request(request)
-
+    # ✅ user_email comes from the auth dependency — None for guests
     order_doc = {
         "items": cleaned_items,
         "total": float(str(order.total).replace("₹", "").strip()),
@@ -105,17 +88,36 @@ async def place_order(order: OrderRequest, request: Request):
         "user_email": user_email or "guest",  # ✅ links order to user
     }
 
+    # Marks the write in flight so a concurrent stats rebuild can't count it twice
+    stats_token = await order_stats.begin_write(db)
     try:
         result = await db["orders"].insert_one(order_doc)
+    except Exception as e:
+        log.error("Order insert failed", error=e)
+        await order_stats.end_write(db, stats_token)
+        raise HTTPException(status_code=500, detail="Database insert failed")
+
+    # The order is committed — failed counters or events must not invite a duplicate retry
+    try:
+        await order_stats.record_order_placed(db, order_doc["total"], token=stats_token)
+    except Exception as stats_err:
+        log.warning("Order stats update failed (non-fatal)", error=stats_err)
+    try:
+        await order_events.publish_created(order_doc)
+    except Exception as ws_err:
+        log.warning("Order created event publish failed (non-fatal)", error=ws_err)
+
+    try:
         saved_order = await db["orders"].find_one({"_id": result.inserted_id})
-        print("✅ Order saved:", saved_order)
-        return {
+        log.info("Order saved", order_id=str(result.inserted_id), total=order_doc["total"])
+        # FastJSONResponse writes ObjectIds as strings — no per-document walk
+        return FastJSONResponse({
             "message": "Order placed successfully!",
             "order_id": str(result.inserted_id),
-            "order": serialize_doc(saved_order),
-        }
+            "order": saved_order or {},
+        })
     except Exception as e:
-        print("❌ Order error:", e)
+        log.error("Order fetch after insert failed", error=e)
         raise HTTPException(status_code=500, detail="Database insert failed")
 
 
@@ -123,30 +125,41 @@ async def place_order(order: OrderRequest, request: Request):
 # 🔍 GET: Single Order by ID
 # ===============================
 @router.get("/history")
-async def get_order_history(request: Request):
+async def get_order_history(
+    limit: int = HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    view: str = "full",
+    user_email: Optional[str] = Depends(get_email_from_request),
+):
     """
-    Returns all orders for the currently logged-in user.
+    One page of the logged-in user's orders, newest first.
+    Pass the returned `next_cursor` back as `cursor` for the next page;
+    it is null on the last page. `view=summary` returns only
+    _id/status/total/timestamp/item_count per order.
     Requires a valid JWT token in Authorization header.
     """
-    user_email = get_email_from_request(request)
     if not user_email:
         raise HTTPException(status_code=401, detail="Please log in to view order history.")
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
 
     db = get_database()
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
 
     try:
-        # ✅ Fetch all orders for this user, newest first
-        cursor = db["orders"].find(
-            {"user_email": user_email}
-        ).sort("timestamp", -1).limit(50)
-
-        orders = await cursor.to_list(50)
-        return [serialize_doc(o) for o in orders]
+        # ✅ Seeks on the (user_email, timestamp, _id) index — constant cost per page
+        orders, next_cursor = await fetch_page(
+            read_collection(db, "orders", "order_history"), {"user_email": user_email}, limit, cursor,
+            projection=SUMMARY_PROJECTION if view == "summary" else None,
+        )
+        return FastJSONResponse({"orders": orders, "next_cursor": next_cursor})
 
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print("❌ History fetch error:", e)
+        log.error("History fetch failed", error=e)
         raise HTTPException(status_code=500, detail=f"Error fetching history: {str(e)}")
 
 
@@ -165,7 +178,7 @@ async def get_order(order_id: str):
         order = await db["orders"].find_one({"_id": ObjectId(order_id)})
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-        return serialize_doc(order)
+        return FastJSONResponse(order)
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid ID or error: {str(e)}")
@@ -188,23 +201,33 @@ async def update_order_status(order_id: str, request: Request):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
 
+    stats_token = await order_stats.begin_write(db)
     try:
-        result = await db["orders"].update_one(
+        # Returns the pre-update document so the stats delta uses the real old status
+        previous = await db["orders"].find_one_and_update(
             {"_id": ObjectId(order_id)},
-            {"$set": {"status": new_status}}
+            {"$set": {"status": new_status}},
+            projection={"status": 1, "total": 1},
         )
-        if result.matched_count == 0:
+        if previous is None:
             raise HTTPException(status_code=404, detail="Order not found")
-
-        # ✅ Broadcast via WebSocket — imported inline to avoid circular import issues
         try:
-            from routes.websocket_routes import manager as ws_manager
-            await ws_manager.broadcast_status(order_id, new_status)
-            print(f"📡 WS broadcast sent: order {order_id} → {new_status}")
+            await order_stats.record_status_change(db, previous.get("status"), new_status, previous.get("total", 0),
+                                                   token=stats_token)
+        except Exception as stats_err:
+            log.warning("Order stats update failed (non-fatal)", order_id=order_id, error=stats_err)
+
+        # ✅ Broadcast via the order-events backplane, which reaches the WebSocket
+        # watchers on every worker. Delivery is queued, so a slow watcher can't
+        # hold up this response.
+        try:
+            await order_events.publish_status(order_id, new_status)
+            log.debug("Status event published", order_id=order_id, status=new_status)
         except Exception as ws_err:
             # Don't fail the whole request if WS broadcast fails — DB is already updated
-            print(f"⚠️  WS broadcast failed (non-fatal): {ws_err}")
+            log.warning("Status event publish failed (non-fatal)", order_id=order_id, error=ws_err)
 
         return {"message": f"Order status updated to '{new_status}'"}
     except Exception as e:
+        await order_stats.end_write(db, stats_token)   # no-op if the change was recorded
         raise HTTPException(status_code=400, detail=f"Update failed: {str(e)}")
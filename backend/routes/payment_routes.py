@@ -2,22 +2,31 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 import razorpay
+import asyncio
 import hmac
 import hashlib
 import json
 import os
 from dotenv import load_dotenv
 from db import get_database
+from metrics import track_upstream
+from logger import get_logger
 from datetime import datetime
 
 load_dotenv()
 
 router = APIRouter(prefix="/api/v1/payment", tags=["Payment"])
+log = get_logger(__name__)
 
 RAZORPAY_KEY_ID     = os.getenv("RAZORPAY_KEY_ID",     "rzp_test_RZNXWq4xYzFPoa")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET",  "HbCfjmSliM5K4d2AZBl76vEY")
+# Optional override so load runs can point at a local fake Razorpay server (see bench/)
+RAZORPAY_BASE_URL   = os.getenv("RAZORPAY_BASE_URL")
 
-client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+client = razorpay.Client(
+    auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET),
+    **({"base_url": RAZORPAY_BASE_URL} if RAZORPAY_BASE_URL else {}),
+)
 
 
 class PaymentOrderRequest(BaseModel):
@@ -32,11 +41,13 @@ async def create_order(request: PaymentOrderRequest):
         if amount_paise <= 0:
             raise ValueError("Invalid amount")
 
-        order = client.order.create({
-            "amount":          amount_paise,
-            "currency":        "INR",
-            "payment_capture": 1,
-        })
+        # The Razorpay SDK is blocking — keep it off the event loop
+        with track_upstream("razorpay", "order.create"):
+            order = await asyncio.to_thread(client.order.create, {
+                "amount":          amount_paise,
+                "currency":        "INR",
+                "payment_capture": 1,
+            })
 
         if not order or "id" not in order:
             raise HTTPException(status_code=500, detail="Failed to create Razorpay order")
@@ -48,7 +59,7 @@ async def create_order(request: PaymentOrderRequest):
             "key":      RAZORPAY_KEY_ID,
         }
     except Exception as e:
-        print("❌ Razorpay order creation failed:", e)
+        log.error("Razorpay order creation failed", error=e)
         raise HTTPException(status_code=500, detail="Failed to create payment order.")
 
 
@@ -75,7 +86,7 @@ async def verify_payment(request: VerifyPaymentRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print("❌ Verification error:", e)
+        log.error("Payment verification error", error=e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -104,7 +115,7 @@ async def razorpay_webhook(request: Request):
     ).hexdigest()
 
     if not hmac.compare_digest(expected, signature):
-        print("❌ Webhook signature mismatch")
+        log.warning("Webhook signature mismatch")
         raise HTTPException(status_code=400, detail="Invalid webhook signature")
 
     # ── Parse event ──
@@ -119,7 +130,7 @@ async def razorpay_webhook(request: Request):
     payment_id = payment.get("id")
     amount     = payment.get("amount", 0) / 100  # paise → rupees
 
-    print(f"📨 Webhook event: {event_type} | order: {order_id} | payment: {payment_id}")
+    log.info("Webhook event", event=event_type, razorpay_order_id=order_id, payment_id=payment_id)
 
     db = get_database()
 
@@ -137,7 +148,7 @@ async def razorpay_webhook(request: Request):
             }},
             upsert=True,
         )
-        print(f"✅ Payment captured & recorded: ₹{amount}")
+        log.info("Payment captured", razorpay_order_id=order_id, amount=amount)
 
     elif event_type == "payment.failed":
         await db["payments"].update_one(
@@ -150,7 +161,7 @@ async def razorpay_webhook(request: Request):
             }},
             upsert=True,
         )
-        print(f"❌ Payment failed for order: {order_id}")
+        log.warning("Payment failed", razorpay_order_id=order_id)
 
     # Razorpay expects 200 OK quickly — always return success
     return {"status": "webhook received"}
\ No newline at end of file
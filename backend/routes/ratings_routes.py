@@ -1,31 +1,19 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
 from db import get_database
-from jose import jwt, JWTError
-import os
+from auth import get_email_from_request
+from http_cache import encode_json, make_etag, etag_response
+from fast_json import FastJSONResponse
+from logger import get_logger
 
 router = APIRouter(prefix="/api/v1/ratings", tags=["Ratings"])
+log = get_logger(__name__)
 
-SECRET_KEY = os.getenv("SECRET_KEY", "yummybites_super_secret_jwt_key_2024")
-ALGORITHM  = "HS256"
-
-def get_email_from_request(request: Request) -> Optional[str]:
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        return None
-    try:
-        payload = jwt.decode(auth.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
-        return None
-
-def serialize(doc):
-    doc["_id"] = str(doc["_id"])
-    return doc
-
+MAX_BULK_IDS = 500
 
 class RatingRequest(BaseModel):
     dish_id: str
@@ -34,16 +22,16 @@ class RatingRequest(BaseModel):
 
 
 @router.post("/")
-async def submit_rating(body: RatingRequest, request: Request):
+async def submit_rating(body: RatingRequest, email: Optional[str] = Depends(get_email_from_request)):
     """Submit or update a rating. One rating per user per dish."""
-    email = get_email_from_request(request)
     if not email:
         raise HTTPException(status_code=401, detail="Please log in to rate dishes.")
 
     db = get_database()
 
-    # Upsert — if user already rated this dish, update it
-    await db["ratings"].update_one(
+    # Upsert — if user already rated this dish, update it.
+    # The pre-update document (None for a first rating) drives the summary delta.
+    previous = await db["ratings"].find_one_and_update(
         {"dish_id": body.dish_id, "user_email": email},
         {"$set": {
             "dish_id":    body.dish_id,
@@ -52,42 +40,142 @@ async def submit_rating(body: RatingRequest, request: Request):
             "comment":    body.comment,
             "updated_at": datetime.utcnow().isoformat(),
         }},
+        projection={"stars": 1},
         upsert=True
     )
-    # Recompute average for this dish
-    avg = await _compute_avg(db, body.dish_id)
+    summary = await _apply_rating_delta(db, body.dish_id, previous["stars"] if previous else None, body.stars)
+    avg = _summary_avg(summary)
     return {"message": "Rating saved!", "average": avg, "count": avg["count"]}
 
 
+@router.get("/bulk")
+async def get_ratings_bulk(request: Request, ids: str = "all", email: Optional[str] = Depends(get_email_from_request)):
+    """
+    Average, count and the caller's own rating for many dishes in one response.
+    `ids` is a comma-separated list of dish ids, or "all" for every rated dish.
+
+    The ETag is a hash of the body, so it changes whenever any listed rating
+    (or the caller's own) changes; send it back as If-None-Match to get a 304.
+    """
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+
+    if ids.strip().lower() == "all":
+        dish_ids = None
+        query = {}
+    else:
+        dish_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+        if not dish_ids:
+            raise HTTPException(status_code=400, detail="No dish ids given")
+        if len(dish_ids) > MAX_BULK_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} dish ids per request")
+        query = {"_id": {"$in": dish_ids}}
+
+    summaries = {s["_id"]: s async for s in db["rating_summaries"].find(query, {"sum": 1, "count": 1})}
+
+    mine = {}
+    if email:
+        own_query = {"user_email": email}
+        if dish_ids is not None:
+            own_query["dish_id"] = {"$in": dish_ids}
+        async for r in db["ratings"].find(own_query, {"dish_id": 1, "stars": 1}):
+            mine[r["dish_id"]] = r["stars"]
+
+    result = {}
+    for dish_id in (dish_ids if dish_ids is not None else sorted(summaries)):
+        avg = _summary_avg(summaries.get(dish_id))
+        result[dish_id] = {"average": avg["average"], "count": avg["count"], "user_rating": mine.get(dish_id)}
+
+    body = encode_json({"ratings": result})
+    # Per-user body: shared caches must not reuse it across logins
+    return etag_response(request, body, make_etag(body),
+                         headers={"Cache-Control": "private, no-cache", "Vary": "Authorization"})
+
+
 @router.get("/{dish_id}")
-async def get_ratings(dish_id: str, request: Request):
+async def get_ratings(dish_id: str, email: Optional[str] = Depends(get_email_from_request)):
     """Get all ratings + average for a dish. Also returns current user's rating if logged in."""
     db = get_database()
     cursor = db["ratings"].find({"dish_id": dish_id}).sort("updated_at", -1).limit(20)
-    ratings = [serialize(r) async for r in cursor]
+    ratings = await cursor.to_list(20)
 
-    total = len(ratings)
-    avg   = round(sum(r["stars"] for r in ratings) / total, 1) if total else 0
+    # Average/count cover every rating, not just the 20 listed
+    summary = await db["rating_summaries"].find_one({"_id": dish_id})
+    avg = _summary_avg(summary)
 
     user_rating = None
-    email = get_email_from_request(request)
     if email:
         mine = await db["ratings"].find_one({"dish_id": dish_id, "user_email": email})
         if mine:
             user_rating = {"stars": mine["stars"], "comment": mine.get("comment", "")}
 
-    return {
+    return FastJSONResponse({
         "dish_id":     dish_id,
-        "average":     avg,
-        "count":       total,
+        "average":     avg["average"],
+        "count":       avg["count"],
+        "histogram":   (summary or {}).get("hist", {}),
         "ratings":     ratings,
         "user_rating": user_rating,
-    }
+    })
+
+
+# ===============================
+# Rating summaries
+# ===============================
+# One document per dish in `rating_summaries`: {_id: dish_id, sum, count, hist: {"1".."5": n}}.
+# Kept current with $inc deltas on every rating write, so reads are O(1).
+
+async def _apply_rating_delta(db, dish_id: str, old_stars: Optional[int], new_stars: int) -> dict:
+    if old_stars is None:
+        inc = {"sum": new_stars, "count": 1, f"hist.{new_stars}": 1}
+    elif old_stars != new_stars:
+        inc = {"sum": new_stars - old_stars, f"hist.{old_stars}": -1, f"hist.{new_stars}": 1}
+    else:
+        return await db["rating_summaries"].find_one({"_id": dish_id}) or {}
+    return await db["rating_summaries"].find_one_and_update(
+        {"_id": dish_id},
+        {"$inc": inc},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
 
 
-async def _compute_avg(db, dish_id: str) -> dict:
-    cursor = db["ratings"].find({"dish_id": dish_id})
-    all_r  = [r async for r in cursor]
-    count  = len(all_r)
-    avg    = round(sum(r["stars"] for r in all_r) / count, 1) if count else 0
+def _summary_avg(summary: Optional[dict]) -> dict:
+    count = (summary or {}).get("count", 0)
+    avg   = round(summary["sum"] / count, 1) if count else 0
     return {"average": avg, "count": count}
+
+
+async def rebuild_rating_summaries(db):
+    """Recompute every dish summary from the ratings collection (backfill / verification)."""
+    hist = {str(n): {"$sum": {"$cond": [{"$eq": ["$stars", n]}, 1, 0]}} for n in range(1, 6)}
+    pipeline = [
+        {"$group": {"_id": "$dish_id", "sum": {"$sum": "$stars"}, "count": {"$sum": 1},
+                    **{f"h{k}": v for k, v in hist.items()}}},
+        {"$project": {"sum": 1, "count": 1, "hist": {k: f"$h{k}" for k in hist}}},
+        {"$merge": {"into": "rating_summaries", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+    await db["ratings"].aggregate(pipeline).to_list(None)
+
+
+BACKFILL_MARKER = "rating_summaries_backfill"
+
+
+async def ensure_rating_summaries(db):
+    """
+    One-time backfill for ratings written before summaries existed.
+
+    Recorded in `migrations` once it succeeds — an empty `rating_summaries`
+    isn't a reliable signal, since a rating submitted right after deploy
+    creates a summary before this runs.
+    """
+    if await db["migrations"].find_one({"_id": BACKFILL_MARKER}):
+        return
+    await rebuild_rating_summaries(db)
+    await db["migrations"].update_one(
+        {"_id": BACKFILL_MARKER},
+        {"$setOnInsert": {"done_at": datetime.utcnow().isoformat()}},
+        upsert=True,
+    )
+    log.info("Rating summaries backfilled")
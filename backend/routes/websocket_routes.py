@@ -1,47 +1,206 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, Set
+from typing import Deque, Dict, Set, Tuple
+from collections import deque
+import asyncio
 import json
+import os
+import time
+from auth import ADMIN_EMAIL, get_email_from_token
+from order_events import seq_at
+from logger import get_logger
 
 router = APIRouter(tags=["WebSocket"])
+log = get_logger(__name__)
+
+WS_SEND_QUEUE   = int(os.getenv("WS_SEND_QUEUE", "32"))       # messages buffered per socket
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))   # seconds a single send may take
+WS_REPLAY_BUFFER     = int(os.getenv("WS_REPLAY_BUFFER", "1000"))   # recent events kept for resume
+WS_MAX_SUBSCRIPTIONS = int(os.getenv("WS_MAX_SUBSCRIPTIONS", "100"))
+
+
+# ── Per-socket writer ──
+# Each socket gets a bounded queue drained by its own writer task, so a slow
+# client only ever delays itself. A client that lets its queue overflow (or
+# stalls a send past WS_SEND_TIMEOUT) is evicted: the writer stops and the
+# socket is closed with 1013 "try again later" so the browser can reconnect.
+class ClientConnection:
+    def __init__(self, ws: WebSocket, max_queue: int = WS_SEND_QUEUE, on_evict=None):
+        self.ws = ws
+        self.on_evict = on_evict
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.subscriptions: Set[str] = set()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, data: str) -> bool:
+        """Queue an already-encoded message without waiting. False if the client was evicted."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self.evict()
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                data = await self.queue.get()
+                await asyncio.wait_for(self.ws.send_text(data), timeout=WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Timed out or the socket went away mid-send
+            self.evict()
+
+    def evict(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.on_evict:
+            self.on_evict(self)
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        asyncio.create_task(self._close(code=1013))
+
+    async def _close(self, code: int):
+        try:
+            await self.ws.close(code=code)
+        except Exception:
+            pass   # already closed by the client
+
+    def stop(self):
+        """Stop the writer after a normal disconnect."""
+        self.closed = True
+        self._writer.cancel()
+
 
 # ── Connection manager ──
-# Maps order_id → set of connected WebSocket clients watching it
+# Maps order_id → set of connected clients watching it, plus the admin
+# firehose (every event). The last WS_REPLAY_BUFFER events are kept so a
+# reconnecting client can resume from the last seq it saw.
 class OrderConnectionManager:
-    def __init__(self):
-        self.connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(self, replay_buffer: int = WS_REPLAY_BUFFER):
+        self.connections: Dict[str, Set[ClientConnection]] = {}
+        self.firehose: Set[ClientConnection] = set()
+        self.clients: Set[ClientConnection] = set()   # every live socket, however many orders it watches
+        self.history: Deque[Tuple[int, str, str]] = deque(maxlen=replay_buffer)   # (seq, order_id, encoded)
+        # Every event with seq > floor is in history; older ones may be missing
+        self.floor = seq_at(int(time.time()))
+        self.sent = 0
+        self.evicted = 0
 
-    async def connect(self, order_id: str, ws: WebSocket):
+    async def accept(self, ws: WebSocket) -> ClientConnection:
         await ws.accept()
-        if order_id not in self.connections:
-            self.connections[order_id] = set()
-        self.connections[order_id].add(ws)
-        print(f"✅ WS connected: order {order_id} — {len(self.connections[order_id])} watchers")
-
-    def disconnect(self, order_id: str, ws: WebSocket):
-        if order_id in self.connections:
-            self.connections[order_id].discard(ws)
-            if not self.connections[order_id]:
+        conn = ClientConnection(ws, on_evict=self._on_evict)
+        self.clients.add(conn)
+        return conn
+
+    async def connect(self, order_id: str, ws: WebSocket) -> ClientConnection:
+        conn = await self.accept(ws)
+        self.subscribe(order_id, conn)
+        log.debug("WS connected", order_id=order_id, watchers=len(self.connections[order_id]))
+        return conn
+
+    def disconnect(self, order_id: str, conn: ClientConnection):
+        self.drop(conn)
+        log.debug("WS disconnected", order_id=order_id)
+
+    def subscribe(self, order_id: str, conn: ClientConnection):
+        conn.subscriptions.add(order_id)
+        self.connections.setdefault(order_id, set()).add(conn)
+
+    def unsubscribe(self, order_id: str, conn: ClientConnection):
+        conn.subscriptions.discard(order_id)
+        watchers = self.connections.get(order_id)
+        if watchers is not None:
+            watchers.discard(conn)
+            if not watchers:
                 del self.connections[order_id]
-        print(f"🔌 WS disconnected: order {order_id}")
 
-    async def broadcast_status(self, order_id: str, status: str):
-        """Push status update to all clients watching this order."""
-        if order_id not in self.connections:
-            return
-        dead = set()
-        for ws in self.connections[order_id]:
-            try:
-                await ws.send_text(json.dumps({ "order_id": order_id, "status": status }))
-            except Exception:
-                dead.add(ws)
-        # Clean up dead connections
-        for ws in dead:
-            self.connections[order_id].discard(ws)
+    def drop(self, conn: ClientConnection):
+        """Stop the writer and remove the client from every subscription."""
+        conn.stop()
+        self.clients.discard(conn)
+        for order_id in list(conn.subscriptions):
+            self.unsubscribe(order_id, conn)
+        self.firehose.discard(conn)
+
+    def _on_evict(self, conn: ClientConnection):
+        self.evicted += 1
+        self.clients.discard(conn)
+        for order_id in list(conn.subscriptions):
+            self.unsubscribe(order_id, conn)
+        self.firehose.discard(conn)
+
+    def publish(self, event: dict) -> int:
+        """
+        Queue an event for every client watching its order (and the firehose)
+        and return immediately — delivery happens on each client's writer task.
+        Returns the number of clients it was queued for.
+        """
+        order_id = event["order_id"]
+        data = json.dumps(event)   # encoded once for all recipients
+        if len(self.history) == self.history.maxlen:
+            self.floor = self.history[0][0]
+        self.history.append((event["seq"], order_id, data))
+
+        recipients = self.connections.get(order_id, set()) | self.firehose
+        queued = sum(1 for conn in recipients if conn.offer(data))
+        self.sent += queued
+        return queued
+
+    def reset(self, seq: int):
+        """
+        Events up to `seq` may have been lost upstream: nothing before it can be
+        replayed, and every connected client is told to refetch.
+        """
+        self.floor = max(self.floor, seq)
+        self.history.clear()
+        data = json.dumps({"type": "resync"})
+        for conn in list(self.clients):
+            conn.offer(data)
+
+    def replay(self, conn: ClientConnection, since: int) -> bool:
+        """
+        Re-send buffered events after `since` that this client is subscribed to.
+        False if some of them are no longer buffered (or wouldn't fit the
+        client's queue) — the client should refetch over REST instead.
+        """
+        if since < self.floor:
+            return False
+        missed = [data for seq, order_id, data in self.history
+                  if seq > since and (conn in self.firehose or order_id in conn.subscriptions)]
+        if len(missed) > conn.queue.maxsize - conn.queue.qsize():
+            return False
+        for data in missed:
+            conn.offer(data)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "orders":        len(self.connections),
+            "clients":       len(self.clients),
+            "subscriptions": sum(len(c) for c in self.connections.values()),
+            "firehose":    len(self.firehose),
+            "buffered":    len(self.history),
+            "sent":        self.sent,
+            "evicted":     self.evicted,
+        }
 
 
 manager = OrderConnectionManager()
 
 
+def handle_order_event(event: dict):
+    """Backplane handler (see order_events.py): push an event to this process's sockets."""
+    if event["type"] == "gap":
+        manager.reset(event["seq"])
+    else:
+        manager.publish(event)
+
+
 @router.websocket("/ws/order/{order_id}")
 async def order_status_ws(websocket: WebSocket, order_id: str):
     """
@@ -49,10 +208,84 @@ async def order_status_ws(websocket: WebSocket, order_id: str):
     When admin updates status via PATCH /api/v1/order/{id}/status,
     this socket immediately pushes the new status to the client.
     """
-    await manager.connect(order_id, websocket)
+    conn = await manager.connect(order_id, websocket)
     try:
         while True:
             # Keep connection alive — just wait for client ping or disconnect
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(order_id, websocket)
+        pass
+    except RuntimeError:
+        pass   # socket closed by eviction while we were waiting to receive
+    finally:
+        manager.disconnect(order_id, conn)
+
+
+@router.websocket("/ws/events")
+async def events_ws(websocket: WebSocket):
+    """
+    One socket for many orders. Send JSON messages:
+        {"action": "subscribe",   "orders": ["<order_id>", ...]}
+        {"action": "unsubscribe", "orders": ["<order_id>", ...]}
+        {"action": "subscribe",   "channel": "admin"}   — every event; needs ?token=<admin JWT>
+        {"action": "resume",      "since": <seq>}       — re-send events missed after `seq`
+    Events look like {"seq", "type": "order_created" | "status_changed", "order_id", "status", ...}.
+    A {"type": "resync"} message (in reply to resume, or unprompted if the
+    server lost its event stream) means events were missed: refetch over REST.
+    """
+    token = websocket.query_params.get("token")
+    email = get_email_from_token(token) if token else None
+    conn = await manager.accept(websocket)
+
+    def reply(**msg):
+        conn.offer(json.dumps(msg))
+
+    try:
+        while True:
+            try:
+                msg = json.loads(await websocket.receive_text())
+                action = msg["action"]
+            except (ValueError, KeyError, TypeError):
+                reply(type="error", detail="Expected a JSON object with an 'action'")
+                continue
+
+            if action in ("subscribe", "unsubscribe") and msg.get("channel") == "admin":
+                if action == "unsubscribe":
+                    manager.firehose.discard(conn)
+                elif email != ADMIN_EMAIL:
+                    reply(type="error", detail="Admin access required")
+                    continue
+                else:
+                    manager.firehose.add(conn)
+                reply(type=action + "d", channel="admin")
+
+            elif action in ("subscribe", "unsubscribe"):
+                orders = [str(o) for o in (msg.get("orders") or [])]
+                if action == "subscribe":
+                    if len(conn.subscriptions | set(orders)) > WS_MAX_SUBSCRIPTIONS:
+                        reply(type="error", detail=f"At most {WS_MAX_SUBSCRIPTIONS} orders per socket")
+                        continue
+                    for order_id in orders:
+                        manager.subscribe(order_id, conn)
+                else:
+                    for order_id in orders:
+                        manager.unsubscribe(order_id, conn)
+                reply(type=action + "d", orders=orders)
+
+            elif action == "resume":
+                try:
+                    since = int(msg.get("since"))
+                except (TypeError, ValueError):
+                    reply(type="error", detail="'since' must be an event seq")
+                    continue
+                if not manager.replay(conn, since):
+                    reply(type="resync")
+
+            else:
+                reply(type="error", detail=f"Unknown action {action!r}")
+    except WebSocketDisconnect:
+        pass
+    except RuntimeError:
+        pass   # socket closed by eviction while we were waiting to receive
+    finally:
+        manager.drop(conn)
@@ -0,0 +1,114 @@
+# table_availability.py
+"""
+Per-day table availability for the reservation form.
+
+The day is cut into RESERVATION_SLOT_MINUTES slots between RESERVATION_OPEN
+and RESERVATION_CLOSE. Each table gets an int bitmap with one bit per slot,
+set when a reservation for that table starts inside the slot. A whole day is
+built from one `reservations.find({"date": ...})` on the (date, time, tableNo)
+index and cached. send_reservation calls invalidate() after every booking so
+the next read rebuilds it.
+
+The grid is advisory. The unique (date, time, tableNo) index is what makes
+double bookings impossible. The cache TTL bounds staleness from bookings made
+by other server processes.
+"""
+import os
+from typing import Dict, List, Optional
+
+from ttl_cache import TTLCache
+
+RESERVATION_TABLES       = int(os.getenv("RESERVATION_TABLES", "100"))
+RESERVATION_OPEN         = os.getenv("RESERVATION_OPEN", "11:00")
+RESERVATION_CLOSE        = os.getenv("RESERVATION_CLOSE", "23:00")
+RESERVATION_SLOT_MINUTES = int(os.getenv("RESERVATION_SLOT_MINUTES", "30"))
+
+
+def _minutes(hhmm: str) -> Optional[int]:
+    try:
+        h, m = str(hhmm).split(":")[:2]
+        return int(h) * 60 + int(m)
+    except ValueError:
+        return None
+
+
+_OPEN_MIN  = _minutes(RESERVATION_OPEN)
+_CLOSE_MIN = _minutes(RESERVATION_CLOSE)
+SLOTS: List[str] = [
+    f"{m // 60:02d}:{m % 60:02d}" for m in range(_OPEN_MIN, _CLOSE_MIN, RESERVATION_SLOT_MINUTES)
+]
+
+
+def slot_index(hhmm: str) -> Optional[int]:
+    """Slot a "HH:MM" start time falls into, or None outside opening hours."""
+    m = _minutes(hhmm)
+    if m is None or m < _OPEN_MIN or m >= _CLOSE_MIN:
+        return None
+    return (m - _OPEN_MIN) // RESERVATION_SLOT_MINUTES
+
+
+class DayGrid:
+    __slots__ = ("date", "booked")
+
+    def __init__(self, date: str, reservations):
+        self.date = date
+        self.booked: Dict[int, int] = {}   # tableNo → bitmap of booked slots
+        for r in reservations:
+            i = slot_index(r.get("time"))
+            if i is not None:
+                self.booked[r["tableNo"]] = self.booked.get(r["tableNo"], 0) | (1 << i)
+
+    def to_dict(self) -> dict:
+        booked = {}
+        for i, slot in enumerate(SLOTS):
+            tables = sorted(t for t, bits in self.booked.items() if (bits >> i) & 1)
+            if tables:
+                booked[slot] = tables
+        return {
+            "date":         self.date,
+            "tables":       RESERVATION_TABLES,
+            "slot_minutes": RESERVATION_SLOT_MINUTES,
+            "slots":        SLOTS,
+            "booked":       booked,   # slot → booked table numbers; every other table is free
+            "free":         {slot: RESERVATION_TABLES - len(booked.get(slot, ())) for slot in SLOTS},
+        }
+
+
+class AvailabilityCache:
+    def __init__(self, maxsize: int = 64, ttl: float = 60.0):
+        self._grids = TTLCache(maxsize=maxsize, ttl=ttl)
+        # date → [reads in flight, invalidations seen]; only held while a read is in flight
+        self._reading: Dict[str, List[int]] = {}
+
+    async def get_day(self, db, date: str) -> DayGrid:
+        grid = self._grids.get(date)
+        if grid is not None:
+            return grid
+        entry = self._reading.setdefault(date, [0, 0])
+        entry[0] += 1
+        generation = entry[1]
+        try:
+            cursor = db["reservations"].find({"date": date}, {"_id": 0, "tableNo": 1, "time": 1})
+            grid = DayGrid(date, [r async for r in cursor])
+        finally:
+            entry[0] -= 1
+            if entry[0] == 0:
+                del self._reading[date]
+        # A booking landed while we were reading — serve this grid but don't cache it
+        if entry[1] == generation:
+            self._grids.set(date, grid)
+        return grid
+
+    def invalidate(self, date: str):
+        entry = self._reading.get(date)
+        if entry is not None:
+            entry[1] += 1
+        self._grids.pop(date)
+
+    def stats(self) -> dict:
+        return self._grids.stats()
+
+
+availability_cache = AvailabilityCache(
+    ttl=float(os.getenv("RESERVATION_AVAILABILITY_TTL", "60")),
+)
@@ -1,6 +1,6 @@
 // frontend/src/Components/ChatWidget.jsx
 import React, { useState, useRef, useEffect } from "react";
-import api from "../api";
+import api, { streamChat } from "../api";
 import { useNavigate } from "react-router-dom";
 
 const ChatWidget = () => {
@@ -49,10 +49,33 @@ const ChatWidget = () => {
     setLoading(true);
     const currentCart = JSON.parse(localStorage.getItem("cart")) || [];
 
+    // Placeholder bubble that fills in as Gemini tokens stream in
+    const streamId = Date.now();
+    // Same id on the fallback request, so the server never places an order twice
+    const request_id = crypto.randomUUID?.() ?? `${streamId}-${Math.random().toString(36).slice(2)}`;
+    const onToken = (chunk) => {
+      setLoading(false);
+      setMessages((prev) => {
+        const exists = prev.some((m) => m.streamId === streamId);
+        if (!exists) return [...prev, { sender: "bot", text: chunk, streamId }];
+        return prev.map((m) => (m.streamId === streamId ? { ...m, text: m.text + chunk } : m));
+      });
+    };
+
     try {
-      // api.js: 60s timeout + auto-retry — handles Render cold start on mobile data
-      const res = await api.post("/api/v1/ai/chat", { message: text, cart: currentCart });
-      const { reply, dishes, action, order_id } = res.data;
+      let data;
+      try {
+        data = await streamChat({ message: text, cart: currentCart, request_id }, onToken);
+      } catch (streamErr) {
+        // Only retry when the stream never got going; once the server answered,
+        // the message was already handled
+        if (streamErr.fromServer || streamErr.acknowledged) throw streamErr;
+        // api.js: 60s timeout + auto-retry — handles Render cold start on mobile data
+        console.warn("[chat] streaming failed, falling back:", streamErr);
+        const res = await api.post("/api/v1/ai/chat", { message: text, cart: currentCart, request_id });
+        data = res.data;
+      }
+      const { reply, dishes, action, order_id } = data;
       const botMsg = { sender: "bot", text: reply || "Sorry, I didn't get that." };
 
       if (dishes?.length > 0) botMsg.dishes = dishes;
@@ -70,10 +93,11 @@ const ChatWidget = () => {
         setTimeout(() => navigate(`/order/${order_id}`), 2500);
       }
 
-      setMessages((prev) => [...prev, botMsg]);
+      // Swap the streamed placeholder for the final message (with dish cards)
+      setMessages((prev) => [...prev.filter((m) => m.streamId !== streamId), botMsg]);
     } catch (err) {
-      const isTimeout = err.code === "ECONNABORTED" || err.code === "ERR_NETWORK" || !err.response;
-      setMessages((prev) => [...prev, {
+      const isTimeout = !err.fromServer && !err.acknowledged && (err.code === "ECONNABORTED" || err.code === "ERR_NETWORK" || !err.response);
+      setMessages((prev) => [...prev.filter((m) => m.streamId !== streamId), {
         sender: "bot",
         text: isTimeout
           ? "⏳ Server is waking up, please try again in a moment..."
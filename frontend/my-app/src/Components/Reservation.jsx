@@ -1,5 +1,5 @@
 // src/Components/Reservation.jsx
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import { HiOutlineArrowNarrowRight } from "react-icons/hi";
 import api from "../api";
 import toast from "react-hot-toast";
@@ -12,8 +12,30 @@ const Reservation = () => {
   const [date,      setDate]      = useState("");
   const [time,      setTime]      = useState("");
   const [phone,     setPhone]     = useState("");
+  const [availability, setAvailability] = useState(null);
   const navigate = useNavigate();
 
+  // ── Free/booked grid for the chosen date (one request per date) ───────────
+  const fetchAvailability = async (d) => {
+    try {
+      const { data } = await api.get("/api/v1/reservation/availability", { params: { date: d } });
+      setAvailability(data);
+    } catch {
+      setAvailability(null);
+    }
+  };
+
+  useEffect(() => {
+    if (date) fetchAvailability(date); else setAvailability(null);
+  }, [date]);
+
+  // Slot the chosen time falls into ("HH:MM" strings compare correctly)
+  const slot = availability && time
+    ? [...availability.slots].reverse().find(s => s <= time)
+    : null;
+  const bookedTables = (slot && availability.booked[slot]) || [];
+  const tableTaken   = tableNo && bookedTables.includes(Number(tableNo));
+
   // ── Validation helpers ───────────────────────────────────────────────────
   const isValidName  = (n) => /^[a-zA-Z\s]{2,30}$/.test(n.trim());
   const isValidPhone = (p) => /^[0-9]{10}$/.test(p.replace(/[\s\-]/g, ""));
@@ -47,6 +69,7 @@ const Reservation = () => {
     } catch (error) {
       const errorMsg = error.response?.data?.message || error.response?.data?.detail || "Reservation failed. Try again!";
       toast.error(errorMsg);
+      if (date) fetchAvailability(date);
     }
   };
 
@@ -165,6 +188,12 @@ const Reservation = () => {
         .res-btn:hover {
           background: rgba(144, 135, 175, 0.34);
         }
+        .res-avail {
+          font-size: 14px !important;
+          margin: -12px 0 0 !important;
+          text-align: left !important;
+        }
+        .res-avail.taken { color: #ff6b81 !important; }
         .res-btn-icon {
           display: flex;
           align-items: center;
@@ -270,6 +299,14 @@ const Reservation = () => {
                   </div>
                 </div>
 
+                {slot && (
+                  <p className={`res-avail${tableTaken ? " taken" : ""}`}>
+                    {tableTaken
+                      ? `Table ${tableNo} is already booked around ${slot}.`
+                      : `${availability.free[slot]} of ${availability.tables} tables free around ${slot}.`}
+                  </p>
+                )}
+
                 <button type="submit" className="res-btn">
                   RESERVE NOW
                   <span className="res-btn-icon">
@@ -1,6 +1,7 @@
 // src/Pages/AdminDashboard.jsx
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import api from "../api";
+import { openEventSocket } from "../eventSocket";
 import { Link, useNavigate } from "react-router-dom";
 import toast from "react-hot-toast";
 import {
@@ -74,8 +75,14 @@ const makeStyles = (dark) => ({
   statusBtns:  { display: "flex", gap: 8, flexWrap: "wrap", marginTop: 8 },
   statusBtn:   (active, updating) => ({ padding: "6px 14px", borderRadius: 20, border: "none", cursor: "pointer", fontSize: 13, fontFamily: "Oswald, sans-serif", transition: "0.2s", background: active ? "#e91e63" : dark ? "#1a1a2e" : "#f5f5f5", color: active ? "#fff" : dark ? "#aaa" : "#555", opacity: updating ? 0.6 : 1 }),
   empty:       { textAlign: "center", padding: 40, color: dark ? "#555" : "#888", fontFamily: "Oswald, sans-serif" },
+  rangeRow:    { display: "flex", gap: 10, alignItems: "center", flexWrap: "wrap", color: dark ? "#aaa" : "#555", fontSize: 14 },
+  dateInput:   { padding: "6px 10px", borderRadius: 8, border: `1px solid ${dark ? "#333" : "#ddd"}`, fontFamily: "Oswald, sans-serif", background: dark ? "#16213e" : "#fff", color: dark ? "#e0e0e0" : "#333", colorScheme: dark ? "dark" : "light" },
+  exportBtn:   { padding: "6px 14px", borderRadius: 20, border: "1px solid #e91e63", background: "transparent", color: "#e91e63", cursor: "pointer", fontSize: 13, fontFamily: "Oswald, sans-serif" },
+  loadMoreBtn: { display: "block", margin: "8px auto 0", padding: "10px 28px", borderRadius: 30, border: "2px solid #e91e63", background: "transparent", color: "#e91e63", cursor: "pointer", fontSize: 15, fontWeight: 600, fontFamily: "Oswald, sans-serif" },
 });
 
+const PAGE_SIZE = 50;
+
 const AdminDashboard = () => {
   const [orders, setOrders]         = useState([]);
   const [loading, setLoading]       = useState(true);
@@ -83,6 +90,16 @@ const AdminDashboard = () => {
   const [search, setSearch]         = useState("");
   const [expanded, setExpanded]     = useState(null);
   const [updatingId, setUpdatingId] = useState(null);
+  const [dateFrom, setDateFrom]     = useState("");
+  const [dateTo, setDateTo]         = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [stats, setStats]           = useState(null);
+  const [authorized, setAuthorized] = useState(false);
+  const [live, setLive]             = useState(false);
+  const filtersRef = useRef({});
+  const statsTimer = useRef(null);
+  filtersRef.current = { filter, dateTo };
   const navigate         = useNavigate();
   const { dark, toggle } = useTheme();
   const { user, loading: authLoading } = useAuth();   // ✅ renamed to avoid conflict with orders loading
@@ -94,15 +111,61 @@ const AdminDashboard = () => {
     const isAdmin = user.email?.toLowerCase().trim() === ADMIN_EMAIL.toLowerCase().trim();
     console.log("[AdminDashboard check]", user.email, "vs", ADMIN_EMAIL, "→", isAdmin);
     if (!isAdmin) { toast.error("Admin access only."); navigate("/"); return; }
-    fetchOrders();
+    setAuthorized(true);
   }, [user, authLoading]);
 
+  // Status and date range are filtered server-side; search narrows the loaded pages
+  useEffect(() => {
+    if (authorized) refresh();
+  }, [authorized, filter, dateFrom, dateTo]);
+
+  // Live order feed over the admin firehose — replaces polling with Refresh
+  useEffect(() => {
+    if (!authorized) return;
+    const socket = openEventSocket({
+      admin:    true,
+      onEvent:  handleEvent,
+      onResync: () => refresh(),
+      onStatus: (s) => setLive(s === "live"),
+    });
+    return () => { socket.close(); clearTimeout(statsTimer.current); };
+  }, [authorized]);
+
+  const handleEvent = (ev) => {
+    if (ev.type === "order_created") {
+      const { filter: f, dateTo: to } = filtersRef.current;
+      // New orders are newest-first; skip them if the current filter would exclude them
+      if ((f === "All" || f === ev.status) && !to) {
+        setOrders(prev => prev.some(o => o._id === ev.order_id) ? prev : [ev.order, ...prev]);
+      }
+    } else if (ev.type === "status_changed") {
+      setOrders(prev => prev.map(o => o._id === ev.order_id ? { ...o, status: ev.status } : o));
+    }
+    // Coalesce bursts of events into one stats refresh
+    clearTimeout(statsTimer.current);
+    statsTimer.current = setTimeout(fetchStats, 1000);
+  };
+
+  const orderParams = () => ({
+    ...(filter !== "All" && { status: filter }),
+    ...(dateFrom && { date_from: dateFrom }),
+    ...(dateTo && { date_to: dateTo }),
+  });
+
+  const fetchStats = async () => {
+    try {
+      const res = await api.get("/api/v1/admin/stats");
+      setStats(res.data);
+    } catch {}
+  };
+
   const fetchOrders = async () => {
     setLoading(true);
     try {
       // ✅ api.js auto-attaches token from yb_token + 60s timeout
-      const res = await api.get("/api/v1/admin/orders");
-      setOrders(res.data);
+      const res = await api.get("/api/v1/admin/orders", { params: { ...orderParams(), limit: PAGE_SIZE } });
+      setOrders(res.data.orders || []);
+      setNextCursor(res.data.next_cursor || null);
     } catch (err) {
       toast.error("Failed to load orders.");
     } finally {
@@ -110,6 +173,36 @@ const AdminDashboard = () => {
     }
   };
 
+  const refresh = () => { fetchOrders(); fetchStats(); };
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await api.get("/api/v1/admin/orders", { params: { ...orderParams(), limit: PAGE_SIZE, cursor: nextCursor } });
+      setOrders(prev => [...prev, ...(res.data.orders || [])]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch {
+      toast.error("Failed to load more orders.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const exportOrders = async (format) => {
+    try {
+      const res = await api.get("/api/v1/admin/orders/export", { params: { ...orderParams(), format }, responseType: "blob", timeout: 0 });
+      const url = URL.createObjectURL(res.data);
+      const a = document.createElement("a");
+      a.href = url;
+      a.download = `orders.${format}`;
+      a.click();
+      URL.revokeObjectURL(url);
+    } catch {
+      toast.error("Export failed.");
+    }
+  };
+
   const updateStatus = async (orderId, newStatus) => {
     setUpdatingId(orderId);
     try {
@@ -124,9 +217,11 @@ const AdminDashboard = () => {
     }
   };
 
-  const totalRevenue  = orders.filter(o => o.status === "Delivered").reduce((a, o) => a + (o.total || 0), 0);
-  const pendingOrders = orders.filter(o => o.status === "Pending").length;
-  const uniqueUsers   = new Set(orders.map(o => o.user_email).filter(e => e && e !== "guest")).size;
+  // Totals come from the server-side stats document, not just the loaded pages
+  const totalOrders   = stats?.total_orders ?? 0;
+  const totalRevenue  = stats?.total_revenue ?? 0;
+  const pendingOrders = stats?.pending_orders ?? 0;
+  const totalUsers    = stats?.total_users ?? 0;
 
   const displayed = orders.filter(o => {
     const matchFilter = filter === "All" || o.status === filter;
@@ -149,16 +244,17 @@ const AdminDashboard = () => {
         </div>
         <div style={{ display: "flex", gap: 8 }}>
           <button onClick={toggle} style={st.iconBtn}>{dark ? <FaSun size={14} /> : <FaMoon size={14} />}</button>
-          <button onClick={fetchOrders} style={st.iconBtn}>↻ Refresh</button>
+          <span style={{ ...st.iconBtn, border: "none", color: live ? "#4CAF50" : "#9e9e9e", cursor: "default" }}>● {live ? "Live" : "Offline"}</span>
+          <button onClick={refresh} style={st.iconBtn}>↻ Refresh</button>
         </div>
       </div>
 
       <div style={st.statsRow}>
         {[
-          { icon: <FaBoxOpen size={28} color="#e91e63" />,   val: orders.length,                 label: "Total Orders",        clr: "#e91e63" },
+          { icon: <FaBoxOpen size={28} color="#e91e63" />,   val: totalOrders,                   label: "Total Orders",        clr: "#e91e63" },
           { icon: <FaRupeeSign size={28} color="#4CAF50" />, val: `₹${totalRevenue.toFixed(0)}`, label: "Revenue (Delivered)", clr: "#4CAF50" },
           { icon: <FaClock size={28} color="#ff9800" />,     val: pendingOrders,                 label: "Pending Orders",      clr: "#ff9800" },
-          { icon: <FaUsers size={28} color="#2196f3" />,     val: uniqueUsers,                   label: "Customers",           clr: "#2196f3" },
+          { icon: <FaUsers size={28} color="#2196f3" />,     val: totalUsers,                    label: "Customers",           clr: "#2196f3" },
         ].map((s, i) => (
           <div key={i} style={st.statCard}>
             {s.icon}
@@ -175,8 +271,14 @@ const AdminDashboard = () => {
             <button key={f} onClick={() => setFilter(f)} style={st.filterBtn(filter === f)}>{f}</button>
           ))}
         </div>
+        <div style={st.rangeRow}>
+          From <input type="date" value={dateFrom} onChange={e => setDateFrom(e.target.value)} style={st.dateInput} />
+          To <input type="date" value={dateTo} onChange={e => setDateTo(e.target.value)} style={st.dateInput} />
+          <button onClick={() => exportOrders("csv")} style={st.exportBtn}>⬇ Export CSV</button>
+          <button onClick={() => exportOrders("ndjson")} style={st.exportBtn}>⬇ Export NDJSON</button>
+        </div>
       </div>
-      <p style={st.countText}>Showing {displayed.length} of {orders.length} orders</p>
+      <p style={st.countText}>Showing {displayed.length} of {orders.length}{nextCursor ? "+" : ""} orders</p>
 
       <div style={st.list}>
         {loading ? [1,2,3,4].map(i => <Skeleton key={i} dark={dark} />) : displayed.length === 0 ? (
@@ -238,6 +340,11 @@ const AdminDashboard = () => {
             </div>
           );
         })}
+        {!loading && nextCursor && (
+          <button onClick={loadMore} disabled={loadingMore} style={st.loadMoreBtn}>
+            {loadingMore ? "Loading…" : "Load more orders"}
+          </button>
+        )}
       </div>
     </div>
   );
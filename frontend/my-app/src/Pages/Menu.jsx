@@ -12,6 +12,7 @@ import { useTheme } from "../context/ThemeContext";
 // ✅ REMOVED: const BACKEND_URL — api.js handles baseURL
 const PLACEHOLDER = "https://via.placeholder.com/100?text=Food";
 const PAGE_SIZE   = 8;
+const RATINGS_CHUNK = 100;   // ids per /ratings/bulk call — backend caps at MAX_BULK_IDS (500)
 
 const Stars = ({ value, size = 13, interactive = false, onRate }) => (
   <div style={{ display: "inline-flex", gap: 2 }}>
@@ -119,16 +120,20 @@ const Menu = () => {
     fetchCategories();
   }, []);
 
-  // ✅ FIXED: was raw axios.get() — now api.get() with 60s timeout
+  // Bulk requests instead of one per dish, chunked to stay under the server's
+  // MAX_BULK_IDS and proxy URL limits (~25 chars per id)
   const fetchRatings = useCallback(async (dishIds) => {
+    const chunks = [];
+    for (let i = 0; i < dishIds.length; i += RATINGS_CHUNK) chunks.push(dishIds.slice(i, i + RATINGS_CHUNK));
     const results = await Promise.allSettled(
-      dishIds.map(id => api.get(`/api/v1/ratings/${id}`))
+      chunks.map(ids => api.get("/api/v1/ratings/bulk", { params: { ids: ids.join(",") } }))
     );
     const map = {};
-    results.forEach((r, i) => {
-      if (r.status === "fulfilled") {
-        map[dishIds[i]] = { average: r.value.data.average, count: r.value.data.count };
-      }
+    results.forEach((r) => {
+      if (r.status === "rejected") { console.warn("[menu] ratings fetch failed:", r.reason); return; }
+      Object.entries(r.value.data.ratings || {}).forEach(([id, rating]) => {
+        map[id] = { average: rating.average, count: rating.count };
+      });
     });
     setRatingsMap(prev => ({ ...prev, ...map }));
   }, []);
@@ -69,12 +69,19 @@ const makeStyles = (dark) => ({
   emptyTitle:   { color: dark ? "#aaa" : "#444", marginTop: 12, fontSize: "1.4rem" },
   emptyText:    { color: dark ? "#666" : "#888", marginTop: 8 },
   menuBtn:      { display: "inline-block", marginTop: 20, background: "#e91e63", color: "#fff", padding: "10px 24px", borderRadius: 30, textDecoration: "none", fontWeight: 600 },
+  loadMoreBtn:  { alignSelf: "center", background: "transparent", color: "#e91e63", border: "2px solid #e91e63", borderRadius: 30, padding: "10px 28px", cursor: "pointer", fontFamily: "Oswald, sans-serif", fontSize: 15, fontWeight: 600 },
+  detailNote:   { fontSize: 14, color: dark ? "#666" : "#888" },
 });
 
+const PAGE_SIZE = 20;
+
 const OrderHistory = () => {
   const [orders, setOrders]     = useState([]);
   const [loading, setLoading]   = useState(true);
   const [expanded, setExpanded] = useState(null);
+  const [nextCursor, setNextCursor]   = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [details, setDetails]   = useState({});   // full orders, fetched on first expand
   const { user, getAuthHeader } = useAuth();
   const { dark, toggle }        = useTheme();
   const navigate                = useNavigate();
@@ -85,19 +92,51 @@ const OrderHistory = () => {
     fetchHistory();
   }, [user]);
 
+  // Slim summaries, one keyset page at a time; items/delivery details load per order on expand
+  const fetchPage = (cursor) =>
+    api.get("/api/v1/order/history", { params: { view: "summary", limit: PAGE_SIZE, ...(cursor && { cursor }) } });
+
   const fetchHistory = async () => {
     setLoading(true);
     try {
       // ✅ api.js: auto-attaches JWT from yb_token + 60s timeout + retry
-      const res = await api.get("/api/v1/order/history");
-      setOrders(Array.isArray(res.data) ? res.data : []);
+      const res = await fetchPage();
+      setOrders(res.data.orders || []);
+      setNextCursor(res.data.next_cursor || null);
     } catch {
       setOrders([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetchPage(nextCursor);
+      setOrders(prev => [...prev, ...(res.data.orders || [])]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch {
+      // keep the current list and cursor so the button can be retried
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const toggleOrder = async (id) => {
+    if (expanded === id) { setExpanded(null); return; }
+    setExpanded(id);
+    if (details[id]) return;
+    try {
+      const res = await api.get(`/api/v1/order/${id}`);
+      setDetails(prev => ({ ...prev, [id]: res.data }));
+    } catch {
+      setDetails(prev => ({ ...prev, [id]: { error: true } }));
+    }
+  };
+
   return (
     <div style={st.page}>
       <style>{`@keyframes pulse{0%,100%{opacity:1}50%{opacity:0.45}}`}</style>
@@ -124,10 +163,11 @@ const OrderHistory = () => {
         ) : (
           orders.map(order => {
             const isOpen  = expanded === order._id;
+            const detail  = details[order._id];
             const dateStr = new Date(order.timestamp).toLocaleString("en-IN", { day: "numeric", month: "short", year: "numeric", hour: "2-digit", minute: "2-digit" });
             return (
               <div key={order._id} style={st.card}>
-                <div style={st.cardHeader} onClick={() => setExpanded(isOpen ? null : order._id)}>
+                <div style={st.cardHeader} onClick={() => toggleOrder(order._id)}>
                   <div style={st.cardLeft}>
                     <span style={st.orderId}>#{order._id.slice(-8).toUpperCase()}</span>
                     <span style={st.orderDate}>{dateStr}</span>
@@ -141,30 +181,38 @@ const OrderHistory = () => {
 
                 {isOpen && (
                   <div style={st.cardBody}>
-                    <div>
-                      <div style={st.sectionTitle}>Items Ordered</div>
-                      {order.items?.map((item, i) => (
-                        <div key={i} style={st.itemRow}>
-                          <img src={item.image || PLACEHOLDER} alt={item.name} style={st.itemImg} onError={e => { e.target.src = PLACEHOLDER; }} />
-                          <div style={st.itemInfo}>
-                            <div style={st.itemName}>{item.name}</div>
-                            <div style={st.itemMeta}>₹{item.price} × {item.quantity}</div>
-                          </div>
-                          <span style={st.itemSubtotal}>₹{(item.price * item.quantity).toFixed(0)}</span>
+                    {!detail ? (
+                      <span style={st.detailNote}>Loading order details…</span>
+                    ) : detail.error ? (
+                      <span style={st.detailNote}>Couldn't load this order. Please try again.</span>
+                    ) : (
+                      <>
+                        <div>
+                          <div style={st.sectionTitle}>Items Ordered ({order.item_count})</div>
+                          {detail.items?.map((item, i) => (
+                            <div key={i} style={st.itemRow}>
+                              <img src={item.image || PLACEHOLDER} alt={item.name} style={st.itemImg} onError={e => { e.target.src = PLACEHOLDER; }} />
+                              <div style={st.itemInfo}>
+                                <div style={st.itemName}>{item.name}</div>
+                                <div style={st.itemMeta}>₹{item.price} × {item.quantity}</div>
+                              </div>
+                              <span style={st.itemSubtotal}>₹{(item.price * item.quantity).toFixed(0)}</span>
+                            </div>
+                          ))}
                         </div>
-                      ))}
-                    </div>
 
-                    {order.delivery_details && (
-                      <div>
-                        <div style={st.sectionTitle}>Delivery Details</div>
-                        <div style={st.deliveryBox}>
-                          <p><strong>Name:</strong> {order.delivery_details.name}</p>
-                          <p><strong>Phone:</strong> {order.delivery_details.phone}</p>
-                          <p><strong>Address:</strong> {order.delivery_details.address}</p>
-                          {order.delivery_details.instructions && <p><strong>Notes:</strong> {order.delivery_details.instructions}</p>}
-                        </div>
-                      </div>
+                        {detail.delivery_details && (
+                          <div>
+                            <div style={st.sectionTitle}>Delivery Details</div>
+                            <div style={st.deliveryBox}>
+                              <p><strong>Name:</strong> {detail.delivery_details.name}</p>
+                              <p><strong>Phone:</strong> {detail.delivery_details.phone}</p>
+                              <p><strong>Address:</strong> {detail.delivery_details.address}</p>
+                              {detail.delivery_details.instructions && <p><strong>Notes:</strong> {detail.delivery_details.instructions}</p>}
+                            </div>
+                          </div>
+                        )}
+                      </>
                     )}
 
                     <div style={st.cardFooter}>
@@ -177,6 +225,11 @@ const OrderHistory = () => {
             );
           })
         )}
+        {!loading && nextCursor && (
+          <button onClick={loadMore} disabled={loadingMore} style={st.loadMoreBtn}>
+            {loadingMore ? "Loading…" : "Load older orders"}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -56,4 +56,61 @@ export const wakeBackend = async () => {
   }
 };
 
+// ── Foodie AI streaming (Server-Sent Events over POST) ────────────────────────
+// Calls onToken(text) for each chunk and resolves with the final `done` payload
+// (same shape as POST /api/v1/ai/chat). Errors thrown once the server has
+// answered carry `acknowledged: true` — the request already ran, so it must
+// not be re-sent blindly.
+export const streamChat = async (body, onToken) => {
+  const token = localStorage.getItem("yb_token");
+  const res = await fetch(`${BACKEND_URL}/api/v1/ai/chat/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok || !res.body) throw new Error(`Stream failed (${res.status})`);
+
+  try {
+    return await readChatStream(res.body, onToken);
+  } catch (err) {
+    throw Object.assign(err, { acknowledged: true });
+  }
+};
+
+const readChatStream = async (body, onToken) => {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let final = null;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (event === "token") onToken?.(payload.text);
+      else if (event === "done") final = payload;
+      else if (event === "error") throw Object.assign(new Error(payload.message), { fromServer: true });
+    }
+  }
+
+  if (!final) throw new Error("Stream ended without a reply");
+  return final;
+};
+
 export default api;
\ No newline at end of file
@@ -0,0 +1,56 @@
+import { BACKEND_URL } from "./api";
+
+const WS_URL = BACKEND_URL.replace("https://", "wss://").replace("http://", "ws://");
+
+// ── One multiplexed /ws/events socket ─────────────────────────────────────────
+// Subscribes to the given orders (and the admin firehose if `admin`), reconnects
+// with backoff, and on reconnect asks the server to resume after the last seq
+// seen. If the server can't replay the gap it sends "resync" → onResync().
+export function openEventSocket({ orders = [], admin = false, onEvent, onResync, onStatus }) {
+  let ws;
+  let closed  = false;
+  let lastSeq = null;
+  let retryMs = 1000;
+  let timer;
+
+  const send = (msg) => ws.send(JSON.stringify(msg));
+
+  const connect = () => {
+    const token = localStorage.getItem("yb_token");
+    ws = new WebSocket(`${WS_URL}/ws/events${admin && token ? `?token=${encodeURIComponent(token)}` : ""}`);
+
+    ws.onopen = () => {
+      retryMs = 1000;
+      onStatus?.("live");
+      if (admin) send({ action: "subscribe", channel: "admin" });
+      if (orders.length) send({ action: "subscribe", orders });
+      if (lastSeq !== null) send({ action: "resume", since: lastSeq });
+    };
+
+    ws.onmessage = (e) => {
+      let msg;
+      try { msg = JSON.parse(e.data); } catch { return; }
+      if (msg.seq != null) {
+        if (lastSeq !== null && msg.seq <= lastSeq) return;   // already seen (replay overlap)
+        lastSeq = msg.seq;
+        onEvent?.(msg);
+      } else if (msg.type === "resync") {
+        onResync?.();
+      } else if (msg.type === "error") {
+        console.warn("[events]", msg.detail);
+      }
+    };
+
+    ws.onclose = () => {
+      onStatus?.("offline");
+      if (closed) return;
+      timer = setTimeout(connect, retryMs);
+      retryMs = Math.min(retryMs * 2, 30000);
+    };
+  };
+
+  connect();
+  return {
+    close: () => { closed = true; clearTimeout(timer); ws?.close(); },
+  };
+}